@@ -0,0 +1,115 @@
+"""
+Benchmark of the serialization of link list pages.
+
+Compares the previous list path (model instances with the preview and collections prefetched, serialized by
+`LinkSerializer`) with the plain row path of `links.rows` used by the link lists, for the full representation
+and for a sparse fieldset. The links are created in an in-memory SQLite database, so no database server is needed.
+
+Usage:
+    python benchmarks/bench_link_serialization.py [--links N] [--page-size N] [--repeat N]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+from config import settings as project_settings  # noqa: E402
+
+project_settings.DATABASES = {'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}}
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db.models import Prefetch  # noqa: E402
+from rest_framework.request import Request  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+
+from link_collections.models import Collection  # noqa: E402
+from links.models import Link, PreviewBlob  # noqa: E402
+from links.rows import LINK_FIELDS, link_rows, serialize_link_rows  # noqa: E402
+from links.serializers.link import LinkSerializer  # noqa: E402
+from users.models import User  # noqa: E402
+
+SPARSE_FIELDS = 'pk,title,url'
+
+
+def create_links(count):
+    owner = User.objects.create(email='benchmark@example.com')
+    blob = PreviewBlob.objects.create(sha256='0' * 64, file='link_previews/0.png',
+                                      thumbnail='link_previews/0_thumb.png', size=1, ref_count=count)
+    links = Link.objects.bulk_create(
+        Link(owner=owner, url=f'https://example.com/page/{i}', title=f'Page {i}', description='Description ' * 40,
+             preview='link_previews/preview.png', preview_blob=blob if i % 2 else None, metadata_status='done')
+        for i in range(count))
+    collections = Collection.objects.bulk_create(Collection(owner=owner, name=f'Collection {i}') for i in range(5))
+    Link.collection.through.objects.bulk_create(
+        Link.collection.through(link_id=link.pk, collection_id=collections[i % 5].pk) for i, link in enumerate(links))
+    return owner
+
+
+def make_request(query):
+    return Request(APIRequestFactory().get(f'/links/links_list/?{query}', SERVER_NAME='localhost'))
+
+
+def model_page(owner, page_size, request):
+    queryset = (Link.objects.filter(owner=owner).select_related('preview_blob')
+                .prefetch_related(Prefetch('collection', queryset=Collection.objects.only('pk')))
+                .order_by('-created_at', '-pk')[:page_size])
+    return LinkSerializer(list(queryset), many=True, context={'request': request}).data
+
+
+def row_page(owner, page_size, request, fields):
+    rows = list(link_rows(Link.objects.filter(owner=owner), fields).order_by('-created_at', '-pk')[:page_size])
+    return serialize_link_rows(rows, fields, request)
+
+
+def measure(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--links', type=int, default=500, help='number of links in the database')
+    parser.add_argument('--page-size', type=int, default=50, help='number of links on a page')
+    parser.add_argument('--repeat', type=int, default=200, help='number of measured pages per case')
+    args = parser.parse_args()
+
+    call_command('migrate', verbosity=0)
+    owner = create_links(args.links)
+    full_request, sparse_request = make_request(''), make_request(f'fields={SPARSE_FIELDS}')
+    sparse_fields = SPARSE_FIELDS.split(',')
+
+    model_data = model_page(owner, args.page_size, full_request)
+    row_data = row_page(owner, args.page_size, full_request, LINK_FIELDS)
+    for item in model_data:
+        item['collection'] = sorted(item['collection'])
+    assert [dict(item) for item in model_data] == row_data, 'the representations differ'
+
+    cases = [
+        ('LinkSerializer, all fields', lambda: model_page(owner, args.page_size, full_request)),
+        ('LinkSerializer, ?fields=' + SPARSE_FIELDS, lambda: model_page(owner, args.page_size, sparse_request)),
+        ('rows, all fields', lambda: row_page(owner, args.page_size, full_request, LINK_FIELDS)),
+        ('rows, ?fields=' + SPARSE_FIELDS, lambda: row_page(owner, args.page_size, sparse_request, sparse_fields)),
+    ]
+    print(f'{args.page_size} links per page, median of {args.repeat} pages')
+    print(f'{"case":<40} {"page, ms":>10} {"per link, us":>14}')
+    for name, function in cases:
+        seconds = measure(function, args.repeat)
+        print(f'{name:<40} {seconds * 1000:>10.2f} {seconds / args.page_size * 1e6:>14.1f}')
+
+
+if __name__ == '__main__':
+    main()
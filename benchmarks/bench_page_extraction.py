@@ -0,0 +1,105 @@
+"""
+Benchmark of the page metadata extraction.
+
+Compares the previous implementation of `get_page_data` (full BeautifulSoup `html.parser` tree of the whole page)
+with the streaming head-only extractor from `links.extractors` on a corpus of saved pages.
+
+Usage:
+    python benchmarks/bench_page_extraction.py [--corpus DIR] [--repeat N]
+
+Without `--corpus` a synthetic corpus of small, medium and large pages is generated in memory.
+"""
+import argparse
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from links.extractors import etree, extract_head_metadata  # noqa: E402
+
+CHUNK_SIZE = 16 * 1024
+
+
+def soup_extract(html):
+    """
+    The extraction of the previous `get_page_data`: the whole page is decoded and parsed into a tree.
+    """
+    soup = BeautifulSoup(html.decode('utf-8', errors='replace'), 'html.parser')
+    title = soup.title.string.strip() if soup.title else ''
+    description = soup.find('meta', attrs={'name': 'description'})
+    description = description.get('content').strip() if description else ''
+    image = soup.find('meta', attrs={'property': 'og:image'})
+    image = image.get('content').strip() if image else ''
+    type_ = soup.find('meta', attrs={'property': 'og:type'})
+    type_ = type_.get('content').strip() if type_ else ''
+    return {'title': title, 'description': description, 'image': image, 'type': type_}
+
+
+def streaming_extract(backend):
+    def extract(html):
+        chunks = (html[i:i + CHUNK_SIZE] for i in range(0, len(html), CHUNK_SIZE))
+        return extract_head_metadata(chunks, backend=backend)
+    return extract
+
+
+def synthetic_page(body_kb, head_kb=0):
+    filler = ''.join(f'<link rel="preload" href="/asset-{i}.js"><style>.c{i}{{color:red}}</style>'
+                     for i in range(head_kb * 1024 // 60))
+    head = (
+        '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">' + filler +
+        '<title>Synthetic page</title>'
+        '<meta name="description" content="A page used to benchmark the metadata extraction">'
+        '<meta property="og:image" content="https://example.com/preview.jpg">'
+        '<meta property="og:type" content="article">'
+        '<link rel="stylesheet" href="/style.css"><script src="/app.js"></script></head><body>'
+    )
+    paragraph = '<div class="row"><p>Lorem ipsum <a href="/x">dolor</a> sit amet, <b>consectetur</b>.</p></div>'
+    body = paragraph * (body_kb * 1024 // len(paragraph) + 1)
+    return (head + body + '</body></html>').encode('utf-8')
+
+
+def load_corpus(corpus):
+    if corpus is None:
+        pages = [(f'synthetic-{size}kb', synthetic_page(size)) for size in (20, 200, 2000)]
+        pages.append(('synthetic-heavy-head', synthetic_page(200, head_kb=300)))
+        return pages
+    return [(path.name, path.read_bytes()) for path in sorted(Path(corpus).glob('*.htm*'))]
+
+
+def measure(extract, html, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        extract(html)
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    extract(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', help='Directory with saved *.html pages.')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    implementations = [('bs4 full tree', soup_extract), ('stream html.parser', streaming_extract('html.parser'))]
+    if etree is not None:
+        implementations.append(('stream lxml', streaming_extract('lxml')))
+
+    print(f"{'page':<24}{'size':>10}  {'implementation':<20}{'median ms':>12}{'peak KiB':>12}")
+    for name, html in load_corpus(args.corpus):
+        for label, extract in implementations:
+            seconds, peak = measure(extract, html, args.repeat)
+            print(f'{name[:23]:<24}{len(html) // 1024:>8}KB  {label:<20}{seconds * 1000:>12.2f}{peak // 1024:>12}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark of the JSON and MessagePack renderers and parsers.
+
+Compares DRF's `JSONRenderer`/`JSONParser` (the standard `json` module) with `ORJSONRenderer`/`ORJSONParser` from
+`config.renderers` and `config.parsers`, and with MessagePack if the `msgpack` package is installed, on a page
+of the link list and on the body and the response of a bulk creation.
+
+Usage:
+    python benchmarks/bench_renderers.py [--page-size N] [--bulk-items N] [--repeat N]
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from rest_framework.parsers import JSONParser  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from config.parsers import MessagePackParser, ORJSONParser  # noqa: E402
+from config.renderers import MessagePackRenderer, ORJSONRenderer, msgpack, orjson  # noqa: E402
+
+PARSER_CONTEXT = {'encoding': 'utf-8'}
+
+
+def link_page(size):
+    created = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+    results = [{
+        'pk': 1000 + i,
+        'title': f'Страница {i} — заголовок статьи',
+        'description': 'Краткое описание страницы, взятое из meta description. ' * 3,
+        'url': f'https://example.com/articles/{i}?utm_source=newsletter',
+        'preview': f'http://localhost/media/link_previews/{i}.png',
+        'preview_thumbnail': f'http://localhost/media/link_previews/{i}_thumb.png',
+        'type': 'article',
+        'metadata_status': 'done',
+        'created_at': created - timedelta(minutes=i),
+        'updated_at': (created - timedelta(seconds=i)).isoformat().replace('+00:00', 'Z'),
+        'collection': [1, 2, 3],
+        'owner': 3,
+    } for i in range(size)]
+    return {'count': 1000, 'next': 'http://localhost/links/links_list/?page=2', 'previous': None, 'results': results,
+            'facets': {'type': {'article': 800, 'website': 200}, 'collection': {1: 50, 2: 30}}}
+
+
+def bulk_response(size):
+    results = [{'index': i, 'status': 'created', 'pk': 5000 + i, 'url': f'https://example.com/bulk/{i}'}
+               for i in range(size)]
+    return {'created': size, 'exists': 0, 'duplicate': 0, 'invalid': 0, 'results': results}
+
+
+def bulk_body(size):
+    return [{'url': f'https://example.com/bulk/{i}'} if i % 2 else f'https://example.com/bulk/{i}'
+            for i in range(size)]
+
+
+def measure(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--page-size', type=int, default=50, help='number of links on a page')
+    parser.add_argument('--bulk-items', type=int, default=1000, help='number of items of a bulk creation')
+    parser.add_argument('--repeat', type=int, default=500, help='number of measured runs per case')
+    args = parser.parse_args()
+    if orjson is None:
+        print('orjson is not installed: ORJSONRenderer and ORJSONParser fall back to the standard json module')
+
+    documents = {'link page': link_page(args.page_size), 'bulk response': bulk_response(args.bulk_items)}
+    renderers = [('JSONRenderer', JSONRenderer()), ('ORJSONRenderer', ORJSONRenderer())]
+    parsers = [('JSONParser', JSONParser(), JSONRenderer()), ('ORJSONParser', ORJSONParser(), JSONRenderer())]
+    if msgpack is not None:
+        renderers.append(('MessagePackRenderer', MessagePackRenderer()))
+        parsers.append(('MessagePackParser', MessagePackParser(), MessagePackRenderer()))
+
+    for name, data in documents.items():
+        assert JSONRenderer().render(data) == ORJSONRenderer().render(data), f'the JSON of the {name} differs'
+    body = bulk_body(args.bulk_items)
+    encoded = JSONRenderer().render(body)
+    assert JSONParser().parse(io.BytesIO(encoded), None, PARSER_CONTEXT) == \
+        ORJSONParser().parse(io.BytesIO(encoded), None, PARSER_CONTEXT), 'the parsed bulk body differs'
+
+    print(f'median of {args.repeat} runs')
+    print(f'{"case":<48} {"ms":>8} {"bytes":>9}')
+    for document, data in documents.items():
+        for name, renderer in renderers:
+            seconds = measure(lambda: renderer.render(data), args.repeat)
+            print(f'{f"render {document}, {name}":<48} {seconds * 1000:>8.3f} {len(renderer.render(data)):>9}')
+    for name, body_parser, body_renderer in parsers:
+        raw = body_renderer.render(body)
+        seconds = measure(lambda: body_parser.parse(io.BytesIO(raw), None, PARSER_CONTEXT), args.repeat)
+        print(f'{f"parse bulk body, {name}":<48} {seconds * 1000:>8.3f} {len(raw):>9}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+import hashlib
+
+from django.db import transaction
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+
+def _etag(*parts):
+    return quote_etag(hashlib.sha256(':'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:40])
+
+
+def _timestamp(moment):
+    return int(moment.timestamp()) if moment else None
+
+
+def object_validators(instance, request):
+    """
+    Return the validators of the representation of an object, computed from its `updated_at`.
+
+    Args:
+        instance (Model): The object with the `updated_at` field.
+        request (Request): The incoming request, its response format is a part of the ETag.
+
+    Returns:
+        tuple: The strong ETag and the `Last-Modified` timestamp.
+    """
+    return (_etag(instance._meta.label, instance.pk, instance.updated_at.isoformat(), request.accepted_renderer.format),
+            _timestamp(instance.updated_at))
+
+
+def set_validators(response, etag, last_modified):
+    """
+    Add the `ETag` and `Last-Modified` headers to a response.
+
+    Args:
+        response (HttpResponse): The response.
+        etag (str): The ETag.
+        last_modified (int): The timestamp, or None.
+
+    Returns:
+        HttpResponse: The response.
+    """
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+class ConditionalRequestMixin:
+    """
+    Mixin adding validators and conditional requests to the generic views of models with `updated_at`.
+
+    Detail responses get a strong `ETag` and `Last-Modified` from `updated_at` of the object. A GET with a matching
+    `If-None-Match` or an `If-Modified-Since` not older than the data gets 304 Not Modified before the data
+    is serialized. List responses get only the `ETag` computed from their content by `ConditionalGetMiddleware`,
+    without a query: deleting a row does not change the latest `updated_at` of a list, so a list has no
+    `Last-Modified`.
+    An update with `If-Match` or `If-Unmodified-Since` is checked against the current version of the object,
+    locked for the time of the update, and gets 412 Precondition Failed if the object was changed meanwhile,
+    so concurrent clients do not overwrite each other's changes.
+
+    Methods:
+        retrieve: Overrides the `retrieve` method to answer 304 if the object has not changed.
+        update: Overrides the `update` method to check the preconditions of the request.
+        perform_update: Overrides the `perform_update` method to keep the updated object for its validators.
+    """
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Overrides the `retrieve` method to answer 304 if the object has not changed.
+
+        Args:
+            request (Request): The incoming request.
+
+        Returns:
+            Response: The object, or 304 Not Modified.
+        """
+        instance = self.get_object()
+        etag, last_modified = object_validators(instance, request)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = Response(self.get_serializer(instance).data)
+        return set_validators(response, etag, last_modified)
+
+    def update(self, request, *args, **kwargs):
+        """
+        Overrides the `update` method to check the preconditions of the request.
+
+        Args:
+            request (Request): The incoming request.
+
+        Returns:
+            Response: The updated object, or 412 Precondition Failed.
+        """
+        if 'HTTP_IF_MATCH' not in request.META and 'HTTP_IF_UNMODIFIED_SINCE' not in request.META:
+            response = super().update(request, *args, **kwargs)
+        else:
+            with transaction.atomic():
+                instance = self.get_object()
+                current = type(instance).objects.select_for_update().only('pk', 'updated_at').get(pk=instance.pk)
+                etag, last_modified = object_validators(current, request)
+                failed = get_conditional_response(request, etag=etag, last_modified=last_modified)
+                if failed is not None:
+                    return failed
+                response = super().update(request, *args, **kwargs)
+        updated = getattr(self, 'updated_instance', None)
+        if updated is not None and response.status_code == 200:
+            set_validators(response, *object_validators(updated, request))
+        return response
+
+    def perform_update(self, serializer):
+        """
+        Overrides the `perform_update` method to keep the updated object for its validators.
+
+        Args:
+            serializer (Serializer): The serializer with the validated data.
+        """
+        super().perform_update(serializer)
+        self.updated_instance = serializer.instance
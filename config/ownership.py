@@ -0,0 +1,50 @@
+from django.db import models
+
+
+class OwnedQuerySet(models.QuerySet):
+    """
+    QuerySet of a model with the `owner` field.
+
+    Methods:
+        owned_by: Returns the objects the user may access.
+    """
+
+    def owned_by(self, user):
+        """
+        Returns the objects the user may access: all objects for a superuser, the own objects for other users.
+
+        The condition on `owner_id` is a part of the query, so an object of another user is never loaded,
+        and together with the primary key or the other fields of an index on `(owner, ...)` the lookup
+        stays a single indexed query.
+
+        Args:
+            user (User): The current user.
+
+        Returns:
+            QuerySet: The objects of the user.
+        """
+        if user.is_superuser:
+            return self
+        return self.filter(owner_id=user.pk)
+
+
+class OwnerScopedMixin:
+    """
+    Mixin restricting a generic view to the objects of the current user, see `OwnedQuerySet.owned_by`.
+
+    The object of another user is not found, so a detail, update or delete request for it gets 404 Not Found
+    without the object being read, and the permission classes compare the owner of an object already scoped
+    to the user.
+
+    Methods:
+        get_queryset: Overrides the `get_queryset` method to keep only the objects of the user.
+    """
+
+    def get_queryset(self):
+        """
+        Overrides the `get_queryset` method to keep only the objects of the user.
+
+        Returns:
+            QuerySet: The objects of the user.
+        """
+        return super().get_queryset().owned_by(self.request.user)
@@ -0,0 +1,121 @@
+import io
+import json
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+from config.renderers import MessagePackRenderer, ORJSONRenderer, msgpack, orjson
+
+# orjson читает целые числа больше 64 бит как float, поэтому документы с 19 цифрами подряд разбирает модуль json.
+# Цифры заменяются на '0', остальные байты на пробелы, и ищется подстрока: это быстрее регулярного выражения
+_DIGITS_TABLE = bytes(ord('0') if ord('0') <= byte <= ord('9') else ord(' ') for byte in range(256))
+_LONG_NUMBER = b'0' * 19
+
+
+def _orjson_compatible(data):
+    if orjson is None:
+        return False
+    if isinstance(data, str):
+        data = data.encode('utf-8', 'surrogatepass')
+    return _LONG_NUMBER not in data.translate(_DIGITS_TABLE)
+
+
+def json_loads(data):
+    """
+    Parse a JSON document with `orjson`, or with the standard `json` module if `orjson` rejects it.
+
+    Documents `orjson` rejects (e.g. lone surrogates) or reads differently (integers beyond 64 bits) are parsed
+    by `json`, so every document gives the same result as before.
+
+    Args:
+        data (bytes | str): The JSON document.
+
+    Raises:
+        ValueError: If the document is not valid JSON.
+
+    Returns:
+        object: The parsed value.
+    """
+    if _orjson_compatible(data):
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+
+class ORJSONParser(JSONParser):
+    """
+    JSON parser decoding with `orjson`, see `config.renderers.ORJSONRenderer`.
+
+    The result is the same as that of `JSONParser`: a body `orjson` rejects or reads differently, see `json_loads`,
+    or a body in another charset than UTF-8 is parsed by `JSONParser` itself, as is everything if `orjson`
+    is not installed.
+
+    Methods:
+        parse: Parses the request body as JSON.
+    """
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """
+        Parses the request body as JSON.
+
+        Args:
+            stream (IO): The request body.
+            media_type (str): The media type of the request.
+            parser_context (dict): The context of the parser.
+
+        Raises:
+            ParseError: If the body is not valid JSON.
+
+        Returns:
+            object: The parsed data.
+        """
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', 'utf-8')
+        if orjson is None or encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+        body = stream.read() if stream is not None else b''
+        if _orjson_compatible(body):
+            try:
+                return orjson.loads(body)
+            except orjson.JSONDecodeError:
+                pass
+        return super().parse(io.BytesIO(body), media_type, parser_context)
+
+
+class MessagePackParser(BaseParser):
+    """
+    Parser of MessagePack request bodies of internal clients, `Content-Type: application/msgpack`.
+
+    Registered only if the `msgpack` package is installed.
+
+    Attributes:
+        media_type (str): The media type handled by the parser.
+
+    Methods:
+        parse: Parses the request body as MessagePack.
+    """
+    media_type = 'application/msgpack'
+    renderer_class = MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """
+        Parses the request body as MessagePack.
+
+        Args:
+            stream (IO): The request body.
+            media_type (str): The media type of the request.
+            parser_context (dict): The context of the parser.
+
+        Raises:
+            ParseError: If the body is not valid MessagePack.
+
+        Returns:
+            object: The parsed data.
+        """
+        try:
+            return msgpack.unpackb(stream.read(), raw=False, strict_map_key=False)
+        except (ValueError, msgpack.UnpackException) as e:
+            raise ParseError(f'Ошибка разбора MessagePack: {e}')
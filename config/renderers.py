@@ -0,0 +1,148 @@
+import math
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speedup
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack is needed only by the internal clients
+    msgpack = None
+
+# Значения, которые DRF кодирует сам: даты и время, Decimal, ленивые строки, QuerySet и т. п.
+_encoder = JSONEncoder()
+
+
+def encode_default(obj):
+    """
+    Convert a value unknown to the encoder exactly as `rest_framework.utils.encoders.JSONEncoder` does.
+
+    Args:
+        obj (object): The value.
+
+    Raises:
+        TypeError: If the value cannot be encoded.
+
+    Returns:
+        object: The value made of the types the encoder knows.
+    """
+    return _encoder.default(obj)
+
+
+# Типы значений, которые не нужно проверять на NaN и бесконечность: так обход страницы почти не стоит времени
+_PLAIN_TYPES = frozenset((str, int, bool, type(None)))
+
+
+def _encode_finite(obj):
+    value = _encoder.default(obj)
+    if isinstance(value, float) and not math.isfinite(value):
+        raise TypeError('Out of range float values are not JSON compliant')
+    return value
+
+
+def _has_non_finite(data, check_keys):
+    # orjson записывает NaN и бесконечность как null, поэтому при null в документе данные проверяются отдельно;
+    # в стек попадают только контейнеры, остальные значения проверяются на месте
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            if check_keys and any(isinstance(key, float) and not math.isfinite(key) for key in value):
+                return True
+            value = value.values()
+        for item in value:
+            if type(item) in _PLAIN_TYPES:
+                continue
+            if isinstance(item, float):
+                if not math.isfinite(item):
+                    return True
+            elif isinstance(item, (dict, list, tuple)):
+                stack.append(item)
+    return False
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSON renderer encoding with `orjson`, several times faster than the standard `json` module.
+
+    The output is the same as that of `JSONRenderer`: compact, UTF-8, with `\\u2028` and `\\u2029` escaped.
+    Dates and times, decimals and the other values `orjson` does not handle the same way are converted by the encoder
+    of DRF, see `encode_default`. Indented output (the browsable API, `Accept: application/json; indent=4`),
+    non-default `UNICODE_JSON`/`COMPACT_JSON` settings and values `orjson` cannot encode, e.g. integers beyond 64 bits,
+    are rendered by `JSONRenderer` itself, as is everything if `orjson` is not installed. `orjson` writes NaN
+    and infinity as null, so data with such floats is rendered by `JSONRenderer` as well, which rejects them
+    with `STRICT_JSON`. The only difference is the spelling of floats in the exponent notation, e.g. `1e-7` instead
+    of `1e-07`, which denote the same number.
+
+    Methods:
+        render: Renders the data into JSON.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """
+        Renders the data into JSON.
+
+        Args:
+            data (object): The data of the response.
+            accepted_media_type (str): The media type accepted by the client.
+            renderer_context (dict): The context of the renderer.
+
+        Returns:
+            bytes: The JSON document.
+        """
+        if (orjson is None or data is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=_encode_finite,
+                               option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+                               | orjson.OPT_PASSTHROUGH_DATACLASS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if b'null' in ret and _has_non_finite([data], b'"null":' in ret):
+            return super().render(data, accepted_media_type, renderer_context)
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renderer of MessagePack for internal clients, selected with `Accept: application/msgpack`.
+
+    The values are those of the JSON representation: dates and times are strings, decimals are floats,
+    see `encode_default`. Registered only if the `msgpack` package is installed.
+
+    Attributes:
+        media_type (str): The media type of the renderer.
+        format (str): The format suffix of the renderer.
+        charset (None): MessagePack is a binary format.
+        render_style (str): Tells the browsable API that the content is binary.
+
+    Methods:
+        render: Renders the data into MessagePack.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """
+        Renders the data into MessagePack.
+
+        Args:
+            data (object): The data of the response.
+            accepted_media_type (str): The media type accepted by the client.
+            renderer_context (dict): The context of the renderer.
+
+        Returns:
+            bytes: The MessagePack document.
+        """
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=encode_default, use_bin_type=True)
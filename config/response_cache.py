@@ -0,0 +1,164 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+from config import settings
+
+KEY_PREFIX = 'response-cache'
+VALIDATOR_HEADERS = ('ETag', 'Last-Modified')
+
+
+def _version_key(owner_id):
+    return f'{KEY_PREFIX}:version:{owner_id}'
+
+
+def _initial_version():
+    # Версия, вытесненная из кэша, начинается с текущего времени в микросекундах, то есть с большего значения,
+    # чем все прежние версии, поэтому старые ответы не становятся снова актуальными
+    return time.time_ns() // 1000
+
+
+def _count(name):
+    key = f'{KEY_PREFIX}:{name}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def get_owner_version(owner_id):
+    """
+    Return the current version of the data of a user.
+
+    Args:
+        owner_id (int): The primary key of the user.
+
+    Returns:
+        int: The version.
+    """
+    key = _version_key(owner_id)
+    version = cache.get(key)
+    if version is None:
+        version = _initial_version()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_owner_version(owner_id):
+    """
+    Make all cached responses of a user stale by changing the version of the user data.
+
+    The version is changed with one atomic increment, whatever the number of cached responses;
+    the stale responses are not deleted but expire after `RESPONSE_CACHE['TIMEOUT']` seconds.
+    Inside a transaction the version is changed after the commit, so a response read before the commit
+    is never stored under the new version.
+
+    Args:
+        owner_id (int): The primary key of the user.
+    """
+    if owner_id is None:
+        return
+
+    def bump():
+        try:
+            cache.incr(_version_key(owner_id))
+        except ValueError:
+            cache.add(_version_key(owner_id), _initial_version(), timeout=None)
+
+    transaction.on_commit(bump)
+
+
+def get_response_cache_stats():
+    """
+    Return the numbers of cache hits and misses of the read views since the cache was started.
+
+    Returns:
+        dict: The 'hits', the 'misses' and the 'hit_ratio', None if nothing was requested yet.
+    """
+    hits = cache.get(f'{KEY_PREFIX}:hits', 0)
+    misses = cache.get(f'{KEY_PREFIX}:misses', 0)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_ratio': round(hits / total, 4) if total else None}
+
+
+class CachedResponseMixin:
+    """
+    Mixin caching the successful GET responses of a read view for every user.
+
+    A response is stored under the key of the user, the version of the user data, the view, the response format
+    and the full URL with its query parameters. Every change of the links, collections or profile of a user bumps
+    the version (see `bump_owner_version`), so the next request misses the cache and reads the database again.
+    Superusers see the data of all users and are never served from the cache.
+    The responses carry the `X-Cache: HIT` or `X-Cache: MISS` header. The `ETag` and `Last-Modified` validators
+    are stored with the response, so a conditional request is answered with 304 from the cache as well.
+
+    Methods:
+        initial: Overrides the `initial` method to answer the request from the cache if possible.
+        finalize_response: Overrides the `finalize_response` method to store a successful response in the cache.
+    """
+
+    def _response_cache_key(self, request):
+        user = request.user
+        if (not settings.RESPONSE_CACHE['ENABLED'] or request.method != 'GET'
+                or not user.is_authenticated or user.is_superuser):
+            return None
+        url_hash = hashlib.sha256(request.build_absolute_uri().encode('utf-8')).hexdigest()
+        return (f'{KEY_PREFIX}:{user.pk}:{get_owner_version(user.pk)}:{type(self).__name__}:'
+                f'{request.accepted_renderer.format}:{url_hash}')
+
+    def initial(self, request, *args, **kwargs):
+        """
+        Overrides the `initial` method to answer the request from the cache if possible.
+
+        The cache is looked up after the authentication and permission checks, so a cached response is never
+        returned to a user who is not allowed to get it.
+
+        Args:
+            request (Request): The incoming request.
+        """
+        super().initial(request, *args, **kwargs)
+        self.response_cache_key = self._response_cache_key(request)
+        if self.response_cache_key is None:
+            return
+        cached = cache.get(self.response_cache_key)
+        if cached is None:
+            _count('misses')
+            return
+        _count('hits')
+        self.response_cache_key = None
+        data, headers = cached
+        headers = {**headers, 'X-Cache': 'HIT'}
+        not_modified = get_conditional_response(request, etag=headers.get('ETag'),
+                                                last_modified=parse_http_date_safe(headers.get('Last-Modified', '')))
+        # Обработчик запроса заменяется сохраненным ответом, запросы к базе не выполняются
+        if not_modified is not None:
+            for header, value in headers.items():
+                not_modified[header] = value
+            self.get = lambda *args, **kwargs: not_modified
+        else:
+            self.get = lambda *args, **kwargs: Response(data, headers=headers)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """
+        Overrides the `finalize_response` method to store a successful response in the cache.
+
+        Args:
+            request (Request): The incoming request.
+            response (Response): The response of the view.
+
+        Returns:
+            Response: The response.
+        """
+        key = getattr(self, 'response_cache_key', None)
+        if key and isinstance(response, Response) and response.status_code == 200:
+            headers = {header: response[header] for header in VALIDATOR_HEADERS if response.has_header(header)}
+            cache.set(key, (response.data, headers), settings.RESPONSE_CACHE['TIMEOUT'])
+            response['X-Cache'] = 'MISS'
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 import os
+from importlib.util import find_spec
 from pathlib import Path
 from datetime import timedelta
 from dotenv import load_dotenv
@@ -58,6 +59,7 @@ INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + USER_APPS
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'django.middleware.http.ConditionalGetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -156,19 +158,152 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'users.User'
 
 # Settings for authentication DRF
+# MessagePack is offered to the internal clients only if the `msgpack` package is installed
+MSGPACK_ENABLED = find_spec('msgpack') is not None
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
-    ]
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'config.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        *(['config.renderers.MessagePackRenderer'] if MSGPACK_ENABLED else []),
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'config.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+        *(['config.parsers.MessagePackParser'] if MSGPACK_ENABLED else []),
+    ],
 }
 
 # Token Expiration Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=10080),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
+    'TOKEN_OBTAIN_SERIALIZER': 'users.serializers.token.UserTokenObtainPairSerializer',
+}
+
+# Settings for background fetching of link page data
+LINK_METADATA_QUEUE = {
+    'CONCURRENCY': int(os.getenv('LINK_METADATA_CONCURRENCY') or 4),
+    'MAX_ATTEMPTS': int(os.getenv('LINK_METADATA_MAX_ATTEMPTS') or 5),
+    'RETRY_DELAY': 30,  # seconds, doubled after every failed attempt
+    'POLL_INTERVAL': 2,  # seconds between checks of an empty queue
+    'LOCK_TIMEOUT': 600,  # seconds after which a running job of a dead worker is taken again
+}
+
+# Settings for the HTTP client used to fetch link pages and previews
+LINK_FETCH = {
+    'CONNECT_TIMEOUT': 3.05,  # seconds
+    'READ_TIMEOUT': 10,  # seconds between two received bytes
+    'DEADLINE': 20,  # seconds for the whole response
+    'MAX_REDIRECTS': 5,
+    'MAX_BYTES': 5 * 1024 * 1024,
+    'MAX_HEAD_BYTES': 512 * 1024,  # the page is parsed only up to </head> or this many bytes
+    'POOL_CONNECTIONS': 50,  # number of hosts with kept-alive connections
+    'POOL_MAXSIZE': 10,  # kept-alive connections per host
+    'USER_AGENT': (os.getenv('LINK_FETCH_USER_AGENT')
+                   or 'URL-Storage/0.1 (+https://github.com/pavel-akulich/URL_storage)'),
+}
+
+# Settings for the periodic refresh of link page data
+LINK_METADATA_REFRESH = {
+    'MAX_AGE': int(os.getenv('LINK_METADATA_MAX_AGE') or 30 * 24 * 60 * 60),  # seconds, older page data is refreshed
+    'BATCH_SIZE': 200,  # links refreshed and checkpointed at a time
+}
+
+# Settings for concurrent fetching of many pages, see links.async_fetch
+LINK_ASYNC_FETCH = {
+    'CONCURRENCY': 100,  # requests in progress in total
+    'PER_DOMAIN_CONCURRENCY': 2,  # requests in progress to one site
+    'MIN_DOMAIN_INTERVAL': 1.0,  # seconds between the starts of two requests to one site
+    'RESPECT_ROBOTS_TXT': True,
+    'ROBOTS_CACHE_TTL': 60 * 60,  # seconds
+}
+
+# Cache of the application. The local-memory cache is private to a process: when the API runs in several processes
+# or next to the metadata worker, set a shared cache, e.g. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# and CACHE_LOCATION=redis://localhost:6379/0 (requires the `redis` package)
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND') or 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': os.getenv('CACHE_LOCATION') or 'url-storage',
+    }
+}
+# Whether the cache is seen by all processes: the caches below keep the entries in the memory of one process,
+# so a version bumped by the metadata worker or another API process is not seen by this one
+PROCESS_LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+CACHE_IS_SHARED = CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHE_BACKENDS
+
+# Settings for the cache of the read views, see `config.response_cache`
+RESPONSE_CACHE = {
+    # The cache is enabled only with a shared cache: a process-local cache would keep serving the responses
+    # of a user after the worker changed the data of the user
+    'ENABLED': CACHE_IS_SHARED and os.getenv('RESPONSE_CACHE_ENABLED') != 'False',
+    'TIMEOUT': int(os.getenv('RESPONSE_CACHE_TIMEOUT') or 60),  # seconds a response is kept
+}
+
+# Settings for the users resolved by the JWT authentication, see `users.authentication`
+AUTH_CACHE = {
+    'TIMEOUT': int(os.getenv('AUTH_CACHE_TIMEOUT') or 30),  # seconds a user is kept
+    'TRUST_TOKEN_CLAIMS': os.getenv('AUTH_TRUST_TOKEN_CLAIMS') == 'True',  # read-only requests without the user row
+}
+
+# Settings for the page data cache shared by links with the same URL
+URL_METADATA_CACHE = {
+    'TTL': int(os.getenv('URL_METADATA_CACHE_TTL') or 7 * 24 * 60 * 60),  # seconds
+    # one hit in HIT_SAMPLE_RATE is written, as HIT_SAMPLE_RATE hits, so popular entries are not updated on every use
+    'HIT_SAMPLE_RATE': 10,
+}
+
+# Settings for link preview files
+LINK_PREVIEWS = {
+    'MAX_BYTES': 10 * 1024 * 1024,  # larger og:image downloads are aborted
+    'MAX_PIXELS': 4096 * 4096,  # larger images are rejected before decoding
+    'ALLOWED_FORMATS': ('JPEG', 'PNG', 'GIF', 'WEBP'),
+    'PREVIEW_WIDTH': 1200,
+    'THUMBNAIL_WIDTH': 320,
+    'QUALITY': 80,  # WebP quality of the preview and thumbnail
+    'GC_GRACE_PERIOD': 60 * 60,  # seconds a preview file without references is kept
+}
+
+# Settings for bulk link creation
+LINK_BULK_CREATE = {
+    'MAX_ITEMS': 10_000,  # URLs accepted in one request
+    'BATCH_SIZE': 1000,  # rows per INSERT and per IN (...) lookup
+}
+
+# Settings for bulk operations on existing links
+LINK_BULK_OPERATIONS = {
+    'MAX_OPERATIONS': 100,  # operations accepted in one request
+    'MAX_IDS': 10_000,  # link ids of all operations of one request
+    'BATCH_SIZE': 1000,  # ids per IN (...) lookup, UPDATE and DELETE
+}
+
+# Settings for the export of user links
+LINK_EXPORT = {
+    'CHUNK_SIZE': 2000,  # rows fetched from the database cursor at a time
+    'BLOCK_SIZE': 64 * 1024,  # characters sent to the client in one write
+}
+
+# Settings for the link statistics of administrators
+LINK_STATS = {
+    'TOP_USERS': 10,  # users in the leaderboard by default
+    'MAX_TOP_USERS': 100,
+    'DAYS': 30,  # days in the links per day series by default
+    'MAX_DAYS': 366,
+    # rows per day and type of `LinkDailyCounter`; the links of a user are counted in the shard `owner_id % SHARDS`,
+    # so concurrent writes of different users rarely wait for the same row. The totals are sums over the shards,
+    # so the number can be changed at any time
+    'DAILY_COUNTER_SHARDS': 16,
 }
 
 # Email server settings
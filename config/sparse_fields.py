@@ -0,0 +1,72 @@
+from rest_framework.exceptions import ValidationError
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def _names(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def get_sparse_fields(request, fields):
+    """
+    Select the fields of a representation with the `fields` and `omit` query parameters.
+
+    `?fields=pk,title,url` keeps only the listed fields, `?omit=description` drops the listed ones; both may be
+    combined. Only read requests are affected: the input of a write is always validated in full.
+
+    Args:
+        request (Request): The incoming request, or None.
+        fields (list): The names of all readable fields, in the order of the representation.
+
+    Raises:
+        ValidationError: If a parameter lists an unknown field.
+
+    Returns:
+        list: The names of the selected fields, in the order of the representation.
+    """
+    selected = list(fields)
+    if request is None or request.method not in SAFE_METHODS:
+        return selected
+    for param in (FIELDS_PARAM, OMIT_PARAM):
+        names = _names(request.query_params.get(param, ''))
+        if not names:
+            continue
+        unknown = [name for name in names if name not in fields]
+        if unknown:
+            raise ValidationError({param: [f'Неизвестные поля: {", ".join(unknown)}. '
+                                           f'Допустимые поля: {", ".join(fields)}.']})
+        if param == FIELDS_PARAM:
+            selected = [name for name in selected if name in names]
+        else:
+            selected = [name for name in selected if name not in names]
+    return selected
+
+
+class SparseFieldsetMixin:
+    """
+    Mixin letting the client select the fields of a serializer with `?fields=` and `?omit=`, see `get_sparse_fields`.
+
+    The fields that are not selected are removed from the serializer, so they are neither read from the object
+    nor converted.
+
+    Methods:
+        __init__: Removes the fields that are not selected by the request in the serializer context.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """
+        Removes the fields that are not selected by the request in the serializer context.
+        """
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return
+        if not request.query_params.get(FIELDS_PARAM) and not request.query_params.get(OMIT_PARAM):
+            return
+        readable = [name for name, field in self.fields.items() if not field.write_only]
+        selected = set(get_sparse_fields(request, readable))
+        for name in readable:
+            if name not in selected:
+                self.fields.pop(name)
@@ -1,9 +1,17 @@
+from django.shortcuts import get_object_or_404
 from rest_framework import generics
 
+from config.conditional import ConditionalRequestMixin
+from config.ownership import OwnerScopedMixin
+from config.response_cache import CachedResponseMixin
 from link_collections.models import Collection
 from link_collections.paginators import CollectionPaginator
-from link_collections.serializers.collection import CollectionSerializer
+from link_collections.serializers.collection import CollectionSerializer, prefetch_collection_links
+from links.models import Link
+from links.paginators import LinkPaginator
 from links.permissions import IsOwner
+from links.rows import LinkRowListMixin
+from links.serializers.link import LinkSerializer
 from users.permissions import IsSuperUser
 
 
@@ -32,12 +40,14 @@ class CollectionCreateAPIView(generics.CreateAPIView):
         serializer.save(owner=self.request.user)
 
 
-class CollectionListAPIView(generics.ListAPIView):
+class CollectionListAPIView(CachedResponseMixin, ConditionalRequestMixin, generics.ListAPIView):
     """
     APIView for listing Collection instances.
 
     This APIView inherits from `generics.ListAPIView` and is used to list instances of the `Collection` model.
     It uses the `CollectionSerializer` for serialization and the `CollectionPaginator` for pagination.
+    The pages of a user are served from `CachedResponseMixin` until the collections of the user change.
+    Unchanged pages are answered with 304 Not Modified, see `ConditionalRequestMixin`.
 
     Attributes:
         serializer_class (CollectionSerializer): The serializer class used for the Collection model.
@@ -59,41 +69,95 @@ class CollectionListAPIView(generics.ListAPIView):
         Overrides the `get_queryset` method to filter the queryset based on the user's permissions.
 
         If the user is a superuser, it returns all Collection instances. Otherwise, it returns only the Collection
-        instances owned by the user.
+        instances owned by the user. The links are prefetched when included, see `prefetch_collection_links`.
 
         Returns:
             QuerySet: The filtered queryset.
         """
-        if self.request.user.is_superuser:
-            return Collection.objects.all()
-        return Collection.objects.filter(owner=self.request.user)
+        return prefetch_collection_links(Collection.objects.owned_by(self.request.user), self.request)
 
 
-class CollectionRetrieveAPIView(generics.RetrieveAPIView):
+class CollectionRetrieveAPIView(CachedResponseMixin, ConditionalRequestMixin, OwnerScopedMixin,
+                                generics.RetrieveAPIView):
     """
     APIView for retrieving a single Collection instance.
 
     This APIView inherits from `generics.RetrieveAPIView` and is used to retrieve a single instance
     of the Collection model.
     It uses the `CollectionSerializer` for serialization.
+    The collection is looked up among the collections of the user, see `OwnerScopedMixin`.
+    The response is cached per user, see `CachedResponseMixin`.
+    The `ETag` and `Last-Modified` headers come from `updated_at`, see `ConditionalRequestMixin`.
 
     Attributes:
         serializer_class (CollectionSerializer): The serializer class used for the Collection model.
         queryset (QuerySet): The queryset containing all Collection model instances.
         permission_classes (list): List of permission classes required for this view.
+
+    Methods:
+        get_queryset: Overrides the `get_queryset` method to prefetch the links when they are included.
     """
     serializer_class = CollectionSerializer
     queryset = Collection.objects.all()
     permission_classes = [IsOwner | IsSuperUser]
 
+    def get_queryset(self):
+        """
+        Overrides the `get_queryset` method to prefetch the links when they are included.
+
+        Returns:
+            QuerySet: The prepared queryset of the collections of the user.
+        """
+        return prefetch_collection_links(super().get_queryset(), self.request)
+
+
+class CollectionLinksListAPIView(CachedResponseMixin, ConditionalRequestMixin, LinkRowListMixin, generics.ListAPIView):
+    """
+    APIView for listing the links of a Collection instance page by page.
+
+    This APIView inherits from `generics.ListAPIView` and replaces the full list of link primary keys
+    in the collection representation. It uses the `LinkSerializer` for serialization and the `LinkPaginator`
+    for pagination.
+    The pages are built from plain rows with only the fields selected by `?fields=`/`?omit=`,
+    see `LinkRowListMixin`, and cached per user, see `CachedResponseMixin`.
+
+    Attributes:
+        serializer_class (LinkSerializer): The serializer class used for the Link model.
+        pagination_class (LinkPaginator): The pagination class used to handle pagination for Link model instances.
+        permission_classes (list): List of permission classes required for this view.
+
+    Methods:
+        get_queryset: Returns the links of the collection after checking the permissions on the collection.
+    """
+    serializer_class = LinkSerializer
+    pagination_class = LinkPaginator
+    permission_classes = [IsOwner | IsSuperUser]
+
+    def get_queryset(self):
+        """
+        Returns the links of the collection after checking the permissions on the collection.
+
+        The collection is looked up among the collections of the user, so the collection of another user
+        is not found.
+
+        Returns:
+            QuerySet: The links of the collection.
+        """
+        collection = get_object_or_404(Collection.objects.owned_by(self.request.user), pk=self.kwargs['pk'])
+        self.check_object_permissions(self.request, collection)
+        return Link.objects.filter(collection=collection)
+
 
-class CollectionUpdateAPIView(generics.UpdateAPIView):
+class CollectionUpdateAPIView(ConditionalRequestMixin, OwnerScopedMixin, generics.UpdateAPIView):
     """
     APIView for updating a Collection instance.
 
     This APIView inherits from `generics.UpdateAPIView` and is used to update an existing instance
     of the Collection model.
     It uses the `CollectionSerializer` for serialization.
+    Only the collections of the user can be updated, see `OwnerScopedMixin`.
+    An update with `If-Match` fails with 412 if the collection was changed meanwhile,
+    see `ConditionalRequestMixin`.
 
     Attributes:
         serializer_class (CollectionSerializer): The serializer class used for the Collection model.
@@ -106,12 +170,13 @@ class CollectionUpdateAPIView(generics.UpdateAPIView):
     permission_classes = [IsOwner | IsSuperUser]
 
 
-class CollectionDestroyAPIView(generics.DestroyAPIView):
+class CollectionDestroyAPIView(OwnerScopedMixin, generics.DestroyAPIView):
     """
     APIView for deleting a Collection instance.
 
     This APIView inherits from `generics.DestroyAPIView` and is used to delete an existing instance
     of the `Collection` model.
+    Only the collections of the user can be deleted, see `OwnerScopedMixin`.
 
     Attributes:
         queryset (QuerySet): The queryset containing all Collection model instances.
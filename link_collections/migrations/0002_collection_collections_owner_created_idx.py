@@ -0,0 +1,19 @@
+# Generated by Django 5.0.4 on 2026-10-18 01:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('link_collections', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='collection',
+            index=models.Index(fields=['owner', 'created_at', 'id'], name='collections_owner_created_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-18 01:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('link_collections', '0002_collection_collections_owner_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='collection',
+            name='links_count',
+            field=models.IntegerField(default=0, verbose_name='количество ссылок'),
+        ),
+    ]
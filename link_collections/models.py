@@ -1,9 +1,10 @@
 from django.db import models
 from config import settings
-from users.models import NULLABLE
+from config.ownership import OwnedQuerySet
+from users.models import NULLABLE, CounterFieldsMixin
 
 
-class Collection(models.Model):
+class Collection(CounterFieldsMixin, models.Model):
     """
     Model representing a collection of links.
 
@@ -12,7 +13,10 @@ class Collection(models.Model):
         description (TextField): A brief description of the collection.
         created_at (DateTimeField): The date and time when the collection was created.
         updated_at (DateTimeField): The date and time when the collection was last updated.
+        links_count (IntegerField): The number of links in the collection, maintained by `links.counters`.
         owner (ForeignKey): The user who owns the collection.
+        counter_fields (tuple): The counter columns left out of the saves of the collection, see `CounterFieldsMixin`.
+        objects (Manager): The manager scoping the collections to their owner, see `OwnedQuerySet`.
 
     Methods:
         __str__: Returns a string representation of the collection.
@@ -20,14 +24,20 @@ class Collection(models.Model):
     Meta:
         verbose_name (str): The singular name of the model used in the admin interface.
         verbose_name_plural (str): The plural name of the model used in the admin interface.
+        indexes (list): The index used to paginate the collections of a user.
     """
     name = models.CharField(max_length=150, verbose_name='название коллекции')
     description = models.TextField(verbose_name='краткое описание', **NULLABLE)
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='дата и время создания')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='дата и время обновления')
+    links_count = models.IntegerField(default=0, verbose_name='количество ссылок')
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='user_collections',
                               verbose_name='владелец коллекции')
 
+    counter_fields = ('links_count',)
+
+    objects = OwnedQuerySet.as_manager()
+
     def __str__(self):
         """
         Returns a string representation of the collection.
@@ -37,3 +47,6 @@ class Collection(models.Model):
     class Meta:
         verbose_name = 'коллекция'
         verbose_name_plural = 'коллекции'
+        indexes = [
+            models.Index(fields=['owner', 'created_at', 'id'], name='collections_owner_created_idx'),
+        ]
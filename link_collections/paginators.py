@@ -1,12 +1,15 @@
 from rest_framework.pagination import PageNumberPagination
 
+from links.paginators import CursorPaginationMixin
 
-class CollectionPaginator(PageNumberPagination):
+
+class CollectionPaginator(CursorPaginationMixin, PageNumberPagination):
     """
     Paginator for the Collection model.
 
     This class is a subclass of `PageNumberPagination` and is used to paginate the `Collection` model.
-    It is used to control the pagination style for the list views.
+    It is used to control the pagination style for the list views. With `?pagination=cursor` the collections
+    are paginated by `(created_at, pk)` keys, see `links.paginators.CursorPaginationMixin`.
 
     Attributes:
         page_size (int): The default number of items to include on a page.
@@ -1,24 +1,86 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
 
+from config.sparse_fields import SparseFieldsetMixin
 from link_collections.models import Collection
 from link_collections.validators import validate_links_owner
 from links.models import Link
 
 
-class CollectionSerializer(serializers.ModelSerializer):
+def include_links(request):
+    """
+    Check whether the client asked for the primary keys of the collection links with `?include=links`.
+
+    Args:
+        request (Request): The incoming request, or None.
+
+    Returns:
+        bool: True if the links are to be included.
+    """
+    if request is None:
+        return False
+    return 'links' in request.query_params.get('include', '').split(',')
+
+
+def prefetch_collection_links(queryset, request):
+    """
+    Prepare a collection queryset for `CollectionSerializer` with a constant number of queries.
+
+    The primary keys of the links are prefetched with one query only when they are included in the response.
+
+    Args:
+        queryset (QuerySet): The collections.
+        request (Request): The incoming request.
+
+    Returns:
+        QuerySet: The prepared queryset.
+    """
+    if include_links(request):
+        queryset = queryset.prefetch_related(Prefetch('links', queryset=Link.objects.only('pk')))
+    return queryset
+
+
+class LinkPrimaryKeysField(serializers.ManyRelatedField):
+    """
+    Field of the primary keys of the collection links.
+
+    Unlike `PrimaryKeyRelatedField(many=True)`, which loads every link with a separate query, the input is only
+    checked to be a list of integers; the links are looked up all at once together with the ownership check
+    in `validate_links_owner`. The output is the list of primary keys.
+    """
+
+    def __init__(self, **kwargs):
+        self.pk_field = serializers.IntegerField(min_value=1)
+        super().__init__(child_relation=serializers.PrimaryKeyRelatedField(read_only=True), **kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        return list(dict.fromkeys(self.pk_field.run_validation(item) for item in data))
+
+
+class CollectionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for the Collection model.
 
     This serializer inherits from `serializers.ModelSerializer` and is used to serialize and deserialize instances
     of the `Collection` model.
-    It includes custom fields for `links_count` and `links`, and a custom validation method.
+    It includes a custom field for `links` and a custom validation method. `links_count` is the counter column
+    of the collection, maintained by `links.counters` and left out of the saves of the collection,
+    see `CounterFieldsMixin`.
+    The primary keys of the links are written as before, but returned only with `?include=links`;
+    the links of a collection are listed page by page at `collections/<pk>/links/`.
+    The fields of the representation can be selected with `?fields=` and `?omit=`, see `SparseFieldsetMixin`.
 
     Attributes:
-        links_count (IntegerField): A read-only field that represents the count of links in the collection.
-        links (PrimaryKeyRelatedField): A field that represents the links in the collection.
+        links (LinkPrimaryKeysField): A field that represents the links in the collection.
 
     Methods:
-        validate: Custom validation method that checks if the links belong to the user.
+        validate_links: Custom validation method that checks if the links belong to the user.
+        create: Overrides the `create` method to return the counter of links updated by the membership signals.
+        update: Overrides the `update` method to return the counter of links updated by the membership signals.
 
     Meta:
         model (Collection): The model that this serializer is for.
@@ -26,19 +88,53 @@ class CollectionSerializer(serializers.ModelSerializer):
         read_only_fields (tuple): The fields that should be read-only.
 
     Custom Fields:
-        links_count: A read-only field that represents the count of links in the collection.
         links: A field that represents the links in the collection.
     """
-    links_count = serializers.IntegerField(source='links.all.count', required=False, read_only=True)
-    links = serializers.PrimaryKeyRelatedField(many=True, queryset=Link.objects.all(), required=False)
+    links = LinkPrimaryKeysField(required=False)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if 'links' in self.fields and not include_links(self.context.get('request')):
+            self.fields['links'].write_only = True
+
+    def validate_links(self, value):
+        return validate_links_owner(value, self.context['request'].user)
+
+    def create(self, validated_data):
+        """
+        Overrides the `create` method to return the counter of links and `updated_at` changed by the membership signals.
+
+        Args:
+            validated_data (dict): The validated data.
+
+        Returns:
+            Collection: The created collection.
+        """
+        links_changed = 'links' in validated_data
+        instance = super().create(validated_data)
+        if links_changed:
+            instance.refresh_from_db(fields=['links_count', 'updated_at'])
+        return instance
+
+    def update(self, instance, validated_data):
+        """
+        Overrides the `update` method to return the counter of links and `updated_at` changed by the membership signals.
+
+        Args:
+            instance (Collection): The collection being updated.
+            validated_data (dict): The validated data.
 
-    def validate(self, data):
-        if 'links' in data:
-            validate_links_owner(data['links'], self.context['request'].user)
-        return data
+        Returns:
+            Collection: The updated collection.
+        """
+        links_changed = 'links' in validated_data
+        instance = super().update(instance, validated_data)
+        if links_changed:
+            instance.refresh_from_db(fields=['links_count', 'updated_at'])
+        return instance
 
     class Meta:
         model = Collection
         fields = (
             'pk', 'name', 'description', 'links_count', 'links', 'created_at', 'updated_at', 'owner',)
-        read_only_fields = ('owner', 'created_at', 'updated_at',)
+        read_only_fields = ('owner', 'links_count', 'created_at', 'updated_at',)
@@ -1,3 +1,202 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import serializers, status
+from rest_framework.test import APIClient
+
+from link_collections.models import Collection
+from link_collections.serializers.collection import CollectionSerializer
+from link_collections.validators import validate_links_owner
+from links.models import Link
+from users.models import User
+
+
+class CollectionLinksCounterTestCase(TestCase):
+    """
+    `Collection.links_count` follows the links of the collection and is never overwritten by a save of the collection.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create(email='collections@example.com')
+        self.links = [Link.objects.create(owner=self.owner, url=f'https://example.com/{i}') for i in range(3)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def get_links_count(self, pk):
+        response = self.client.get(f'/collections/detail/{pk}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['links_count']
+
+    def test_counter_follows_links(self):
+        links = [self.links[0].pk, self.links[1].pk]
+        response = self.client.post('/collections/create/', {'name': 'Чтение', 'links': links}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['links_count'], 2)
+        pk = response.data['pk']
+
+        response = self.client.patch(f'/collections/update/{pk}/', {'links': [link.pk for link in self.links]},
+                                     format='json')
+        self.assertEqual(response.data['links_count'], 3)
+
+        # Кэш ответов владельца сбрасывается после коммита, поэтому колбэки on_commit выполняются сразу
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/links/delete/{self.links[2].pk}/')
+        self.assertEqual(self.get_links_count(pk), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/collections/update/{pk}/', {'links': []}, format='json')
+        self.assertEqual(self.get_links_count(pk), 0)
+
+    def test_patch_keeps_concurrent_change(self):
+        collection = Collection.objects.create(owner=self.owner, name='Чтение')
+
+        def add_link(serializer, attrs):
+            # Ссылка добавляется, когда коллекция уже загружена запросом
+            self.links[0].collection.add(collection)
+            return attrs
+
+        with mock.patch.object(CollectionSerializer, 'validate', autospec=True, side_effect=add_link):
+            response = self.client.patch(f'/collections/update/{collection.pk}/', {'name': 'Позже'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        collection.refresh_from_db()
+        self.assertEqual((collection.name, collection.links_count), ('Позже', 1))
+
+
+class CollectionConditionalRequestTestCase(TestCase):
+    """
+    The validators of the collection responses.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create(email='collection-etag@example.com')
+        self.collection = Collection.objects.create(owner=self.owner, name='Чтение')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def test_not_modified_and_precondition_failed(self):
+        response = self.client.get(f'/collections/detail/{self.collection.pk}/')
+        etag = response['ETag']
+        response = self.client.get(f'/collections/detail/{self.collection.pk}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.patch(f'/collections/update/{self.collection.pk}/', {'name': 'Позже'},
+                                     HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.patch(f'/collections/update/{self.collection.pk}/', {'name': 'Никогда'},
+                                     HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.collection.refresh_from_db()
+        self.assertEqual(self.collection.name, 'Позже')
+
+
+class CollectionOwnershipTestCase(TestCase):
+    """
+    The collections of another user are not found, and the links of another user cannot be added to a collection.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create(email='owner@example.com')
+        self.other = User.objects.create(email='other@example.com')
+        self.collection = Collection.objects.create(owner=self.owner, name='Чтение')
+        self.link = Link.objects.create(owner=self.owner, url='https://example.com/page')
+        self.link.collection.add(self.collection)
+        self.client = APIClient()
+        self.client.force_authenticate(self.other)
+
+    def test_other_user_gets_404(self):
+        for method, url in (('get', f'/collections/detail/{self.collection.pk}/'),
+                            ('get', f'/collections/{self.collection.pk}/links/'),
+                            ('patch', f'/collections/update/{self.collection.pk}/'),
+                            ('delete', f'/collections/delete/{self.collection.pk}/')):
+            with self.subTest(method=method, url=url):
+                response = getattr(self.client, method)(url, {'name': 'Чужая'})
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertTrue(Collection.objects.filter(pk=self.collection.pk, name='Чтение').exists())
+
+    def test_links_of_other_user(self):
+        response = self.client.post('/collections/create/', {'name': 'Чужие', 'links': [self.link.pk]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Collection.objects.filter(owner=self.other).exists())
+
+    def test_list(self):
+        response = self.client.get('/collections/collection_list/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [])
+
+
+class CollectionQueryCountTestCase(TestCase):
+    """
+    The number of queries of the collection views does not depend on the number of collections and links.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create(email='queries@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def add_collections(self, count, links_per_collection):
+        for i in range(count):
+            collection = Collection.objects.create(owner=self.owner, name=f'Коллекция {i}')
+            links = [Link.objects.create(owner=self.owner, url=f'https://example.com/{collection.pk}/{j}')
+                     for j in range(links_per_collection)]
+            collection.links.add(*links)
+        return collection
+
+    def count_queries(self, url):
+        # Кэш ответов очищается, чтобы каждый запрос дошел до базы
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def test_list_and_detail(self):
+        collection = self.add_collections(2, 2)
+        urls = ['/collections/collection_list/', f'/collections/detail/{collection.pk}/',
+                f'/collections/{collection.pk}/links/']
+        expected = [self.count_queries(url) for url in urls]
+
+        collection = self.add_collections(8, 15)
+        urls = ['/collections/collection_list/', f'/collections/detail/{collection.pk}/',
+                f'/collections/{collection.pk}/links/']
+        for url, queries in zip(urls, expected):
+            with self.subTest(url=url):
+                cache.clear()
+                with self.assertNumQueries(queries):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(f'/collections/{collection.pk}/links/')
+        self.assertEqual(len(response.data['results']), 15)
+
+
+class ValidateLinksOwnerTestCase(TestCase):
+    """
+    `validate_links_owner` checks all links of a collection with one query.
+    """
+
+    def setUp(self):
+        self.owner = User.objects.create(email='validator@example.com')
+        self.other = User.objects.create(email='validator-other@example.com')
+        self.links = [Link.objects.create(owner=self.owner, url=f'https://example.com/{i}') for i in range(20)]
+        self.other_link = Link.objects.create(owner=self.other, url='https://example.com/other')
+
+    def test_own_links(self):
+        link_ids = [link.pk for link in self.links]
+        with self.assertNumQueries(1):
+            self.assertEqual(validate_links_owner(link_ids, self.owner), link_ids)
+        with self.assertNumQueries(0):
+            self.assertEqual(validate_links_owner([], self.owner), [])
 
-# Create your tests here.
+    def test_other_and_missing_links(self):
+        missing = self.other_link.pk + 1000
+        with self.assertNumQueries(1), self.assertRaises(serializers.ValidationError) as raised:
+            validate_links_owner([self.links[0].pk, self.other_link.pk, missing], self.owner)
+        message = str(raised.exception.detail[0])
+        self.assertTrue(message.endswith(f': {self.other_link.pk}, {missing}.'), message)
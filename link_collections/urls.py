@@ -1,7 +1,7 @@
 from django.urls import path
 
 from link_collections.api_views.collection import CollectionCreateAPIView, CollectionListAPIView, \
-    CollectionRetrieveAPIView, CollectionUpdateAPIView, CollectionDestroyAPIView
+    CollectionRetrieveAPIView, CollectionUpdateAPIView, CollectionDestroyAPIView, CollectionLinksListAPIView
 from link_collections.apps import LinkCollectionsConfig
 
 app_name = LinkCollectionsConfig.name
@@ -10,6 +10,7 @@ urlpatterns = [
     path('create/', CollectionCreateAPIView.as_view(), name='collection-create'),
     path('collection_list/', CollectionListAPIView.as_view(), name='collection-list'),
     path('detail/<int:pk>/', CollectionRetrieveAPIView.as_view(), name='collection-detail'),
+    path('<int:pk>/links/', CollectionLinksListAPIView.as_view(), name='collection-links'),
     path('update/<int:pk>/', CollectionUpdateAPIView.as_view(), name='collection-update'),
     path('delete/<int:pk>/', CollectionDestroyAPIView.as_view(), name='collection-delete'),
 ]
@@ -1,20 +1,33 @@
 from rest_framework import serializers
 
+from links.models import Link
 
-def validate_links_owner(links, owner):
+
+def validate_links_owner(link_ids, owner):
     """
     Validate that all links belong to the specified owner.
 
-    This function is used to validate that all links in the provided list are owned by the specified user.
-    If any link does not belong to the user, a `serializers.ValidationError` is raised.
+    This function is used to validate that all links in the provided list exist and are owned by the specified user.
+    The check is a single `WHERE id IN (...) AND owner_id = ...` query. If any link does not exist or does not
+    belong to the user, a `serializers.ValidationError` listing the offending primary keys is raised.
 
     Args:
-        links (list): A list of Link instances.
+        link_ids (list): A list of Link primary keys.
         owner (User): The user instance to check against.
 
     Raises:
-        serializers.ValidationError: If any link in the list does not belong to the specified owner.
+        serializers.ValidationError: If any link in the list does not exist or does not belong to the specified owner.
+
+    Returns:
+        list: The validated primary keys.
     """
-    for link in links:
-        if link.owner != owner:
-            raise serializers.ValidationError("Вы не можете добавлять свои ссылки в чужие коллекции.")
+    if not link_ids:
+        return []
+    owned = set(Link.objects.filter(pk__in=link_ids, owner=owner).values_list('pk', flat=True))
+    offending = [link_id for link_id in link_ids if link_id not in owned]
+    if offending:
+        raise serializers.ValidationError(
+            "Вы не можете добавлять в коллекцию чужие или несуществующие ссылки: "
+            f"{', '.join(str(link_id) for link_id in offending)}."
+        )
+    return link_ids
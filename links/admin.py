@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from links.models import Link
+from links.models import Link, LinkMetadataJob, PreviewBlob, UrlMetadata
 
 
 @admin.register(Link)
@@ -17,4 +17,42 @@ class LinkAdmin(admin.ModelAdmin):
     Customization:
         list_display: Specifies the fields to display in the list view of the admin.
     """
-    list_display = ('pk', 'title', 'description', 'url', 'preview', 'type', 'created_at', 'updated_at', 'owner',)
+    list_display = ('pk', 'title', 'description', 'url', 'preview', 'type', 'metadata_status', 'created_at',
+                    'updated_at', 'owner',)
+
+
+@admin.register(LinkMetadataJob)
+class LinkMetadataJobAdmin(admin.ModelAdmin):
+    """
+    Admin model for the LinkMetadataJob model.
+
+    Attributes:
+        list_display (tuple): A tuple of field names to display as columns on the change list page of the admin.
+        list_filter (tuple): A tuple of field names used to filter the change list page of the admin.
+    """
+    list_display = ('pk', 'link', 'status', 'attempts', 'run_after', 'last_error', 'updated_at',)
+    list_filter = ('status',)
+
+
+@admin.register(UrlMetadata)
+class UrlMetadataAdmin(admin.ModelAdmin):
+    """
+    Admin model for the UrlMetadata model.
+
+    Attributes:
+        list_display (tuple): A tuple of field names to display as columns on the change list page of the admin.
+        search_fields (tuple): A tuple of field names used to search on the change list page of the admin.
+    """
+    list_display = ('pk', 'url', 'title', 'type', 'fetched_at', 'expires_at', 'hits', 'misses',)
+    search_fields = ('url',)
+
+
+@admin.register(PreviewBlob)
+class PreviewBlobAdmin(admin.ModelAdmin):
+    """
+    Admin model for the PreviewBlob model.
+
+    Attributes:
+        list_display (tuple): A tuple of field names to display as columns on the change list page of the admin.
+    """
+    list_display = ('pk', 'sha256', 'file', 'size', 'ref_count', 'created_at', 'released_at',)
@@ -1,9 +1,26 @@
-from rest_framework import generics
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from rest_framework import generics, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from config import settings
+from config.conditional import ConditionalRequestMixin
+from config.parsers import ORJSONParser
+from config.ownership import OwnerScopedMixin
+from config.response_cache import CachedResponseMixin, get_response_cache_stats
+from link_collections.models import Collection
+from links.bulk import bulk_apply_link_operations, bulk_create_links
+from links.export import EXPORT_FORMATS, export_links
+from links.filters import filter_links, get_link_facets
 from links.models import Link
-from links.paginators import LinkPaginator
+from links.paginators import LinkPaginator, LinkSearchPaginator
+from links.parsers import NDJSONParser
 from links.permissions import IsOwner
+from links.rows import LinkRowListMixin
+from links.search import MAX_QUERY_LENGTH, search_links
 from links.serializers.link import LinkSerializer
+from links.stats import get_link_stats
 from users.permissions import IsSuperUser
 
 
@@ -32,12 +49,182 @@ class LinkCreateAPIView(generics.CreateAPIView):
         serializer.save(owner=self.request.user)
 
 
-class LinkListAPIView(generics.ListAPIView):
+class LinkBulkCreateAPIView(APIView):
+    """
+    APIView for creating many Link instances in one request.
+
+    The body is a JSON array or NDJSON (`Content-Type: application/x-ndjson`) of URLs or objects with the `url` key,
+    at most `LINK_BULK_CREATE['MAX_ITEMS']` items. Links are created for the current user by `bulk_create_links`;
+    the response contains a result for every item, in the order of the request.
+
+    Attributes:
+        parser_classes (list): The parsers of the JSON array and NDJSON bodies.
+
+    Methods:
+        post: Creates the links and returns the per-item results.
+    """
+    parser_classes = [ORJSONParser, NDJSONParser]
+
+    def post(self, request):
+        """
+        Creates the links and returns the per-item results.
+
+        Args:
+            request (Request): The incoming request.
+
+        Returns:
+            Response: The counts of created, existing, duplicate and invalid items and the per-item results,
+            or an error with status 400 if the body is not a list or is too long.
+        """
+        items = request.data
+        if not isinstance(items, list):
+            return Response({'error': 'Ожидается список URL.'}, status=status.HTTP_400_BAD_REQUEST)
+        max_items = settings.LINK_BULK_CREATE['MAX_ITEMS']
+        if len(items) > max_items:
+            return Response({'error': f'Не более {max_items} URL за один запрос.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        results = bulk_create_links(request.user, items)
+        summary = {key: 0 for key in ('created', 'exists', 'duplicate', 'invalid')}
+        for result in results:
+            summary[result['status']] += 1
+        response_status = status.HTTP_201_CREATED if summary['created'] else status.HTTP_200_OK
+        return Response({**summary, 'results': results}, status=response_status)
+
+
+class LinkBulkOperationsAPIView(APIView):
+    """
+    APIView for changing the type, the collections of or deleting many Link instances of the current user at once.
+
+    The body is a JSON array of at most `LINK_BULK_OPERATIONS['MAX_OPERATIONS']` operations with at most
+    `LINK_BULK_OPERATIONS['MAX_IDS']` link ids in total, e.g. `{"op": "set_type", "ids": [1, 2], "type": "video"}`,
+    `{"op": "add_to_collection", "ids": [1, 2], "collection": 3}` or `{"op": "delete", "ids": [4]}`.
+    The operations are applied in one transaction by `bulk_apply_link_operations`; the response contains a result
+    for every operation, in the order of the request.
+
+    Methods:
+        post: Applies the operations and returns the per-operation results.
+    """
+
+    def post(self, request):
+        """
+        Applies the operations and returns the per-operation results.
+
+        Args:
+            request (Request): The incoming request.
+
+        Returns:
+            Response: The numbers of applied, unchanged and not found link ids and of invalid operations
+            and the per-operation results, or an error with status 400 if the body is not a list or is too long.
+        """
+        items = request.data
+        if not isinstance(items, list):
+            return Response({'error': 'Ожидается список операций.'}, status=status.HTTP_400_BAD_REQUEST)
+        max_operations = settings.LINK_BULK_OPERATIONS['MAX_OPERATIONS']
+        if len(items) > max_operations:
+            return Response({'error': f'Не более {max_operations} операций за один запрос.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        max_ids = settings.LINK_BULK_OPERATIONS['MAX_IDS']
+        ids_count = sum(len(item['ids']) for item in items
+                        if isinstance(item, dict) and isinstance(item.get('ids'), list))
+        if ids_count > max_ids:
+            return Response({'error': f'Не более {max_ids} ссылок за один запрос.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        results = bulk_apply_link_operations(request.user, items)
+        summary = {key: 0 for key in ('applied', 'unchanged', 'not_found', 'invalid')}
+        for result in results:
+            if result['status'] == 'invalid':
+                summary['invalid'] += 1
+                continue
+            for key in ('applied', 'unchanged', 'not_found'):
+                summary[key] += len(result[key])
+        return Response({**summary, 'results': results})
+
+
+class LinkExportAPIView(APIView):
+    """
+    APIView for downloading all links and collections of the current user in one response.
+
+    The export is streamed as it is read from the database, so it takes constant memory for any number of links.
+    The format is chosen with the `export_format` query parameter: 'ndjson' (default) or 'csv'.
+
+    Methods:
+        get: Streams the export.
+    """
+
+    def get(self, request):
+        """
+        Streams the export.
+
+        Args:
+            request (Request): The incoming request.
+
+        Returns:
+            StreamingHttpResponse: The export as an attachment, or a response with status 400 for an unknown format.
+        """
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return Response({'error': f'Поддерживаемые форматы: {", ".join(EXPORT_FORMATS)}.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        response = StreamingHttpResponse(export_links(request.user, export_format),
+                                         content_type=f'{EXPORT_FORMATS[export_format]}; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="links.{export_format}"'
+        return response
+
+
+class LinkStatsAPIView(APIView):
+    """
+    APIView for the statistics of the links of all users, available to superusers only.
+
+    The statistics are read from precomputed counters: the total number of links by type, the `top` users with the
+    most links (`LINK_STATS['TOP_USERS']` by default) and the number of links created on each of the last `days` days
+    (`LINK_STATS['DAYS']` by default). The hit ratio of the response cache of the read views is added
+    under 'response_cache'.
+
+    Attributes:
+        permission_classes (list): List of permission classes required for this view.
+
+    Methods:
+        get: Returns the statistics.
+    """
+    permission_classes = [IsSuperUser]
+
+    def get(self, request):
+        """
+        Returns the statistics.
+
+        Args:
+            request (Request): The incoming request.
+
+        Returns:
+            Response: The statistics, or an error with status 400 if `top` or `days` is out of the allowed range.
+        """
+        conf = settings.LINK_STATS
+        params = {}
+        for name, default, maximum in (('top', conf['TOP_USERS'], conf['MAX_TOP_USERS']),
+                                       ('days', conf['DAYS'], conf['MAX_DAYS'])):
+            try:
+                params[name] = int(request.query_params.get(name, default))
+            except ValueError:
+                params[name] = 0
+            if not 1 <= params[name] <= maximum:
+                return Response({'error': f'Параметр {name} должен быть числом от 1 до {maximum}.'},
+                                status=status.HTTP_400_BAD_REQUEST)
+        return Response({**get_link_stats(**params), 'response_cache': get_response_cache_stats()})
+
+
+class LinkListAPIView(CachedResponseMixin, ConditionalRequestMixin, LinkRowListMixin, generics.ListAPIView):
     """
     APIView for listing Link instances.
 
     This APIView inherits from `generics.ListAPIView` and is used to list instances of the `Link` model.
     It uses the `LinkSerializer` for serialization and the `LinkPaginator` for pagination.
+    The links are filtered by the query parameters described in `filter_links`; with `?facets=true` the response
+    also contains the counts of the filtered links by type and by collection.
+    The page is built from plain rows with only the fields selected by `?fields=`/`?omit=`, see `LinkRowListMixin`.
+    The pages of a user are served from `CachedResponseMixin` until the links of the user change.
+    Unchanged pages are answered with 304 Not Modified, see `ConditionalRequestMixin`.
 
     Attributes:
         serializer_class (LinkSerializer): The serializer class used for the Link model.
@@ -46,16 +233,34 @@ class LinkListAPIView(generics.ListAPIView):
         permission_classes (list): List of permission classes required for this view.
 
     Methods:
-        get_queryset: Overrides the `get_queryset` method to filter the queryset based on the user's permissions.
+        list: Overrides the `list` method to add the facet counts on request.
+        get_queryset: Overrides the `get_queryset` method to filter the queryset based on the user's permissions
+        and the query parameters.
     """
     serializer_class = LinkSerializer
     queryset = Link.objects.all()
     pagination_class = LinkPaginator
     permission_classes = [IsOwner | IsSuperUser]
 
+    def list(self, request, *args, **kwargs):
+        """
+        Overrides the `list` method to add the facet counts on request.
+
+        Args:
+            request (Request): The incoming request.
+
+        Returns:
+            Response: A page of the links, with the 'facets' key if `?facets=true` is given.
+        """
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200 and request.query_params.get('facets', '').lower() in ('1', 'true'):
+            response.data['facets'] = get_link_facets(self.get_queryset())
+        return response
+
     def get_queryset(self):
         """
-        Overrides the `get_queryset` method to filter the queryset based on the user's permissions.
+        Overrides the `get_queryset` method to filter the queryset based on the user's permissions
+        and the query parameters.
 
         If the user is a superuser, it returns all Link instances. Otherwise, it returns only the Link instances
         owned by the user.
@@ -63,50 +268,104 @@ class LinkListAPIView(generics.ListAPIView):
         Returns:
             QuerySet: The filtered queryset.
         """
-        if self.request.user.is_superuser:
-            return Link.objects.all()
-        return Link.objects.filter(owner=self.request.user)
+        return filter_links(Link.objects.owned_by(self.request.user), self.request.query_params)
 
 
-class LinkRetrieveAPIView(generics.RetrieveAPIView):
+class LinkSearchAPIView(CachedResponseMixin, ConditionalRequestMixin, LinkRowListMixin, generics.ListAPIView):
+    """
+    APIView for searching the links of the current user.
+
+    The query `q` is matched against the title, description and URL of the links by `search_links`.
+    The results are ordered by relevance, the best first, and paginated with a cursor by `LinkSearchPaginator`.
+    The filters of the link list (`filter_links`) and the field selection (`LinkRowListMixin`) apply
+    to the results as well.
+    Repeated searches are answered from the response cache of the user, see `CachedResponseMixin`.
+
+    Attributes:
+        serializer_class (LinkSerializer): The serializer class used for the Link model.
+        pagination_class (LinkSearchPaginator): The pagination class used to paginate the results by rank.
+
+    Methods:
+        list: Overrides the `list` method to validate the query.
+        get_queryset: Overrides the `get_queryset` method to search only the links of the user.
+    """
+    serializer_class = LinkSerializer
+    pagination_class = LinkSearchPaginator
+
+    def list(self, request, *args, **kwargs):
+        """
+        Overrides the `list` method to validate the query.
+
+        Args:
+            request (Request): The incoming request.
+
+        Returns:
+            Response: A page of the results, or an error with status 400 if the query is empty or too long.
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query or len(query) > MAX_QUERY_LENGTH:
+            return Response({'error': f'Параметр q должен содержать от 1 до {MAX_QUERY_LENGTH} символов.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return super().list(request, *args, **kwargs)
+
+    def get_queryset(self):
+        """
+        Overrides the `get_queryset` method to search only the links of the user.
+
+        Returns:
+            QuerySet: The matching links of the user with the `rank` annotation.
+        """
+        queryset = filter_links(Link.objects.filter(owner=self.request.user), self.request.query_params)
+        return search_links(queryset, self.request.query_params.get('q', '').strip())
+
+
+class LinkRetrieveAPIView(CachedResponseMixin, ConditionalRequestMixin, OwnerScopedMixin, generics.RetrieveAPIView):
     """
     APIView for retrieving a single Link instance.
 
     This APIView inherits from `generics.RetrieveAPIView` and is used to retrieve a single instance of the `Link` model.
     It uses the `LinkSerializer` for serialization.
+    The link is looked up among the links of the user, see `OwnerScopedMixin`, with its preview and the primary keys
+    of its collections, so the response takes the same two queries for any link.
+    The response is cached per user, see `CachedResponseMixin`.
+    The `ETag` and `Last-Modified` headers come from `updated_at`, see `ConditionalRequestMixin`.
 
     Attributes:
         serializer_class (LinkSerializer): The serializer class used for the Link model.
-        queryset (QuerySet): The queryset containing all Link model instances.
+        queryset (QuerySet): The queryset containing all Link model instances with their previews and collections.
         permission_classes (list): List of permission classes required for this view.
     """
     serializer_class = LinkSerializer
-    queryset = Link.objects.all()
+    queryset = (Link.objects.select_related('preview_blob')
+                .prefetch_related(Prefetch('collection', queryset=Collection.objects.only('pk'))))
     permission_classes = [IsOwner | IsSuperUser]
 
 
-class LinkUpdateAPIView(generics.UpdateAPIView):
+class LinkUpdateAPIView(ConditionalRequestMixin, OwnerScopedMixin, generics.UpdateAPIView):
     """
     APIView for updating a Link instance.
 
     This APIView inherits from `generics.UpdateAPIView` and is used to update an existing instance of the `Link` model.
     It uses the `LinkSerializer` for serialization.
+    Only the links of the user can be updated, see `OwnerScopedMixin`.
+    An update with `If-Match` fails with 412 if the link was changed meanwhile, see `ConditionalRequestMixin`.
 
     Attributes:
         serializer_class (LinkSerializer): The serializer class used for the Link model.
-        queryset (QuerySet): The queryset containing all Link model instances.
+        queryset (QuerySet): The queryset containing all Link model instances with their previews.
         permission_classes (list): List of permission classes required for this view.
     """
     serializer_class = LinkSerializer
-    queryset = Link.objects.all()
+    queryset = Link.objects.select_related('preview_blob')
     permission_classes = [IsOwner | IsSuperUser]
 
 
-class LinkDestroyAPIView(generics.DestroyAPIView):
+class LinkDestroyAPIView(OwnerScopedMixin, generics.DestroyAPIView):
     """
     APIView for deleting a Link instance.
 
     This APIView inherits from `generics.DestroyAPIView` and is used to delete an existing instance of the `Link` model.
+    Only the links of the user can be deleted, see `OwnerScopedMixin`.
 
     Attributes:
         queryset (QuerySet): The queryset containing all Link model instances.
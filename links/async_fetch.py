@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+from config import settings
+from links.fetch import FetchError, open_url
+from links.services import get_page_data
+
+logger = logging.getLogger(__name__)
+
+ROBOTS_MAX_BYTES = 512 * 1024
+ROBOTS_ERROR_TTL = 5 * 60  # seconds an unreachable robots.txt is remembered
+
+
+def _origin(url):
+    parts = urlsplit(url)
+    return f'{parts.scheme.lower()}://{parts.netloc.lower()}'
+
+
+def _read_robots(origin):
+    """
+    Download and parse the robots.txt of an origin, following RFC 9309.
+
+    A missing robots.txt (4xx) allows everything, an unreachable one (5xx or a network error) disallows everything.
+
+    Returns:
+        tuple: The parser and the number of seconds the result may be cached.
+    """
+    parser = RobotFileParser(f'{origin}/robots.txt')
+    try:
+        with open_url(parser.url, max_bytes=ROBOTS_MAX_BYTES) as response:
+            status = response.status_code
+            body = response.read() if status == 200 else b''
+    except FetchError as e:
+        logger.warning(f"Не удалось получить {parser.url}: {e}")
+        parser.disallow_all = True
+        return parser, ROBOTS_ERROR_TTL
+    if status == 200:
+        parser.parse(body.decode('utf-8', errors='replace').splitlines())
+    elif 400 <= status < 500:
+        parser.allow_all = True
+    else:
+        parser.disallow_all = True
+        return parser, ROBOTS_ERROR_TTL
+    return parser, settings.LINK_ASYNC_FETCH['ROBOTS_CACHE_TTL']
+
+
+class _Domain:
+    """
+    Politeness state of one origin: its concurrency limit and the moment of the next allowed request.
+    """
+
+    def __init__(self, concurrency):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.lock = asyncio.Lock()
+        self.next_request_at = 0.0
+
+
+class AsyncFetcher:
+    """
+    Engine fetching the page data of many URLs concurrently while staying polite to every site.
+
+    Pages are processed by `get_page_data`, so the extraction, timeouts and size limits are exactly those of a single
+    fetch. The blocking calls run in a thread pool of `concurrency` threads, and asyncio schedules them:
+    at most `concurrency` requests are in progress in total, at most `per_domain` to one origin,
+    and requests to one origin start at least `min_interval` seconds apart. When `respect_robots` is set,
+    URLs disallowed by the robots.txt of their origin are skipped; robots.txt is fetched once per origin
+    and cached for `LINK_ASYNC_FETCH['ROBOTS_CACHE_TTL']` seconds. When a `cached` function is given, it is called
+    first and a URL it has a result for is answered without robots.txt, the per-origin limits or a request.
+
+    A fetcher is bound to the event loop it is first used in.
+
+    Attributes:
+        concurrency (int): The maximum number of requests in progress.
+        per_domain (int): The maximum number of requests in progress to one origin.
+        min_interval (float): The minimum number of seconds between the starts of two requests to one origin.
+        respect_robots (bool): Whether robots.txt is checked before a page is fetched.
+        cached (callable): The function returning a stored result of a URL, or None if the page must be fetched.
+
+    Methods:
+        allowed: Checks a URL against the robots.txt of its origin.
+        fetch: Fetches the page data of one URL.
+        fetch_many: Fetches the page data of many URLs.
+    """
+
+    def __init__(self, concurrency=None, per_domain=None, min_interval=None, respect_robots=None,
+                 fetch=get_page_data, cached=None):
+        conf = settings.LINK_ASYNC_FETCH
+        self.concurrency = max(concurrency or conf['CONCURRENCY'], 1)
+        self.per_domain = max(per_domain or conf['PER_DOMAIN_CONCURRENCY'], 1)
+        self.min_interval = conf['MIN_DOMAIN_INTERVAL'] if min_interval is None else min_interval
+        self.respect_robots = conf['RESPECT_ROBOTS_TXT'] if respect_robots is None else respect_robots
+        self.user_agent = settings.LINK_FETCH['USER_AGENT']
+        self.cached = cached
+        self._fetch = fetch
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='link-fetch')
+        self._semaphore = None
+        self._domains = {}
+        self._robots = {}
+        self._robots_locks = {}
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _domain(self, origin):
+        if origin not in self._domains:
+            self._domains[origin] = _Domain(self.per_domain)
+        return self._domains[origin]
+
+    async def _wait_turn(self, domain):
+        async with domain.lock:
+            now = time.monotonic()
+            delay = domain.next_request_at - now
+            domain.next_request_at = max(now, domain.next_request_at) + self.min_interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def allowed(self, url):
+        """
+        Checks a URL against the robots.txt of its origin.
+
+        Args:
+            url (str): The URL to check.
+
+        Returns:
+            bool: True if the URL may be fetched.
+        """
+        if not self.respect_robots:
+            return True
+        origin = _origin(url)
+        lock = self._robots_locks.setdefault(origin, asyncio.Lock())
+        async with lock:
+            cached = self._robots.get(origin)
+            if cached is None or cached[1] <= time.monotonic():
+                domain = self._domain(origin)
+                async with domain.semaphore:
+                    await self._wait_turn(domain)
+                    parser, ttl = await self._run(_read_robots, origin)
+                cached = (parser, time.monotonic() + ttl)
+                self._robots[origin] = cached
+        return cached[0].can_fetch(self.user_agent, url)
+
+    async def fetch(self, url, **kwargs):
+        """
+        Fetches the page data of one URL.
+
+        Args:
+            url (str): The URL of the page.
+            **kwargs: Additional arguments of the fetch function, e.g. `etag` and `last_modified`.
+
+        Returns:
+            dict: The page data as returned by `get_page_data`, an empty dictionary if the page could not be fetched
+            or is disallowed by robots.txt, or the result of `cached` if it has one.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        try:
+            if self.cached is not None:
+                # Сохраненный результат не требует запроса к сайту, поэтому не ждет очереди сайта и robots.txt
+                result = await self._run(self.cached, url)
+                if result:
+                    return result
+            if not await self.allowed(url):
+                logger.warning(f"Получение {url} запрещено robots.txt")
+                return {}
+            domain = self._domain(_origin(url))
+            async with domain.semaphore:
+                await self._wait_turn(domain)
+                async with self._semaphore:
+                    return await self._run(partial(self._fetch, url, **kwargs))
+        except Exception as e:
+            logger.exception(f"Ошибка при получении данных страницы из {url}: {e}")
+            return {}
+
+    async def fetch_many(self, urls):
+        """
+        Fetches the page data of many URLs.
+
+        Every distinct URL is fetched once.
+
+        Args:
+            urls (iterable): The URLs of the pages.
+
+        Returns:
+            dict: The page data of every URL, see `fetch`.
+        """
+        urls = list(dict.fromkeys(urls))
+        results = await asyncio.gather(*(self.fetch(url) for url in urls))
+        return dict(zip(urls, results))
+
+    def close(self):
+        """
+        Stops the threads of the fetcher.
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def fetch_many(urls, **options):
+    """
+    Fetch the page data of many URLs concurrently from synchronous code.
+
+    Runs an `AsyncFetcher` in a new event loop and returns when every URL is processed. It must not be called
+    from a thread that already runs an event loop; use `AsyncFetcher.fetch_many` there.
+
+    Args:
+        urls (iterable): The URLs of the pages.
+        **options: The options of `AsyncFetcher`.
+
+    Returns:
+        dict: The page data of every URL, an empty dictionary for pages that could not be fetched.
+    """
+    fetcher = AsyncFetcher(**options)
+    try:
+        return asyncio.run(fetcher.fetch_many(urls))
+    finally:
+        fetcher.close()
@@ -0,0 +1,386 @@
+from collections import Counter, defaultdict
+
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Case, Count, F, Func, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from config import settings
+from config.response_cache import bump_owner_version
+from link_collections.models import Collection
+from links.counters import adjust_collection_counters, adjust_daily_counters, adjust_link_counters, \
+    adjust_links_counters
+from links.models import Link, LinkMetadataJob, PreviewBlob, UrlMetadata
+from links.normalization import hash_url, url_domain
+
+_url_validator = URLValidator()
+URL_MAX_LENGTH = Link._meta.get_field('url').max_length
+BULK_OPERATIONS = ('set_type', 'add_to_collection', 'remove_from_collection', 'delete')
+LINK_TYPES = [value for value, _ in Link.TYPE_CHOICES]
+MAX_PK = 2 ** 63 - 1
+
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _delete_rows(model, pks):
+    """
+    Deletes the rows of a model by their primary keys with one `DELETE`, without loading them or sending signals.
+    """
+    connection = connections[model.objects.db]
+    table, pk_column = (connection.ops.quote_name(name) for name in (model._meta.db_table, model._meta.pk.column))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE {pk_column} IN ({", ".join(["%s"] * len(pks))})', pks)
+
+
+def _with_edited_field(name):
+    """
+    Returns the expression of `Link.edited_fields` with the field name added unless it is already there.
+    """
+    return Case(
+        When(edited_fields__contains=[name], then=F('edited_fields')),
+        default=Func(F('edited_fields'), Value(name), function='array_append'),
+        output_field=Link._meta.get_field('edited_fields'),
+    )
+
+
+def _clean_url(item):
+    """
+    Returns the URL of a bulk item and the validation error, if any.
+    """
+    url = item.get('url') if isinstance(item, dict) else item
+    if not isinstance(url, str) or not url.strip():
+        return None, "Укажите URL."
+    url = url.strip()
+    if len(url) > URL_MAX_LENGTH:
+        return url, f"URL длиннее {URL_MAX_LENGTH} символов."
+    try:
+        _url_validator(url)
+    except ValidationError:
+        return url, "Введите правильный URL."
+    return url, None
+
+
+def bulk_create_links(owner, items):
+    """
+    Create links of a user from a list of URLs with a fixed number of queries per batch.
+
+    Items are URLs or objects with the `url` key. Invalid URLs, repeats within the request and URLs the user has
+    already saved are reported and skipped; URLs are compared in their normalized form, and existing links are
+    found with one `IN (...)` probe of the `(owner, url_hash)` index per batch instead of a query per URL.
+    New links are inserted with `bulk_create`, the link counters of the owner are updated once per type
+    and the cached responses of the owner become stale.
+    Links whose URL has fresh page data in the shared `UrlMetadata` cache get it right away, the others are saved
+    as pending together with a `LinkMetadataJob`, so the pages are fetched by the `run_metadata_worker` command
+    with its concurrency limit.
+
+    If a parallel request saves one of the URLs first, the unique constraint rejects the insert and the request is
+    processed again, so that URL is reported as existing. If the inserts keep conflicting, the last attempt inserts
+    the links one at a time and reports every conflicting URL as existing.
+
+    Args:
+        owner (User): The owner of the new links.
+        items (list): The URLs or objects with the `url` key.
+
+    Returns:
+        list: One result per item, in order, with the keys 'index', 'url', 'status' ('created', 'exists',
+        'duplicate' or 'invalid') and 'pk' or 'error'.
+    """
+    for _ in range(2):
+        try:
+            return _bulk_create_links(owner, items)
+        except IntegrityError:
+            continue
+    return _bulk_create_links(owner, items, one_by_one=True)
+
+
+def _existing_links(owner, hashes, batch_size):
+    """
+    Returns the primary keys of the links of a user with the given URL hashes, keyed by the hash.
+    """
+    existing = {}
+    for batch in _batches(hashes, batch_size):
+        existing.update(Link.objects.filter(owner=owner, url_hash__in=batch).values_list('url_hash', 'pk'))
+    return existing
+
+
+def _create_one_by_one(owner, links, results, first_index):
+    """
+    Inserts links one at a time, reporting the links rejected by the unique constraint as existing.
+    """
+    created = []
+    for link in links:
+        try:
+            with transaction.atomic():
+                Link.objects.bulk_create([link])
+        except IntegrityError:
+            pk = Link.objects.filter(owner=owner, url_hash=link.url_hash).values_list('pk', flat=True).first()
+            if pk is None:
+                raise
+            results[first_index[link.url_hash]].update(status='exists', pk=pk)
+            continue
+        created.append(link)
+    return created
+
+
+def _bulk_create_links(owner, items, one_by_one=False):
+    batch_size = settings.LINK_BULK_CREATE['BATCH_SIZE']
+    results = []
+    first_index = {}
+    for index, item in enumerate(items):
+        url, error = _clean_url(item)
+        result = {'index': index, 'url': url}
+        if error:
+            result.update(status='invalid', error=error)
+            results.append(result)
+            continue
+        url_hash = hash_url(url)
+        if url_hash in first_index:
+            result.update(status='duplicate', pk=None)
+        else:
+            first_index[url_hash] = index
+            result.update(status='created', pk=None)
+        results.append(result)
+
+    hashes = list(first_index)
+    existing = _existing_links(owner, hashes, batch_size)
+    for url_hash, pk in existing.items():
+        results[first_index[url_hash]].update(status='exists', pk=pk)
+
+    new_hashes = [url_hash for url_hash in hashes if url_hash not in existing]
+    cached = {}
+    now = timezone.now()
+    for batch in _batches(new_hashes, batch_size):
+        cached.update(
+            (url_metadata.url_hash, url_metadata)
+            for url_metadata in UrlMetadata.objects.select_related('preview_blob')
+            .filter(url_hash__in=batch, expires_at__gt=now)
+        )
+
+    links = []
+    for url_hash in new_hashes:
+        url = results[first_index[url_hash]]['url']
+        link = Link(owner=owner, url=url, url_hash=url_hash, domain=url_domain(url))
+        url_metadata = cached.get(url_hash)
+        if url_metadata:
+            link.apply_url_metadata(url_metadata)
+        links.append(link)
+
+    with transaction.atomic():
+        if one_by_one:
+            created = _create_one_by_one(owner, links, results, first_index)
+        else:
+            created = Link.objects.bulk_create(links, batch_size=batch_size)
+        adjust_links_counters(created)
+        LinkMetadataJob.objects.bulk_create(
+            [LinkMetadataJob(link=link) for link in created if link.metadata_status == 'pending'],
+            batch_size=batch_size,
+        )
+        # Каждая ссылка с превью из кэша берет ссылку на файл, как в Link.save
+        blob_refs = Counter(link.preview_blob_id for link in created if link.preview_blob_id)
+        for blob_id, refs in blob_refs.items():
+            PreviewBlob.objects.filter(pk=blob_id).update(ref_count=F('ref_count') + refs)
+        for batch in _batches([url_metadata.pk for url_metadata in cached.values()], batch_size):
+            UrlMetadata.count_hits(batch)
+        if created:
+            bump_owner_version(owner.pk)
+
+    for link in created:
+        results[first_index[link.url_hash]]['pk'] = link.pk
+    return results
+
+
+def _is_pk(value):
+    return type(value) is int and 0 < value <= MAX_PK
+
+
+def _clean_operation(item):
+    """
+    Returns the operation of a bulk item with unique link ids and the validation error, if any.
+    """
+    if not isinstance(item, dict):
+        return None, "Ожидается объект операции."
+    name = item.get('op')
+    if name not in BULK_OPERATIONS:
+        return None, f"Неизвестная операция, допустимые: {', '.join(BULK_OPERATIONS)}."
+    ids = item.get('ids')
+    if not isinstance(ids, list) or not ids:
+        return None, "Укажите непустой список ids."
+    if not all(_is_pk(pk) for pk in ids):
+        return None, "ids должны быть положительными целыми числами."
+    operation = {'op': name, 'ids': list(dict.fromkeys(ids))}
+    if name == 'set_type':
+        if item.get('type') not in LINK_TYPES:
+            return None, f"Укажите тип, допустимые: {', '.join(LINK_TYPES)}."
+        operation['type'] = item['type']
+    elif name in ('add_to_collection', 'remove_from_collection'):
+        if not _is_pk(item.get('collection')):
+            return None, "Укажите коллекцию."
+        operation['collection'] = item['collection']
+    return operation, None
+
+
+def bulk_apply_link_operations(owner, items):
+    """
+    Apply a list of operations to many links of a user in one transaction with a fixed number of queries per batch.
+
+    An operation is an object with the `op` key and the `ids` of the links: 'set_type' with the new `type`,
+    'add_to_collection' and 'remove_from_collection' with the `collection`, and 'delete'. Operations are applied
+    in order, so a link deleted by one operation is not found by the next ones. Invalid operations and collections
+    the user does not own are reported and skipped; ids of links the user does not own are reported as not found.
+
+    Ownership is checked once for all ids with one `IN (...)` query per batch, which also locks the links.
+    Instead of a fetch and a save per link, the changes are written per batch: one `UPDATE` per new type,
+    `bulk_create` and filtered deletes of the membership rows and a filtered delete of the links. A type set
+    by 'set_type' is added to `Link.edited_fields`, so refreshing the page data does not overwrite it.
+    The work of the signals of `links.signals` is done here once for all links: the link counters of the owner
+    and of the days, the collection counters, the references of the preview blobs, `updated_at` of the changed links
+    and collections and the version of the cached responses of the owner.
+
+    Args:
+        owner (User): The owner of the links.
+        items (list): The operations.
+
+    Returns:
+        list: One result per operation, in order, with the keys 'index', 'op', 'status' ('done' or 'invalid')
+        and either the lists of link ids 'applied', 'unchanged' and 'not_found' or 'error'.
+    """
+    cleaned = [_clean_operation(item) for item in items]
+    collection_ids = {operation['collection'] for operation, _ in cleaned if operation and 'collection' in operation}
+    owned_collections = set(Collection.objects.filter(owner=owner, pk__in=collection_ids)
+                            .values_list('pk', flat=True))
+
+    results = []
+    operations = []
+    for index, (item, (operation, error)) in enumerate(zip(items, cleaned)):
+        if operation and 'collection' in operation and operation['collection'] not in owned_collections:
+            error = "Коллекция не найдена."
+        result = {'index': index, 'op': item.get('op') if isinstance(item, dict) else None}
+        if error:
+            result.update(status='invalid', error=error)
+        else:
+            result.update(status='done', applied=[], unchanged=[], not_found=[])
+            operations.append((result, operation))
+        results.append(result)
+
+    if operations:
+        with transaction.atomic():
+            _apply_link_operations(owner, operations)
+    return results
+
+
+def _apply_link_operations(owner, operations):
+    batch_size = settings.LINK_BULK_OPERATIONS['BATCH_SIZE']
+    link_ids = list(dict.fromkeys(pk for _, operation in operations for pk in operation['ids']))
+    links = {}
+    for batch in _batches(link_ids, batch_size):
+        # День создания считается в базе, в часовом поясе проекта, как в reconcile_daily_counters
+        links.update((row[0], row[1:]) for row in Link.objects.filter(owner=owner, pk__in=batch).select_for_update()
+                     .annotate(day=TruncDate('created_at')).values_list('pk', 'type', 'day', 'preview_blob_id'))
+
+    through = Link.collection.through
+    member_ids = list({pk for _, operation in operations if 'collection' in operation
+                       for pk in operation['ids'] if pk in links})
+    member_collections = {operation['collection'] for _, operation in operations if 'collection' in operation}
+    initial_memberships = set()
+    for batch in _batches(member_ids, batch_size):
+        initial_memberships.update(through.objects.filter(link_id__in=batch, collection_id__in=member_collections)
+                                   .values_list('link_id', 'collection_id'))
+
+    # Операции применяются к состоянию в памяти, в базу записывается только итоговое отличие от исходного
+    types = {pk: row[0] for pk, row in links.items()}
+    memberships = set(initial_memberships)
+    deleted = set()
+    for result, operation in operations:
+        name = operation['op']
+        for pk in operation['ids']:
+            if pk not in links or pk in deleted:
+                result['not_found'].append(pk)
+                continue
+            if name == 'set_type':
+                changed = types[pk] != operation['type']
+                types[pk] = operation['type']
+            elif name == 'add_to_collection':
+                membership = (pk, operation['collection'])
+                changed = membership not in memberships
+                memberships.add(membership)
+            elif name == 'remove_from_collection':
+                membership = (pk, operation['collection'])
+                changed = membership in memberships
+                memberships.discard(membership)
+            else:
+                changed = True
+                deleted.add(pk)
+            result['applied' if changed else 'unchanged'].append(pk)
+
+    now = timezone.now()
+    type_deltas = Counter()
+    day_deltas = Counter()
+    retyped = defaultdict(list)
+    for pk, (old_type, day, _) in links.items():
+        new_type = types[pk]
+        if pk in deleted:
+            new_type = None
+        elif new_type == old_type:
+            continue
+        else:
+            retyped[new_type].append(pk)
+        type_deltas[old_type] -= 1
+        day_deltas[(day, old_type)] -= 1
+        if new_type:
+            type_deltas[new_type] += 1
+            day_deltas[(day, new_type)] += 1
+    for new_type, pks in retyped.items():
+        for batch in _batches(pks, batch_size):
+            Link.objects.filter(pk__in=batch).update(type=new_type, edited_fields=_with_edited_field('type'),
+                                                     updated_at=now)
+
+    # Коллекция остается в Counter и при нулевом изменении счетчика: ее `updated_at` все равно обновляется
+    collection_deltas = Counter()
+    added = [membership for membership in memberships - initial_memberships if membership[0] not in deleted]
+    removed = defaultdict(list)
+    for link_id, collection_id in initial_memberships - memberships:
+        if link_id not in deleted:
+            removed[collection_id].append(link_id)
+            collection_deltas[collection_id] -= 1
+    for _, collection_id in added:
+        collection_deltas[collection_id] += 1
+    through.objects.bulk_create([through(link_id=link_id, collection_id=collection_id)
+                                 for link_id, collection_id in added],
+                                batch_size=batch_size, ignore_conflicts=True)
+    for collection_id, pks in removed.items():
+        for batch in _batches(pks, batch_size):
+            through.objects.filter(collection_id=collection_id, link_id__in=batch).delete()
+    retyped_ids = {pk for pks in retyped.values() for pk in pks}
+    touched = list(({link_id for link_id, _ in added} | {link_id for pks in removed.values() for link_id in pks})
+                   - retyped_ids)
+    for batch in _batches(touched, batch_size):
+        Link.objects.filter(pk__in=batch).update(updated_at=now)
+
+    blob_refs = Counter(links[pk][2] for pk in deleted if links[pk][2])
+    for batch in _batches(list(deleted), batch_size):
+        for collection_id, count in (through.objects.filter(link_id__in=batch).values_list('collection_id')
+                                     .annotate(count=Count('pk')).order_by()):
+            collection_deltas[collection_id] -= count
+        through.objects.filter(link_id__in=batch).delete()
+        LinkMetadataJob.objects.filter(link_id__in=batch).delete()
+        # `QuerySet.delete` загрузил бы каждую ссылку и отправил ее сигналы, то есть несколько запросов на ссылку;
+        # их работа сделана выше и ниже для всех ссылок сразу, а зависимые строки уже удалены
+        _delete_rows(Link, batch)
+
+    adjust_link_counters(owner.pk, type_deltas)
+    adjust_daily_counters(owner.pk, day_deltas)
+    for collection_id, delta in collection_deltas.items():
+        if delta:
+            adjust_collection_counters([collection_id], delta)
+        else:
+            Collection.objects.filter(pk=collection_id).update(updated_at=now)
+    # Каждая удаленная ссылка отпускает ссылку на файл превью, как в сигнале release_preview_blob
+    for blob_id, refs in blob_refs.items():
+        PreviewBlob.objects.filter(pk=blob_id).update(ref_count=F('ref_count') - refs, released_at=now)
+    if retyped or added or removed or deleted:
+        bump_owner_version(owner.pk)
@@ -0,0 +1,213 @@
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Mod, TruncDate
+from django.utils import timezone
+
+from config import settings
+from link_collections.models import Collection
+from links.models import Link, LinkDailyCounter, LinkTypeCounter
+from users.models import User
+
+
+def _count_subquery(queryset, group_field):
+    return Coalesce(Subquery(
+        queryset.order_by().values(group_field).annotate(count=Count('pk')).values('count')[:1]
+    ), Value(0))
+
+
+def _add_to_counter(model, delta, **lookup):
+    if model.objects.filter(**lookup).update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(count=delta, **lookup)
+    except IntegrityError:
+        # Счетчик одновременно создал другой запрос
+        model.objects.filter(**lookup).update(count=F('count') + delta)
+
+
+def link_day(link):
+    """
+    Return the day a link was created, in the time zone of the project, as counted by `LinkDailyCounter`.
+
+    Args:
+        link (Link): The link.
+
+    Returns:
+        date: The day.
+    """
+    return timezone.localdate(link.created_at) if link.created_at else timezone.localdate()
+
+
+def counter_shard(owner_id):
+    """
+    Return the shard of `LinkDailyCounter` the links of a user are counted in.
+
+    Args:
+        owner_id (int): The primary key of the owner.
+
+    Returns:
+        int: The shard.
+    """
+    return owner_id % settings.LINK_STATS['DAILY_COUNTER_SHARDS']
+
+
+def adjust_link_counters(owner_id, type_deltas):
+    """
+    Add the changes in the number of links of a user to `User.links_count` and the `LinkTypeCounter` rows.
+
+    Every counter is changed with a single `UPDATE ... SET count = count + delta`, so concurrent changes never
+    overwrite each other.
+
+    Args:
+        owner_id (int): The primary key of the owner.
+        type_deltas (dict): The change of the number of links by type, e.g. `{'video': 1, 'website': -1}`.
+    """
+    total = sum(type_deltas.values())
+    if total:
+        User.objects.filter(pk=owner_id).update(links_count=F('links_count') + total)
+    for type_, delta in type_deltas.items():
+        if delta:
+            _add_to_counter(LinkTypeCounter, delta, owner_id=owner_id, type=type_)
+
+
+def adjust_daily_counters(owner_id, day_deltas):
+    """
+    Add the changes in the number of links of a user created on some days to the `LinkDailyCounter` rows
+    of the shard of the user.
+
+    Args:
+        owner_id (int): The primary key of the owner.
+        day_deltas (dict): The change of the number of links by day and type, e.g. `{(date(2024, 5, 1), 'video'): 1}`.
+    """
+    shard = counter_shard(owner_id)
+    for (day, type_), delta in day_deltas.items():
+        if delta:
+            _add_to_counter(LinkDailyCounter, delta, day=day, type=type_, shard=shard)
+
+
+def adjust_link_type_change(link, old_type):
+    """
+    Move a link from the counters of its old type to the counters of its current type.
+
+    Args:
+        link (Link): The link with the new type.
+        old_type (str): The type the link had before.
+    """
+    day = link_day(link)
+    adjust_link_counters(link.owner_id, Counter({old_type: -1, link.type: 1}))
+    adjust_daily_counters(link.owner_id, Counter({(day, old_type): -1, (day, link.type): 1}))
+
+
+def adjust_links_counters(links, sign=1):
+    """
+    Add or subtract many links to the counters of their owners and days, with one update per counter.
+
+    Args:
+        links (iterable): The links.
+        sign (int): 1 for added links, -1 for removed ones.
+    """
+    deltas = {}
+    day_deltas = {}
+    for link in links:
+        deltas.setdefault(link.owner_id, Counter())[link.type] += sign
+        day_deltas.setdefault(link.owner_id, Counter())[(link_day(link), link.type)] += sign
+    for owner_id, type_deltas in deltas.items():
+        adjust_link_counters(owner_id, type_deltas)
+        adjust_daily_counters(owner_id, day_deltas[owner_id])
+
+
+def adjust_collection_counters(collection_ids, delta):
+    """
+    Add a change in the number of links to `Collection.links_count` of several collections.
+
+    `updated_at` is set as well, since the representation of the collections changes with the counter.
+
+    Args:
+        collection_ids (iterable): The primary keys of the collections.
+        delta (int): The change of the number of links of every collection.
+    """
+    collection_ids = list(collection_ids)
+    if collection_ids and delta:
+        Collection.objects.filter(pk__in=collection_ids).update(links_count=F('links_count') + delta,
+                                                                updated_at=timezone.now())
+
+
+def reconcile_user_counters(first_pk, last_pk):
+    """
+    Recompute `User.links_count` and the `LinkTypeCounter` rows of the users in a range of primary keys.
+
+    Args:
+        first_pk (int): The first primary key of the range.
+        last_pk (int): The last primary key of the range, inclusive.
+
+    Returns:
+        int: The number of users whose `links_count` was wrong.
+    """
+    users = User.objects.filter(pk__gte=first_pk, pk__lte=last_pk)
+    actual = _count_subquery(Link.objects.filter(owner=OuterRef('pk')), 'owner')
+    with transaction.atomic():
+        fixed = users.annotate(actual=actual).exclude(links_count=F('actual')).update(links_count=actual)
+        type_counts = (Link.objects.filter(owner_id__gte=first_pk, owner_id__lte=last_pk)
+                       .values_list('owner_id', 'type').annotate(count=Count('pk')).order_by())
+        LinkTypeCounter.objects.filter(owner_id__gte=first_pk, owner_id__lte=last_pk).delete()
+        LinkTypeCounter.objects.bulk_create(
+            [LinkTypeCounter(owner_id=owner_id, type=type_, count=count) for owner_id, type_, count in type_counts]
+        )
+    return fixed
+
+
+def reconcile_collection_counters(first_pk, last_pk):
+    """
+    Recompute `Collection.links_count` of the collections in a range of primary keys.
+
+    Args:
+        first_pk (int): The first primary key of the range.
+        last_pk (int): The last primary key of the range, inclusive.
+
+    Returns:
+        int: The number of collections whose `links_count` was wrong.
+    """
+    membership = Link.collection.through.objects.filter(collection_id=OuterRef('pk'))
+    actual = _count_subquery(membership, 'collection_id')
+    return (Collection.objects.filter(pk__gte=first_pk, pk__lte=last_pk)
+            .annotate(actual=actual).exclude(links_count=F('actual')).update(links_count=actual))
+
+
+def reconcile_daily_counters(first_day, last_day):
+    """
+    Recompute the `LinkDailyCounter` rows of a range of days, the links of every user in the shard of the user.
+
+    The range is processed in its own short transaction. The counters of the range are locked before the links are
+    counted, so a link saved meanwhile is either counted here or added to the counter after the commit, and only the
+    counters that differ from the links are written.
+
+    Args:
+        first_day (date): The first day of the range.
+        last_day (date): The last day of the range, inclusive.
+
+    Returns:
+        int: The number of counters that were wrong or missing.
+    """
+    shard = Mod('owner_id', Value(settings.LINK_STATS['DAILY_COUNTER_SHARDS']))
+    with transaction.atomic():
+        counters = list(LinkDailyCounter.objects.select_for_update().filter(day__gte=first_day, day__lte=last_day))
+        day_counts = (Link.objects.filter(created_at__date__gte=first_day, created_at__date__lte=last_day)
+                      .annotate(day=TruncDate('created_at'), shard=shard).values_list('day', 'type', 'shard')
+                      .annotate(count=Count('pk')).order_by())
+        actual = {(day, type_, shard): count for day, type_, shard, count in day_counts}
+        wrong = []
+        for counter in counters:
+            count = actual.pop((counter.day, counter.type, counter.shard), 0)
+            if counter.count != count:
+                counter.count = count
+                wrong.append(counter)
+        LinkDailyCounter.objects.bulk_update(wrong, ['count'], batch_size=1000)
+        LinkDailyCounter.objects.bulk_create(
+            [LinkDailyCounter(day=day, type=type_, shard=shard, count=count)
+             for (day, type_, shard), count in actual.items()],
+            batch_size=1000,
+        )
+    return len(wrong) + len(actual)
@@ -0,0 +1,129 @@
+import csv
+import json
+from itertools import islice
+
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+
+from config import settings
+from link_collections.models import Collection
+from links.models import Link
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+LINK_FIELDS = ('pk', 'url', 'title', 'description', 'type', 'preview', 'created_at', 'updated_at')
+CSV_HEADER = ('id', 'url', 'title', 'description', 'type', 'preview', 'created_at', 'updated_at', 'collections')
+
+
+class _Echo:
+    """
+    File-like object that returns what is written to it, so `csv.writer` produces lines for a streaming response.
+    """
+
+    def write(self, value):
+        return value
+
+
+def iter_links(owner):
+    """
+    Iterate over the links of a user together with the primary keys of their collections.
+
+    The links are read with a server-side cursor in chunks of `LINK_EXPORT['CHUNK_SIZE']` rows, and the collection
+    membership of every chunk is read with one query, so memory use does not depend on the number of links.
+
+    Args:
+        owner (User): The owner of the links.
+
+    Yields:
+        dict: The fields of a link with the 'collections' key holding the list of collection primary keys.
+    """
+    chunk_size = settings.LINK_EXPORT['CHUNK_SIZE']
+    rows = Link.objects.filter(owner=owner).order_by('pk').values(*LINK_FIELDS).iterator(chunk_size=chunk_size)
+    membership = Link.collection.through.objects
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        collections = {}
+        for link_id, collection_id in (membership.filter(link_id__in=[row['pk'] for row in chunk])
+                                       .order_by('link_id', 'collection_id')
+                                       .values_list('link_id', 'collection_id')):
+            collections.setdefault(link_id, []).append(collection_id)
+        for row in chunk:
+            row['preview'] = default_storage.url(row['preview']) if row['preview'] else None
+            row['collections'] = collections.get(row['pk'], [])
+            yield row
+
+
+def export_ndjson(owner):
+    """
+    Produce the NDJSON export of the collections and links of a user.
+
+    Every line is a JSON object with the 'kind' key: the collections come first, then the links.
+
+    Args:
+        owner (User): The owner of the data.
+
+    Yields:
+        str: One line of the export.
+    """
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    collections = (Collection.objects.filter(owner=owner).order_by('pk')
+                   .values('pk', 'name', 'description', 'created_at', 'updated_at')
+                   .iterator(chunk_size=settings.LINK_EXPORT['CHUNK_SIZE']))
+    for collection in collections:
+        yield encoder.encode({'kind': 'collection', **collection}) + '\n'
+    for link in iter_links(owner):
+        yield encoder.encode({'kind': 'link', **link}) + '\n'
+
+
+def export_csv(owner):
+    """
+    Produce the CSV export of the links of a user.
+
+    The 'collections' column holds the primary keys of the link collections separated by ';'.
+
+    Args:
+        owner (User): The owner of the links.
+
+    Yields:
+        str: One line of the export, the header first.
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_HEADER)
+    for link in iter_links(owner):
+        yield writer.writerow([
+            link['pk'], link['url'], link['title'], link['description'], link['type'], link['preview'],
+            link['created_at'].isoformat(), link['updated_at'].isoformat(),
+            ';'.join(str(collection_id) for collection_id in link['collections']),
+        ])
+
+
+def export_links(owner, export_format):
+    """
+    Produce an export in blocks of about `LINK_EXPORT['BLOCK_SIZE']` characters.
+
+    Lines are joined into blocks, so the response is written to the socket in a few large writes instead of
+    a write per link.
+
+    Args:
+        owner (User): The owner of the data.
+        export_format (str): One of `EXPORT_FORMATS`.
+
+    Yields:
+        str: A block of lines of the export.
+    """
+    lines = export_csv(owner) if export_format == 'csv' else export_ndjson(owner)
+    block_size = settings.LINK_EXPORT['BLOCK_SIZE']
+    block, length = [], 0
+    for line in lines:
+        block.append(line)
+        length += len(line)
+        if length >= block_size:
+            yield ''.join(block)
+            block, length = [], 0
+    if block:
+        yield ''.join(block)
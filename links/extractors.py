@@ -0,0 +1,242 @@
+import codecs
+import re
+from html.parser import HTMLParser
+
+try:
+    from lxml import etree
+except ImportError:  # pragma: no cover - lxml is an optional speedup
+    etree = None
+
+DEFAULT_HEAD_BYTES = 512 * 1024
+
+# Теги, которые могут встретиться до конца <head>; любой другой тег означает начало содержимого страницы
+HEAD_TAGS = {'html', 'head', 'title', 'meta', 'link', 'base', 'style', 'script', 'noscript', 'template'}
+
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([a-zA-Z0-9_\-]+)', re.IGNORECASE)
+
+
+class _HeadFinished(Exception):
+    """
+    Raised by the stdlib parser to stop parsing once the end of `<head>` is reached.
+    """
+
+
+class HeadMetadata:
+    """
+    Collector of the page metadata found in `<head>`.
+
+    Both parser backends feed their tag events into this class, so they extract exactly the same data.
+    The first occurrence of every value wins.
+
+    Attributes:
+        title (str): The text of `<title>`.
+        description (str): The content of `<meta name="description">`.
+        image (str): The content of `<meta property="og:image">`.
+        type (str): The content of `<meta property="og:type">`.
+        finished (bool): True when `</head>` or the first tag of the page content has been reached.
+    """
+
+    def __init__(self):
+        self.title = None
+        self.description = None
+        self.image = None
+        self.type = None
+        self.finished = False
+        self._title_parts = None
+
+    def start(self, tag, attrs):
+        """
+        Handle an opening tag.
+
+        Args:
+            tag (str): The lowercase tag name.
+            attrs (dict): The tag attributes.
+        """
+        if tag not in HEAD_TAGS:
+            self.finished = True
+        elif tag == 'title' and self.title is None:
+            self._title_parts = []
+        elif tag == 'meta':
+            content = (attrs.get('content') or '').strip()
+            name = (attrs.get('name') or '').lower()
+            prop = (attrs.get('property') or '').lower()
+            if name == 'description' and self.description is None:
+                self.description = content
+            elif prop == 'og:image' and self.image is None:
+                self.image = content
+            elif prop == 'og:type' and self.type is None:
+                self.type = content
+
+    def end(self, tag):
+        """
+        Handle a closing tag.
+
+        Args:
+            tag (str): The lowercase tag name.
+        """
+        if tag == 'head':
+            self.finished = True
+        elif tag == 'title' and self._title_parts is not None:
+            self.title = ''.join(self._title_parts).strip()
+            self._title_parts = None
+
+    def data(self, text):
+        """
+        Handle text between tags.
+
+        Args:
+            text (str): The text.
+        """
+        if self._title_parts is not None:
+            self._title_parts.append(text)
+
+    def as_dict(self):
+        """
+        Return the collected metadata.
+
+        Returns:
+            dict: A dictionary with the keys 'title', 'description', 'image' and 'type'. Missing values are ''.
+        """
+        return {
+            'title': self.title or '',
+            'description': self.description or '',
+            'image': self.image or '',
+            'type': self.type or '',
+        }
+
+
+class _StdlibHeadParser(HTMLParser):
+    """
+    Incremental parser based on `html.parser`, used when lxml is not installed.
+    """
+
+    def __init__(self, metadata):
+        super().__init__(convert_charrefs=True)
+        self.metadata = metadata
+
+    def handle_starttag(self, tag, attrs):
+        self.metadata.start(tag, dict(attrs))
+        if self.metadata.finished:
+            raise _HeadFinished
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        self.metadata.end(tag)
+        if self.metadata.finished:
+            raise _HeadFinished
+
+    def handle_data(self, data):
+        self.metadata.data(data)
+
+
+def sniff_encoding(chunk, declared=None):
+    """
+    Guess the encoding of an HTML document.
+
+    The charset declared in the `Content-Type` header wins, then the `<meta charset>` of the document.
+
+    Args:
+        chunk (bytes): The beginning of the document.
+        declared (str): The charset from the `Content-Type` header, if any.
+
+    Returns:
+        str: The name of a known codec, 'utf-8' by default.
+    """
+    candidates = [declared]
+    match = _META_CHARSET_RE.search(chunk[:4096])
+    if match:
+        candidates.append(match.group(1).decode('ascii'))
+    for candidate in candidates:
+        if not candidate:
+            continue
+        try:
+            return codecs.lookup(candidate).name
+        except LookupError:
+            continue
+    return 'utf-8'
+
+
+def _read_lxml_events(parser, metadata):
+    for event, element in parser.read_events():
+        tag = element.tag.lower() if isinstance(element.tag, str) else ''
+        if event == 'start':
+            metadata.start(tag, element.attrib)
+        else:
+            if tag == 'title':
+                metadata.data(element.text or '')
+            metadata.end(tag)
+        if metadata.finished:
+            return
+
+
+def _feed_lxml(chunks, metadata, encoding, max_bytes):
+    parser = etree.HTMLPullParser(events=('start', 'end'), encoding=encoding, recover=True)
+    received = 0
+    for chunk in chunks:
+        received += len(chunk)
+        parser.feed(chunk)
+        _read_lxml_events(parser, metadata)
+        if metadata.finished or received >= max_bytes:
+            return
+    try:
+        parser.close()
+    except etree.Error:
+        return
+    _read_lxml_events(parser, metadata)
+
+
+def _feed_stdlib(chunks, metadata, encoding, max_bytes):
+    parser = _StdlibHeadParser(metadata)
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    received = 0
+    try:
+        for chunk in chunks:
+            received += len(chunk)
+            parser.feed(decoder.decode(chunk))
+            if received >= max_bytes:
+                return
+        parser.feed(decoder.decode(b'', final=True))
+        parser.close()
+    except _HeadFinished:
+        return
+
+
+def extract_head_metadata(chunks, encoding=None, max_bytes=DEFAULT_HEAD_BYTES, backend=None):
+    """
+    Extract the title, description, og:image and og:type of an HTML page from a stream of chunks.
+
+    Chunks are parsed as they arrive and reading stops at `</head>`, at the first tag of the page content or after
+    `max_bytes`, so the rest of the page is never downloaded or parsed. lxml is used when it is installed,
+    otherwise the standard library `html.parser`.
+
+    Args:
+        chunks (iterable): An iterable of `bytes` with the page body.
+        encoding (str): The charset from the `Content-Type` header, if any.
+        max_bytes (int): The maximum number of bytes to read.
+        backend (str): 'lxml' or 'html.parser' to force a backend, the fastest available by default.
+
+    Returns:
+        dict: A dictionary with the keys 'title', 'description', 'image' and 'type'. Missing values are ''.
+    """
+    chunks = iter(chunks)
+    metadata = HeadMetadata()
+    first_chunk = next(chunks, b'')
+    if not first_chunk:
+        return metadata.as_dict()
+
+    encoding = sniff_encoding(first_chunk, encoding)
+    stream = _chain(first_chunk, chunks)
+    if backend is None:
+        backend = 'lxml' if etree is not None else 'html.parser'
+    if backend == 'lxml':
+        _feed_lxml(stream, metadata, encoding, max_bytes)
+    else:
+        _feed_stdlib(stream, metadata, encoding, max_bytes)
+    return metadata.as_dict()
+
+
+def _chain(first_chunk, chunks):
+    yield first_chunk
+    yield from chunks
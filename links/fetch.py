@@ -0,0 +1,279 @@
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from email.message import Message
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import settings
+
+CHUNK_SIZE = 16 * 1024
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class FetchError(Exception):
+    """
+    Base exception of the fetch client.
+
+    Network errors, timeouts and too many redirects are raised as `FetchError` as well.
+    """
+
+
+class ResponseTooLarge(FetchError):
+    """
+    Raised when a response body exceeds the byte cap.
+    """
+
+
+class DeadlineExceeded(FetchError):
+    """
+    Raised when reading a response takes longer than the overall deadline.
+    """
+
+
+def get_session():
+    """
+    Return the process-wide session shared by all fetches.
+
+    The session keeps a pool of keep-alive connections per host, so repeated fetches from the same host
+    do not pay for a new TCP and TLS handshake. Cookies are never stored between fetches.
+
+    Returns:
+        requests.Session: The shared session.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def _build_session():
+    """
+    Build a session configured from `settings.LINK_FETCH`.
+
+    Returns:
+        requests.Session: The configured session.
+    """
+    conf = settings.LINK_FETCH
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=conf['POOL_CONNECTIONS'], pool_maxsize=conf['POOL_MAXSIZE'],
+                          max_retries=0, pool_block=False)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = conf['USER_AGENT']
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return session
+
+
+class FetchResponse:
+    """
+    A response whose body is read within a byte cap and an overall deadline.
+
+    Attributes:
+        status_code (int): The HTTP status code.
+        headers (CaseInsensitiveDict): The response headers.
+        url (str): The final URL after redirects.
+        encoding (str): The charset declared in the `Content-Type` header, or None.
+        content (bytes): The body, available after `read` has been called.
+
+    Methods:
+        iter_content: Yields the body in chunks.
+        close: Stops the deadline timers and releases the connection.
+        read: Reads the whole body.
+    """
+
+    def __init__(self, response, max_bytes, deadline_at):
+        self._response = response
+        self._max_bytes = max_bytes
+        self._deadline_at = deadline_at
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = response.url
+        self.encoding = _declared_charset(response.headers.get('Content-Type'))
+        self.content = None
+        self._aborted = False
+        self._watchdogs = []
+
+    def iter_content(self, chunk_size=CHUNK_SIZE):
+        """
+        Yield the body in chunks.
+
+        Args:
+            chunk_size (int): The maximum size of a chunk in bytes.
+
+        Raises:
+            ResponseTooLarge: If the body is larger than the byte cap.
+            DeadlineExceeded: If the overall deadline is reached before the body is read.
+            FetchError: If the connection fails while reading.
+        """
+        content_length = self.headers.get('Content-Length')
+        if content_length and content_length.isdigit() and int(content_length) > self._max_bytes:
+            raise ResponseTooLarge(f"Ответ {self.url} больше {self._max_bytes} байт")
+
+        # Таймаут чтения действует на каждый recv отдельно, поэтому сервер, присылающий данные по байту, держал бы
+        # соединение сколько угодно: по истечении общего срока сокет закрывается из другого потока
+        sock = self._response_socket()
+        watchdog = threading.Timer(max(self._deadline_at - time.monotonic(), 0), self._abort, args=(sock,))
+        watchdog.daemon = True
+        self._watchdogs.append(watchdog)
+        watchdog.start()
+        received = 0
+        try:
+            for chunk in self._response.iter_content(chunk_size=chunk_size):
+                received += len(chunk)
+                if received > self._max_bytes:
+                    raise ResponseTooLarge(f"Ответ {self.url} больше {self._max_bytes} байт")
+                if self._aborted or time.monotonic() > self._deadline_at:
+                    raise DeadlineExceeded(f"Превышено время получения ответа {self.url}")
+                yield chunk
+        except requests.RequestException as e:
+            if self._aborted:
+                raise DeadlineExceeded(f"Превышено время получения ответа {self.url}") from e
+            raise FetchError(str(e)) from e
+        finally:
+            watchdog.cancel()
+            if sock is not None:
+                sock.close()
+        if self._aborted:
+            # Ответ без Content-Length после закрытия сокета выглядит законченным
+            raise DeadlineExceeded(f"Превышено время получения ответа {self.url}")
+
+    def _response_socket(self):
+        """
+        Return a duplicate of the socket the body is read from, or None if the body is already read.
+
+        The connection drops its own reference to the socket when the server closes the connection after the response.
+        """
+        try:
+            return socket.socket(fileno=os.dup(self._response.raw.fileno()))
+        except (OSError, ValueError):
+            return None
+
+    def _abort(self, sock):
+        """
+        Shut down the socket of the response, so a read blocked in another thread returns at once.
+        """
+        self._aborted = True
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def close(self):
+        """
+        Stop the deadline timers and release the connection.
+        """
+        for watchdog in self._watchdogs:
+            watchdog.cancel()
+        self._response.close()
+
+    def read(self):
+        """
+        Read the whole body and store it in `content`.
+
+        Returns:
+            bytes: The body.
+        """
+        if self.content is None:
+            self.content = b''.join(self.iter_content())
+        return self.content
+
+
+def _declared_charset(content_type):
+    """
+    Return the charset parameter of a `Content-Type` header.
+
+    Args:
+        content_type (str): The header value.
+
+    Returns:
+        str: The charset, or None if it is not declared.
+    """
+    if not content_type:
+        return None
+    message = Message()
+    message['Content-Type'] = content_type
+    return message.get_param('charset')
+
+
+@contextmanager
+def open_url(url, headers=None, max_bytes=None):
+    """
+    Send a GET request and yield the response without reading the body.
+
+    Redirects are followed here rather than by `requests`, which would read the body of every redirect response
+    without the byte cap: the redirect responses are closed unread, at most `LINK_FETCH['MAX_REDIRECTS']` of them.
+    The overall deadline starts before the first connection, and the connect and read timeouts of every request
+    are shortened to the time left, so the redirects and the wait for the headers count towards it as well.
+    The connection goes back to the pool when the context exits.
+
+    Args:
+        url (str): The URL to fetch.
+        headers (dict): Additional request headers.
+        max_bytes (int): The byte cap of the body, `LINK_FETCH['MAX_BYTES']` by default.
+
+    Yields:
+        FetchResponse: The response.
+
+    Raises:
+        DeadlineExceeded: If the deadline is reached before the headers of the final response are received.
+        FetchError: If the request fails, times out or is redirected too many times.
+    """
+    conf = settings.LINK_FETCH
+    deadline_at = time.monotonic() + conf['DEADLINE']
+    session = get_session()
+    for _ in range(conf['MAX_REDIRECTS'] + 1):
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"Превышено время получения ответа {url}")
+        try:
+            timeout = (min(conf['CONNECT_TIMEOUT'], remaining), min(conf['READ_TIMEOUT'], remaining))
+            # Запрос отправляется адаптером: `Session.send` даже без перехода по перенаправлению читает его тело
+            request = session.prepare_request(requests.Request('GET', url, headers=headers))
+            response = session.get_adapter(url).send(request, stream=True, timeout=timeout)
+        except requests.RequestException as e:
+            if time.monotonic() >= deadline_at:
+                raise DeadlineExceeded(f"Превышено время получения ответа {url}") from e
+            raise FetchError(str(e)) from e
+        location = session.get_redirect_target(response)
+        if location is None:
+            break
+        response.close()
+        url = urljoin(response.url, location)
+    else:
+        raise FetchError(f"Больше {conf['MAX_REDIRECTS']} перенаправлений")
+    fetch_response = FetchResponse(response, max_bytes or conf['MAX_BYTES'], deadline_at)
+    try:
+        yield fetch_response
+    finally:
+        fetch_response.close()
+
+
+def fetch(url, headers=None, max_bytes=None):
+    """
+    Send a GET request and read the whole body.
+
+    Args:
+        url (str): The URL to fetch.
+        headers (dict): Additional request headers.
+        max_bytes (int): The byte cap of the body, `LINK_FETCH['MAX_BYTES']` by default.
+
+    Returns:
+        FetchResponse: The response with `content` filled in.
+
+    Raises:
+        FetchError: If the request fails, or the body is too large or too slow to read.
+    """
+    with open_url(url, headers=headers, max_bytes=max_bytes) as response:
+        response.read()
+    return response
@@ -0,0 +1,107 @@
+from datetime import datetime, time
+
+from django.db.models import Count
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from links.models import Link
+from links.normalization import url_domain
+
+LINK_TYPES = [type_ for type_, _ in Link.TYPE_CHOICES]
+
+# Параметры диапазонов дат: начало включается, конец не включается
+DATE_RANGE_PARAMS = {
+    'created_after': 'created_at__gte',
+    'created_before': 'created_at__lt',
+    'updated_after': 'updated_at__gte',
+    'updated_before': 'updated_at__lt',
+}
+
+
+def _parse_moment(name, value):
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            moment = datetime.combine(day, time.min) if day else None
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise ValidationError({name: ['Ожидается дата или дата и время в формате ISO 8601.']})
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def _parse_domain(value):
+    # Сайт можно указать и полным URL: схема, путь и `www.` отбрасываются
+    value = value.strip()
+    domain = url_domain(value if '://' in value else f'http://{value}')
+    if not domain:
+        raise ValidationError({'domain': ['Ожидается домен сайта, например example.com.']})
+    return domain
+
+
+def filter_links(queryset, params):
+    """
+    Filter links by the query parameters of the link list.
+
+    Supported parameters: `type` (one or several types separated by commas), `collection` (the primary key
+    of a collection), `domain` (the site of the URL, given as a domain or a URL; the scheme, the path and `www.`
+    are ignored) and the date ranges `created_after`,
+    `created_before`, `updated_after` and `updated_before` (ISO 8601 dates or date-times, the start is included,
+    the end is not). Together with the owner, every filter is served by an index on
+    `(owner, type | domain | created_at | updated_at, ...)`.
+
+    Args:
+        queryset (QuerySet): The links.
+        params (QueryDict): The query parameters.
+
+    Raises:
+        ValidationError: If a parameter has an invalid value.
+
+    Returns:
+        QuerySet: The filtered links.
+    """
+    if params.get('type'):
+        types = [type_.strip() for type_ in params['type'].split(',') if type_.strip()]
+        unknown = [type_ for type_ in types if type_ not in LINK_TYPES]
+        if unknown:
+            raise ValidationError({'type': [f'Неизвестный тип: {", ".join(unknown)}. '
+                                            f'Допустимые типы: {", ".join(LINK_TYPES)}.']})
+        queryset = queryset.filter(type__in=types)
+    if params.get('collection'):
+        try:
+            collection_id = int(params['collection'])
+        except ValueError:
+            raise ValidationError({'collection': ['Ожидается идентификатор коллекции.']})
+        queryset = queryset.filter(collection=collection_id)
+    if params.get('domain'):
+        queryset = queryset.filter(domain=_parse_domain(params['domain']))
+    for name, lookup in DATE_RANGE_PARAMS.items():
+        if params.get(name):
+            queryset = queryset.filter(**{lookup: _parse_moment(name, params[name])})
+    return queryset
+
+
+def get_link_facets(queryset):
+    """
+    Count the links of a queryset by type and by collection.
+
+    Each facet is computed with one grouped query, whatever the number of its values.
+
+    Args:
+        queryset (QuerySet): The filtered links.
+
+    Returns:
+        dict: The 'type' facet with the count of every type and the 'collection' facet with the count of links
+        in every collection that has any.
+    """
+    type_counts = dict(queryset.order_by().values_list('type').annotate(count=Count('pk')))
+    collection_counts = (Link.collection.through.objects.filter(link__in=queryset.order_by().values('pk'))
+                         .values_list('collection_id').annotate(count=Count('pk')).order_by('collection_id'))
+    return {
+        'type': {type_: type_counts.get(type_, 0) for type_ in LINK_TYPES},
+        'collection': dict(collection_counts),
+    }
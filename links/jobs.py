@@ -0,0 +1,142 @@
+import logging
+from datetime import timedelta
+
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from config import settings
+from links.metadata_cache import fetch_url_metadata
+from links.models import Link, LinkMetadataJob, PreviewBlob
+
+logger = logging.getLogger(__name__)
+
+
+def claim_jobs(limit):
+    """
+    Take up to `limit` jobs that are ready to run and mark them as running.
+
+    Pending jobs whose `run_after` has come are taken first. Running jobs locked longer than
+    `LINK_METADATA_QUEUE['LOCK_TIMEOUT']` seconds ago belong to a dead worker and are taken again, unless
+    they have used up `LINK_METADATA_QUEUE['MAX_ATTEMPTS']`: such jobs are marked as failed together
+    with their links.
+    Rows are locked with `SELECT ... FOR UPDATE SKIP LOCKED`, so several workers never take the same job.
+
+    Args:
+        limit (int): The maximum number of jobs to take.
+
+    Returns:
+        list: The primary keys of the taken jobs.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.LINK_METADATA_QUEUE['LOCK_TIMEOUT'])
+    max_attempts = settings.LINK_METADATA_QUEUE['MAX_ATTEMPTS']
+    with transaction.atomic():
+        exhausted = list(
+            LinkMetadataJob.objects.select_for_update(skip_locked=True)
+            .filter(status='running', locked_at__lt=stale, attempts__gte=max_attempts)
+            .values_list('pk', flat=True)
+        )
+        if exhausted:
+            LinkMetadataJob.objects.filter(pk__in=exhausted).update(
+                status='failed', last_error="Обработчик задачи не завершил последнюю попытку", updated_at=now)
+            Link.objects.filter(metadata_jobs__pk__in=exhausted).update(metadata_status='failed')
+        job_ids = list(
+            LinkMetadataJob.objects.select_for_update(skip_locked=True)
+            .filter(Q(status='pending', run_after__lte=now)
+                    | Q(status='running', locked_at__lt=stale, attempts__lt=max_attempts))
+            .order_by('run_after', 'pk')
+            .values_list('pk', flat=True)[:limit]
+        )
+        if job_ids:
+            LinkMetadataJob.objects.filter(pk__in=job_ids).update(
+                status='running', locked_at=now, attempts=F('attempts') + 1, updated_at=now)
+            Link.objects.filter(metadata_jobs__pk__in=job_ids).update(metadata_status='running')
+    return job_ids
+
+
+def process_job(job_id):
+    """
+    Fetch page data for the link of a running job and record the outcome.
+
+    The data comes from the shared `UrlMetadata` cache, so a page saved by many users is fetched once.
+    On success the link, read again under a lock, gets its title, description, type and preview except the fields
+    edited by the user, and the job is marked as done.
+    On failure the job goes back to the queue with an exponential delay, or is marked as failed together
+    with the link when `LINK_METADATA_QUEUE['MAX_ATTEMPTS']` is reached.
+
+    Args:
+        job_id (int): The primary key of the job.
+    """
+    job = LinkMetadataJob.objects.select_related('link').get(pk=job_id)
+    url = job.link.url
+    url_metadata = fetch_url_metadata(url)
+    if not url_metadata:
+        retry_or_fail_job(job, f"Не удалось получить данные страницы из {url}")
+        return
+
+    with transaction.atomic():
+        # Пока загружалась страница, пользователь мог изменить или удалить ссылку: данные применяются к текущей строке
+        link = Link.objects.select_for_update().filter(pk=job.link_id).first()
+        if link is None:
+            return
+        if link.url == url:
+            previous_blob_id = link.preview_blob_id
+            link.save(update_fields=link.apply_url_metadata(url_metadata))
+            PreviewBlob.replace_reference(previous_blob_id, link.preview_blob_id)
+    if link.url != url:
+        retry_or_fail_job(job, f"URL ссылки изменился во время получения данных страницы {url}")
+        return
+    job.status = 'done'
+    job.last_error = None
+    job.save(update_fields=['status', 'last_error', 'updated_at'])
+
+
+def retry_or_fail_job(job, error):
+    """
+    Record a failed attempt of a running job.
+
+    The job goes back to the queue with an exponential delay, or is marked as failed together with its link
+    when `LINK_METADATA_QUEUE['MAX_ATTEMPTS']` is reached.
+
+    Args:
+        job (LinkMetadataJob): The job.
+        error (str): The error of the attempt.
+    """
+    job.last_error = error
+    if job.attempts >= settings.LINK_METADATA_QUEUE['MAX_ATTEMPTS']:
+        job.status = 'failed'
+        Link.objects.filter(pk=job.link_id).update(metadata_status='failed')
+    else:
+        delay = settings.LINK_METADATA_QUEUE['RETRY_DELAY'] * 2 ** (job.attempts - 1)
+        job.status = 'pending'
+        job.run_after = timezone.now() + timedelta(seconds=delay)
+        Link.objects.filter(pk=job.link_id).update(metadata_status='pending')
+    job.save(update_fields=['status', 'last_error', 'run_after', 'updated_at'])
+
+
+def run_job(job_id):
+    """
+    Process a job in a worker thread.
+
+    Unexpected errors are logged instead of being raised, so one broken job does not stop the worker;
+    the attempt is recorded as failed, see `retry_or_fail_job`, so the job is retried later or given up
+    instead of staying running. The database connection of the thread is closed afterwards.
+
+    Args:
+        job_id (int): The primary key of the job.
+    """
+    try:
+        process_job(job_id)
+    except LinkMetadataJob.DoesNotExist:
+        logger.warning(f"Задача {job_id} была удалена до обработки")
+    except Exception as e:
+        logger.exception(f"Ошибка при обработке задачи {job_id}: {e}")
+        try:
+            job = LinkMetadataJob.objects.filter(pk=job_id, status='running').first()
+            if job is not None:
+                retry_or_fail_job(job, f"Ошибка при обработке задачи: {e}")
+        except Exception as e:
+            logger.exception(f"Не удалось сохранить ошибку задачи {job_id}: {e}")
+    finally:
+        close_old_connections()
@@ -0,0 +1,32 @@
+from django.core.management import BaseCommand
+
+from config import settings
+from links.models import PreviewBlob
+
+
+class Command(BaseCommand):
+    """
+    Management command for deleting preview files that are no longer used by any link or cache entry.
+    """
+    help = 'Удаляет файлы превью, на которые больше не ссылается ни одна ссылка.'
+
+    def add_arguments(self, parser):
+        """
+        Add command line arguments.
+
+        Args:
+            parser (ArgumentParser): The parser of the command.
+        """
+        parser.add_argument('--grace-period', type=int, default=settings.LINK_PREVIEWS['GC_GRACE_PERIOD'],
+                            help='Сколько секунд хранить файл после удаления последней ссылки на него.')
+
+    def handle(self, *args, **options):
+        """
+        Handle the command execution.
+
+        Args:
+            args: Command line arguments.
+            options: Command options.
+        """
+        deleted = PreviewBlob.collect_unused(options['grace_period'])
+        self.stdout.write(self.style.SUCCESS(f'Удалено файлов превью: {deleted}'))
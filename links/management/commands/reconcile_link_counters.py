@@ -0,0 +1,62 @@
+from datetime import timedelta
+
+from django.core.management import BaseCommand
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from link_collections.models import Collection
+from links.counters import reconcile_collection_counters, reconcile_daily_counters, reconcile_user_counters
+from links.models import Link, LinkDailyCounter
+from users.models import User
+
+
+class Command(BaseCommand):
+    """
+    Management command for recomputing the link counters of users, link types, days and collections.
+
+    The counters are maintained on every change, this command repairs them after direct database edits or bugs.
+    Rows are processed in ranges of `--batch-size` primary keys, each in its own short transaction; the daily
+    counters, a row per day, type and shard, are recomputed in ranges of `--days` days the same way.
+    """
+    help = 'Пересчитывает счетчики ссылок пользователей, типов ссылок, дней и коллекций.'
+
+    def add_arguments(self, parser):
+        """
+        Add command line arguments.
+
+        Args:
+            parser (ArgumentParser): The parser of the command.
+        """
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Количество пользователей или коллекций, пересчитываемых за раз.')
+        parser.add_argument('--days', type=int, default=31,
+                            help='Количество дней, счетчики которых пересчитываются за раз.')
+
+    def handle(self, *args, **options):
+        """
+        Handle the command execution.
+
+        Args:
+            args: Command line arguments.
+            options: Command options.
+        """
+        batch_size = max(options['batch_size'], 1)
+        for model, reconcile, label in ((User, reconcile_user_counters, 'пользователей'),
+                                        (Collection, reconcile_collection_counters, 'коллекций')):
+            last_pk = model.objects.aggregate(last_pk=Max('pk'))['last_pk'] or 0
+            fixed = 0
+            for first_pk in range(1, last_pk + 1, batch_size):
+                fixed += reconcile(first_pk, first_pk + batch_size - 1)
+            self.stdout.write(self.style.SUCCESS(f'Исправлено счетчиков {label}: {fixed}'))
+        days = max(options['days'], 1)
+        links = Link.objects.aggregate(first=Min('created_at'), last=Max('created_at'))
+        counters = LinkDailyCounter.objects.aggregate(first=Min('day'), last=Max('day'))
+        bounds = [timezone.localdate(value) for value in links.values() if value]
+        bounds += [value for value in counters.values() if value]
+        fixed = 0
+        if bounds:
+            first_day, last_day = min(bounds), max(bounds)
+            while first_day <= last_day:
+                fixed += reconcile_daily_counters(first_day, min(first_day + timedelta(days=days - 1), last_day))
+                first_day += timedelta(days=days)
+        self.stdout.write(self.style.SUCCESS(f'Исправлено счетчиков по дням: {fixed}'))
@@ -0,0 +1,60 @@
+import time
+
+from django.core.management import BaseCommand
+
+from config import settings
+from links.models import MetadataRefreshCheckpoint
+from links.refresh import refresh_stale_links
+
+
+class Command(BaseCommand):
+    """
+    Management command for refreshing outdated page data of links.
+
+    Links whose page data is older than `--max-age` seconds are refreshed from the oldest, with conditional requests.
+    The progress is saved after every batch, so an interrupted run continues where it stopped.
+    With `--interval` the command keeps running and starts a new pass every `--interval` seconds.
+    """
+    help = 'Обновляет устаревшие данные страниц для ссылок.'
+
+    def add_arguments(self, parser):
+        """
+        Add command line arguments.
+
+        Args:
+            parser (ArgumentParser): The parser of the command.
+        """
+        conf = settings.LINK_METADATA_REFRESH
+        parser.add_argument('--max-age', type=int, default=conf['MAX_AGE'],
+                            help='Возраст данных страницы в секундах, после которого ссылка обновляется.')
+        parser.add_argument('--batch-size', type=int, default=conf['BATCH_SIZE'],
+                            help='Количество ссылок, обновляемых и сохраняемых за раз.')
+        parser.add_argument('--concurrency', type=int, default=settings.LINK_METADATA_QUEUE['CONCURRENCY'],
+                            help='Количество страниц, запрашиваемых одновременно.')
+        parser.add_argument('--limit', type=int, help='Обработать не более указанного количества ссылок.')
+        parser.add_argument('--interval', type=int,
+                            help='Повторять проход каждые указанные секунды вместо однократного запуска.')
+        parser.add_argument('--reset', action='store_true', help='Начать проход заново с самых старых ссылок.')
+
+    def handle(self, *args, **options):
+        """
+        Handle the command execution.
+
+        Args:
+            args: Command line arguments.
+            options: Command options.
+        """
+        if options['reset']:
+            MetadataRefreshCheckpoint.objects.filter(name='default').delete()
+
+        while True:
+            stats = refresh_stale_links(options['max_age'], max(options['batch_size'], 1), options['concurrency'],
+                                        limit=options['limit'])
+            state = 'проход завершен' if stats['finished'] else 'проход будет продолжен при следующем запуске'
+            self.stdout.write(self.style.SUCCESS(
+                f"Обработано ссылок: {stats['processed']}, обновлено: {stats['refreshed']}, "
+                f"изменилось: {stats['changed']}, ошибок: {stats['failed']} ({state})"))
+            if not options['interval']:
+                break
+            if stats['finished']:
+                time.sleep(options['interval'])
@@ -0,0 +1,66 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.management import BaseCommand
+
+from config import settings
+from links.jobs import claim_jobs, run_job
+
+
+class Command(BaseCommand):
+    """
+    Management command for processing the queue of link page data jobs.
+
+    The worker keeps up to `--concurrency` jobs in progress at the same time, each in its own thread.
+    """
+    help = 'Обрабатывает очередь задач получения данных страниц для ссылок.'
+
+    def add_arguments(self, parser):
+        """
+        Add command line arguments.
+
+        Args:
+            parser (ArgumentParser): The parser of the command.
+        """
+        parser.add_argument('--concurrency', type=int, default=settings.LINK_METADATA_QUEUE['CONCURRENCY'],
+                            help='Количество задач, обрабатываемых одновременно.')
+        parser.add_argument('--poll-interval', type=float, default=settings.LINK_METADATA_QUEUE['POLL_INTERVAL'],
+                            help='Пауза в секундах между проверками пустой очереди.')
+        parser.add_argument('--once', action='store_true',
+                            help='Обработать готовые к запуску задачи и завершить работу.')
+
+    def handle(self, *args, **options):
+        """
+        Handle the command execution.
+
+        Args:
+            args: Command line arguments.
+            options: Command options.
+        """
+        concurrency = max(options['concurrency'], 1)
+        poll_interval = options['poll_interval']
+        processed = 0
+        in_flight = set()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            try:
+                while True:
+                    free_slots = concurrency - len(in_flight)
+                    if free_slots:
+                        for job_id in claim_jobs(free_slots):
+                            in_flight.add(executor.submit(run_job, job_id))
+
+                    if not in_flight:
+                        if options['once']:
+                            break
+                        time.sleep(poll_interval)
+                        continue
+
+                    done, in_flight = wait(in_flight, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                    processed += len(done)
+            except KeyboardInterrupt:
+                self.stdout.write('Остановка воркера, ожидание завершения текущих задач...')
+                wait(in_flight)
+                processed += len(in_flight)
+
+        self.stdout.write(self.style.SUCCESS(f'Обработано задач: {processed}'))
@@ -0,0 +1,52 @@
+from django.core.management import BaseCommand
+
+from links.metadata_cache import fetch_url_metadata, get_cache_stats, popular_urls, purge_cache
+
+
+class Command(BaseCommand):
+    """
+    Management command for inspecting, purging and warming the shared page data cache.
+
+    Actions:
+        stats: Prints the number of entries, hits, misses and the hit ratio.
+        purge: Deletes all entries, or only expired ones with `--expired`.
+        warm: Fetches the given URLs, or the most saved URLs when none are given.
+    """
+    help = 'Статистика, очистка и прогрев общего кэша данных страниц.'
+
+    def add_arguments(self, parser):
+        """
+        Add command line arguments.
+
+        Args:
+            parser (ArgumentParser): The parser of the command.
+        """
+        parser.add_argument('action', choices=['stats', 'purge', 'warm'])
+        parser.add_argument('urls', nargs='*', help='URL для прогрева.')
+        parser.add_argument('--expired', action='store_true', help='Удалить только устаревшие записи.')
+        parser.add_argument('--limit', type=int, default=100,
+                            help='Количество самых популярных URL для прогрева, если URL не указаны.')
+
+    def handle(self, *args, **options):
+        """
+        Handle the command execution.
+
+        Args:
+            args: Command line arguments.
+            options: Command options.
+        """
+        action = options['action']
+        if action == 'stats':
+            stats = get_cache_stats()
+            self.stdout.write(
+                f"Записей: {stats['entries']} (актуальных: {stats['fresh']}), "
+                f"попаданий: {stats['hits']}, промахов: {stats['misses']}, "
+                f"доля попаданий: {stats['hit_ratio']:.1%}"
+            )
+        elif action == 'purge':
+            deleted = purge_cache(expired_only=options['expired'])
+            self.stdout.write(self.style.SUCCESS(f'Удалено записей: {deleted}'))
+        else:
+            urls = options['urls'] or popular_urls(options['limit'])
+            warmed = sum(1 for url in urls if fetch_url_metadata(url))
+            self.stdout.write(self.style.SUCCESS(f'Прогрето URL: {warmed} из {len(urls)}'))
@@ -0,0 +1,131 @@
+import logging
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from config import settings
+from links.models import Link, PreviewBlob, UrlMetadata
+from links.normalization import hash_url, normalize_url
+from links.services import get_page_data
+
+logger = logging.getLogger(__name__)
+
+
+def fetch_url_metadata(url):
+    """
+    Return fresh page data of a URL from the shared cache, fetching the page only when needed.
+
+    A fresh entry is returned as is and counts as a hit. A stale entry is revalidated with a conditional request;
+    on 304 Not Modified only its lifetime is extended. Otherwise the page is fetched and the entry is created
+    or overwritten. Both cases count as a miss.
+
+    Args:
+        url (str): The URL of the page.
+
+    Returns:
+        UrlMetadata: The fresh entry, or None if the page data could not be fetched.
+    """
+    url_hash = hash_url(url)
+    url_metadata = UrlMetadata.objects.select_related('preview_blob').filter(url_hash=url_hash).first()
+    now = timezone.now()
+    if url_metadata and url_metadata.expires_at > now:
+        UrlMetadata.count_hits([url_metadata.pk])
+        return url_metadata
+
+    if url_metadata:
+        page_data = get_page_data(url, etag=url_metadata.etag, last_modified=url_metadata.last_modified)
+    else:
+        page_data = get_page_data(url)
+    if not page_data:
+        return None
+
+    expires_at = now + timedelta(seconds=settings.URL_METADATA_CACHE['TTL'])
+    if page_data.get('not_modified'):
+        UrlMetadata.objects.filter(pk=url_metadata.pk).update(
+            fetched_at=now, expires_at=expires_at, misses=F('misses') + 1)
+        url_metadata.fetched_at = now
+        url_metadata.expires_at = expires_at
+        return url_metadata
+
+    if url_metadata is None:
+        url_metadata = UrlMetadata(url_hash=url_hash, url=normalize_url(url))
+    previous_blob_id = url_metadata.preview_blob_id
+    url_metadata.title = page_data['title'][:255]
+    url_metadata.description = page_data['description']
+    url_metadata.type = page_data['type']
+    url_metadata.etag = page_data['etag'][:255] or None
+    url_metadata.last_modified = page_data['last_modified'][:64] or None
+    url_metadata.fetched_at = now
+    url_metadata.expires_at = expires_at
+    # Ссылка записи на файл превью берется в PreviewBlob.store, прежний файл освобождается после сохранения
+    url_metadata.preview_blob = PreviewBlob.store(page_data['image']) if page_data['image'] else None
+
+    if url_metadata.pk:
+        with transaction.atomic():
+            url_metadata.save()
+            UrlMetadata.objects.filter(pk=url_metadata.pk).update(misses=F('misses') + 1)
+            PreviewBlob.replace_reference(previous_blob_id, None)
+        return url_metadata
+
+    url_metadata.misses = 1
+    try:
+        with transaction.atomic():
+            url_metadata.save()
+    except IntegrityError:
+        # Страницу одновременно получил другой воркер, используем его запись
+        PreviewBlob.replace_reference(url_metadata.preview_blob_id, None)
+        return UrlMetadata.objects.select_related('preview_blob').filter(url_hash=url_hash).first()
+    return url_metadata
+
+
+def get_cache_stats():
+    """
+    Return the counters of the shared page data cache.
+
+    Returns:
+        dict: The number of entries and fresh entries, total hits and misses, and the hit ratio.
+    """
+    stats = UrlMetadata.objects.aggregate(entries=Count('pk'), hits=Sum('hits'), misses=Sum('misses'))
+    stats['fresh'] = UrlMetadata.objects.filter(expires_at__gt=timezone.now()).count()
+    stats['hits'] = stats['hits'] or 0
+    stats['misses'] = stats['misses'] or 0
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+    return stats
+
+
+def purge_cache(expired_only=False):
+    """
+    Delete entries of the shared page data cache.
+
+    The preview blobs of deleted entries lose a reference; the files themselves are kept as long as links
+    point at them.
+
+    Args:
+        expired_only (bool): Delete only entries that are no longer fresh.
+
+    Returns:
+        int: The number of deleted entries.
+    """
+    queryset = UrlMetadata.objects.all()
+    if expired_only:
+        queryset = queryset.filter(expires_at__lte=timezone.now())
+    deleted, _ = queryset.delete()
+    return deleted
+
+
+def popular_urls(limit):
+    """
+    Return the URLs saved by the largest number of links.
+
+    Args:
+        limit (int): The maximum number of URLs.
+
+    Returns:
+        list: The URLs, most saved first.
+    """
+    return list(
+        Link.objects.values('url').annotate(links=Count('pk')).order_by('-links').values_list('url', flat=True)[:limit]
+    )
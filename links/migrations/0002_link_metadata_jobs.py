@@ -0,0 +1,51 @@
+# Generated by Django 5.0.4 on 2026-10-18 00:57
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def mark_existing_links_done(apps, schema_editor):
+    # Данные существующих ссылок уже были получены при сохранении
+    Link = apps.get_model('links', 'Link')
+    Link.objects.update(metadata_status='done')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('links', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='link',
+            name='metadata_fetched_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='дата и время получения данных страницы'),
+        ),
+        migrations.AddField(
+            model_name='link',
+            name='metadata_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20, verbose_name='статус получения данных страницы'),
+        ),
+        migrations.RunPython(mark_existing_links_done, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='LinkMetadataJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20, verbose_name='статус задачи')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='количество попыток')),
+                ('last_error', models.TextField(blank=True, null=True, verbose_name='последняя ошибка')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='запустить не раньше')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='дата и время взятия в работу')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='дата и время создания')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='дата и время обновления')),
+                ('link', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='metadata_jobs', to='links.link', verbose_name='ссылка')),
+            ],
+            options={
+                'verbose_name': 'задача получения данных страницы',
+                'verbose_name_plural': 'задачи получения данных страницы',
+                'indexes': [models.Index(fields=['status', 'run_after'], name='links_job_status_run_after_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.4 on 2026-10-18 01:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('links', '0002_link_metadata_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UrlMetadata',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url_hash', models.CharField(max_length=64, unique=True, verbose_name='хэш нормализованного URL')),
+                ('url', models.TextField(verbose_name='нормализованный URL')),
+                ('title', models.CharField(blank=True, max_length=255, null=True, verbose_name='заголовок страницы')),
+                ('description', models.TextField(blank=True, null=True, verbose_name='краткое описание')),
+                ('type', models.CharField(choices=[('website', 'Website'), ('book', 'Book'), ('article', 'Article'), ('music', 'Music'), ('video', 'Video')], default='website', max_length=20, verbose_name='тип ссылки')),
+                ('preview', models.ImageField(blank=True, null=True, upload_to='link_previews/', verbose_name='превью ссылки')),
+                ('etag', models.CharField(blank=True, max_length=255, null=True, verbose_name='ETag страницы')),
+                ('last_modified', models.CharField(blank=True, max_length=64, null=True, verbose_name='Last-Modified страницы')),
+                ('fetched_at', models.DateTimeField(verbose_name='дата и время получения данных страницы')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='актуально до')),
+                ('hits', models.PositiveBigIntegerField(default=0, verbose_name='попадания в кэш')),
+                ('misses', models.PositiveBigIntegerField(default=0, verbose_name='промахи кэша')),
+            ],
+            options={
+                'verbose_name': 'кэш данных страницы',
+                'verbose_name_plural': 'кэш данных страниц',
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.0.4 on 2026-10-18 01:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def expire_entries_with_preview(apps, schema_editor):
+    # Превью записей кэша переносятся в PreviewBlob при следующем получении страницы
+    UrlMetadata = apps.get_model('links', 'UrlMetadata')
+    UrlMetadata.objects.exclude(preview__isnull=True).exclude(preview='').update(expires_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('links', '0003_url_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PreviewBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='SHA-256 содержимого')),
+                ('file', models.ImageField(upload_to='link_previews/', verbose_name='файл превью')),
+                ('size', models.PositiveIntegerField(default=0, verbose_name='размер в байтах')),
+                ('ref_count', models.IntegerField(default=0, verbose_name='количество ссылок на файл')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='дата и время создания')),
+                ('released_at', models.DateTimeField(blank=True, null=True, verbose_name='дата и время освобождения')),
+            ],
+            options={
+                'verbose_name': 'файл превью',
+                'verbose_name_plural': 'файлы превью',
+            },
+        ),
+        migrations.RunPython(expire_entries_with_preview, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='urlmetadata',
+            name='preview',
+        ),
+        migrations.AddField(
+            model_name='link',
+            name='preview_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='links', to='links.previewblob', verbose_name='файл превью'),
+        ),
+        migrations.AddField(
+            model_name='urlmetadata',
+            name='preview_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='url_metadata', to='links.previewblob', verbose_name='файл превью'),
+        ),
+    ]
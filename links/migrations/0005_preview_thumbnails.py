@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-18 01:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('links', '0004_preview_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='previewblob',
+            name='thumbnail',
+            field=models.ImageField(blank=True, null=True, upload_to='link_previews/', verbose_name='миниатюра превью'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.4 on 2026-10-18 01:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('link_collections', '0001_initial'),
+        ('links', '0005_preview_thumbnails'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetadataRefreshCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='название')),
+                ('last_fetched_at', models.DateTimeField(blank=True, null=True, verbose_name='дата получения данных последней ссылки')),
+                ('last_link_id', models.PositiveBigIntegerField(default=0, verbose_name='последняя обработанная ссылка')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='дата и время начала прохода')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='дата и время обновления')),
+            ],
+            options={
+                'verbose_name': 'позиция обновления данных страниц',
+                'verbose_name_plural': 'позиции обновления данных страниц',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='link',
+            index=models.Index(fields=['metadata_fetched_at', 'id'], name='links_link_fetched_at_idx'),
+        ),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 5.0.4 on 2026-10-18 01:14
+
+import hashlib
+from urllib.parse import unquote_plus, urlsplit, urlunsplit
+
+from django.conf import settings
+from django.db import migrations, models, transaction
+
+BACKFILL_BATCH_SIZE = 1000
+
+# Копия links.normalization на момент миграции: хэши должны совпадать с теми, что вычисляло приложение этой версии,
+# даже если нормализация позже изменится
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'gbraid', 'wbraid', 'msclkid', 'yclid', 'ysclid', 'igshid', 'mc_cid', 'mc_eid',
+    '_ga', '_gl', '_hsenc', '_hsmi', 'mkt_tok', 'ref_src', 'spm',
+}
+TRACKING_PARAM_PREFIXES = ('utm_', 'pk_')
+
+
+def _is_tracking_param(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PARAM_PREFIXES)
+
+
+def normalize_url(url):
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    path = parts.path
+    if not path:
+        path = '/'
+    elif len(path) > 1 and path.endswith('/'):
+        path = path.rstrip('/') or '/'
+    query = '&'.join(param for param in parts.query.split('&')
+                     if param and not _is_tracking_param(unquote_plus(param.split('=')[0])))
+    fragment = parts.fragment if parts.fragment.startswith('!') else ''
+    try:
+        host = parts.hostname or ''
+        port = parts.port
+    except ValueError:
+        return urlunsplit((scheme, parts.netloc.lower(), path, query, fragment))
+
+    if ':' in host:
+        host = f'[{host}]'
+    netloc = host.rstrip('.')
+    if port and DEFAULT_PORTS.get(scheme) != port:
+        netloc = f'{netloc}:{port}'
+    if parts.username is not None:
+        userinfo = parts.username if parts.password is None else f'{parts.username}:{parts.password}'
+        netloc = f'{userinfo}@{netloc}'
+    return urlunsplit((scheme, netloc, path, query, fragment))
+
+
+def hash_url(url):
+    return hashlib.sha256(normalize_url(url).encode('utf-8')).hexdigest()
+
+
+def backfill_url_hash(apps, schema_editor):
+    # Хэши заполняются пачками в отдельных транзакциях. Если у владельца уже есть ссылка с тем же нормализованным
+    # URL, у более поздней ссылки хэш остается пустым: дубликаты не удаляются, но и не мешают ограничению
+    Link = apps.get_model('links', 'Link')
+    last_pk = 0
+    while True:
+        batch = list(Link.objects.filter(pk__gt=last_pk, url_hash__isnull=True).order_by('pk').only('pk', 'url', 'owner_id')[:BACKFILL_BATCH_SIZE])
+        if not batch:
+            return
+        last_pk = batch[-1].pk
+        for link in batch:
+            link.url_hash = hash_url(link.url)
+        with transaction.atomic():
+            taken = set(Link.objects.filter(owner_id__in={link.owner_id for link in batch}, url_hash__in={link.url_hash for link in batch}).values_list('owner_id', 'url_hash'))
+            unique = []
+            for link in batch:
+                key = (link.owner_id, link.url_hash)
+                if key not in taken:
+                    taken.add(key)
+                    unique.append(link)
+            Link.objects.bulk_update(unique, ['url_hash'])
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('link_collections', '0001_initial'),
+        ('links', '0006_link_metadata_refresh'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='link',
+            name='url_hash',
+            field=models.CharField(blank=True, max_length=64, null=True, verbose_name='хэш нормализованного URL'),
+        ),
+        migrations.AddConstraint(
+            model_name='link',
+            constraint=models.UniqueConstraint(fields=('owner', 'url_hash'), name='links_link_owner_url_hash_uniq'),
+        ),
+        migrations.RunPython(backfill_url_hash, migrations.RunPython.noop),
+    ]
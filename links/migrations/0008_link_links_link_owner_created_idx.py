@@ -0,0 +1,20 @@
+# Generated by Django 5.0.4 on 2026-10-18 01:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('link_collections', '0002_collection_collections_owner_created_idx'),
+        ('links', '0007_link_url_hash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='link',
+            index=models.Index(fields=['owner', 'created_at', 'id'], name='links_link_owner_created_idx'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.0.4 on 2026-10-18 01:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    # Начальные значения счетчиков считаются по существующим ссылкам
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Collection = apps.get_model('link_collections', 'Collection')
+    Link = apps.get_model('links', 'Link')
+    LinkTypeCounter = apps.get_model('links', 'LinkTypeCounter')
+
+    user_links = Link.objects.filter(owner=OuterRef('pk')).order_by().values('owner').annotate(count=Count('pk'))
+    User.objects.update(links_count=Coalesce(Subquery(user_links.values('count')[:1]), Value(0)))
+    collection_links = (Link.collection.through.objects.filter(collection_id=OuterRef('pk')).order_by()
+                        .values('collection_id').annotate(count=Count('pk')))
+    Collection.objects.update(links_count=Coalesce(Subquery(collection_links.values('count')[:1]), Value(0)))
+    type_counts = Link.objects.values_list('owner_id', 'type').annotate(count=Count('pk')).order_by()
+    LinkTypeCounter.objects.bulk_create(
+        [LinkTypeCounter(owner_id=owner_id, type=type_, count=count) for owner_id, type_, count in type_counts],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('links', '0008_link_links_link_owner_created_idx'),
+        ('link_collections', '0003_collection_links_count'),
+        ('users', '0003_user_links_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LinkTypeCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('website', 'Website'), ('book', 'Book'), ('article', 'Article'), ('music', 'Music'), ('video', 'Video')], max_length=20, verbose_name='тип ссылок')),
+                ('count', models.IntegerField(default=0, verbose_name='количество ссылок')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='link_type_counters', to=settings.AUTH_USER_MODEL, verbose_name='владелец ссылок')),
+            ],
+            options={
+                'verbose_name': 'счетчик ссылок по типу',
+                'verbose_name_plural': 'счетчики ссылок по типам',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='linktypecounter',
+            constraint=models.UniqueConstraint(fields=('owner', 'type'), name='links_type_counter_owner_type_uniq'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.0.4 on 2026-10-18 01:22
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def fill_daily_counters(apps, schema_editor):
+    # Начальные значения счетчиков считаются по существующим ссылкам
+    Link = apps.get_model('links', 'Link')
+    LinkDailyCounter = apps.get_model('links', 'LinkDailyCounter')
+    day_counts = (Link.objects.annotate(day=TruncDate('created_at')).values_list('day', 'type')
+                  .annotate(count=Count('pk')).order_by())
+    LinkDailyCounter.objects.bulk_create(
+        [LinkDailyCounter(day=day, type=type_, count=count) for day, type_, count in day_counts],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('links', '0009_link_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LinkDailyCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='день создания ссылок')),
+                ('type', models.CharField(choices=[('website', 'Website'), ('book', 'Book'), ('article', 'Article'), ('music', 'Music'), ('video', 'Video')], max_length=20, verbose_name='тип ссылок')),
+                ('count', models.IntegerField(default=0, verbose_name='количество ссылок')),
+            ],
+            options={
+                'verbose_name': 'счетчик ссылок за день',
+                'verbose_name_plural': 'счетчики ссылок по дням',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='linkdailycounter',
+            constraint=models.UniqueConstraint(fields=('day', 'type'), name='links_daily_counter_day_type_uniq'),
+        ),
+        migrations.RunPython(fill_daily_counters, migrations.RunPython.noop),
+    ]
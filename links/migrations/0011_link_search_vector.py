@@ -0,0 +1,70 @@
+# Generated by Django 5.0.4 on 2026-10-18 01:24
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Документ поиска: заголовок, описание и URL с весами A, B и C
+SEARCH_DOCUMENT = """
+    setweight(to_tsvector('simple', coalesce({row}title, '')), 'A')
+    || setweight(to_tsvector('simple', coalesce({row}description, '')), 'B')
+    || setweight(to_tsvector('simple', coalesce({row}url, '')), 'C')
+"""
+
+CREATE_SEARCH = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    f"""
+    CREATE OR REPLACE FUNCTION links_link_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := {SEARCH_DOCUMENT.format(row='NEW.')};
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER links_link_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, description, url ON links_link
+    FOR EACH ROW EXECUTE FUNCTION links_link_search_vector_update()
+    """,
+    f'UPDATE links_link SET search_vector = {SEARCH_DOCUMENT.format(row="")}',
+    'CREATE INDEX links_link_search_vector_idx ON links_link USING gin (search_vector)',
+    # Выражение совпадает с тем, которое Django строит для url__icontains
+    'CREATE INDEX links_link_url_trgm_idx ON links_link USING gin ((UPPER(url::text)) gin_trgm_ops)',
+]
+
+DROP_SEARCH = [
+    'DROP INDEX IF EXISTS links_link_url_trgm_idx',
+    'DROP INDEX IF EXISTS links_link_search_vector_idx',
+    'DROP TRIGGER IF EXISTS links_link_search_vector_trigger ON links_link',
+    'DROP FUNCTION IF EXISTS links_link_search_vector_update()',
+]
+
+
+def create_search(apps, schema_editor):
+    # Триггер и индексы есть только в PostgreSQL, в остальных базах поиск работает без них
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in CREATE_SEARCH:
+        schema_editor.execute(sql)
+
+
+def drop_search(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in DROP_SEARCH:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('links', '0010_link_daily_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='link',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True, verbose_name='поисковый вектор'),
+        ),
+        migrations.RunPython(create_search, drop_search),
+    ]
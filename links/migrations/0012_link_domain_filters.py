@@ -0,0 +1,61 @@
+# Generated by Django 5.0.4 on 2026-10-18 01:26
+
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import migrations, models
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def url_domain(url):
+    # Копия links.normalization.url_domain на момент миграции
+    try:
+        host = urlsplit(url.strip()).hostname or ''
+    except ValueError:
+        return ''
+    host = host.rstrip('.')
+    return host[4:] if host.startswith('www.') else host
+
+
+def backfill_domain(apps, schema_editor):
+    Link = apps.get_model('links', 'Link')
+    last_pk = 0
+    while True:
+        batch = list(Link.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', 'url')[:BACKFILL_BATCH_SIZE])
+        if not batch:
+            return
+        last_pk = batch[-1].pk
+        for link in batch:
+            link.domain = url_domain(link.url)
+        Link.objects.bulk_update(batch, ['domain'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('link_collections', '0003_collection_links_count'),
+        ('links', '0011_link_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='link',
+            name='domain',
+            field=models.CharField(blank=True, max_length=255, null=True, verbose_name='домен'),
+        ),
+        migrations.RunPython(backfill_domain, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='link',
+            index=models.Index(fields=['owner', 'updated_at', 'id'], name='links_link_owner_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='link',
+            index=models.Index(fields=['owner', 'type', 'created_at', 'id'], name='links_link_owner_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='link',
+            index=models.Index(fields=['owner', 'domain', 'created_at', 'id'], name='links_link_owner_domain_idx'),
+        ),
+    ]
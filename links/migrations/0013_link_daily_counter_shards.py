@@ -0,0 +1,26 @@
+# Generated by Django 5.0.4 on 2026-10-18 02:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('links', '0012_link_domain_filters'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='linkdailycounter',
+            name='links_daily_counter_day_type_uniq',
+        ),
+        migrations.AddField(
+            model_name='linkdailycounter',
+            name='shard',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='сегмент счетчика'),
+        ),
+        migrations.AddConstraint(
+            model_name='linkdailycounter',
+            constraint=models.UniqueConstraint(fields=('day', 'type', 'shard'), name='links_daily_counter_day_type_shard_uniq'),
+        ),
+    ]
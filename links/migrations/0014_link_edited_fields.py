@@ -0,0 +1,19 @@
+# Generated by Django 5.0.4 on 2026-10-18 02:34
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('links', '0013_link_daily_counter_shards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='link',
+            name='edited_fields',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=20), blank=True, default=list, size=None, verbose_name='поля, измененные пользователем'),
+        ),
+    ]
@@ -1,10 +1,25 @@
-from django.db import models
+import hashlib
+import logging
+import random
+from datetime import timedelta
+
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.search import SearchVectorField
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, ProtectedError
+from django.utils import timezone
 
 from config import settings
+from config.ownership import OwnedQuerySet
 from link_collections.models import Collection
-from links.services import get_page_data
+from links.normalization import hash_url, url_domain
+from links.previews import PREVIEW_EXTENSION, InvalidImage, render_preview
 from users.models import NULLABLE
 
+logger = logging.getLogger(__name__)
+
 
 class Link(models.Model):
     """
@@ -12,23 +27,40 @@ class Link(models.Model):
 
     Attributes:
         TYPE_CHOICES (list): A list of tuples representing the choices for the type field.
+        METADATA_STATUS_CHOICES (list): A list of tuples representing the states of the page data fetching.
+        EDITABLE_METADATA_FIELDS (tuple): The fields filled in from the page data that the user can also edit.
         title (CharField): The title of the page.
         description (TextField): A brief description of the page.
         url (URLField): The URL of the page.
-        preview (ImageField): An image preview of the page.
+        url_hash (CharField): The hash of the normalized URL, unique per owner, see `links.normalization.hash_url`.
+        domain (CharField): The domain of the URL without `www.`, see `links.normalization.url_domain`.
+        preview (ImageField): An image preview of the page, the file of `preview_blob`.
+        preview_blob (ForeignKey): The shared content-addressed preview file.
         type (CharField): The type of the link.
         created_at (DateTimeField): The date and time when the link was created.
         updated_at (DateTimeField): The date and time when the link was last updated.
+        metadata_status (CharField): The state of the background page data fetching.
+        metadata_fetched_at (DateTimeField): The date and time when the page data was last fetched.
+        edited_fields (ArrayField): The fields of `EDITABLE_METADATA_FIELDS` set by the user, which the page data
+        no longer overwrites.
+        search_vector (SearchVectorField): The full-text index document of the title, description and URL, written
+        by a database trigger on PostgreSQL, see `links.search`.
         collection (ManyToManyField): The collections that the link belongs to.
         owner (ForeignKey): The user who owns the link.
+        objects (Manager): The manager scoping the links to their owner, see `OwnedQuerySet`.
 
     Methods:
-        save: Overrides the `save` method to fetch and set page data when the link is first created.
+        from_db: Overrides the `from_db` method to remember the type and the URL loaded from the database.
+        save: Overrides the `save` method to enqueue page data fetching when the link is first created.
+        apply_url_metadata: Copies the shared page data of the URL to the link.
         __str__: Returns a string representation of the link.
 
     Meta:
         verbose_name (str): The singular name of the model used in the admin interface.
         verbose_name_plural (str): The plural name of the model used in the admin interface.
+        indexes (list): The indexes used to find links with the oldest page data and to paginate and filter the links
+        of a user.
+        constraints (list): The uniqueness of the normalized URL per owner.
     """
     TYPE_CHOICES = [
         ('website', 'Website'),
@@ -38,41 +70,117 @@ class Link(models.Model):
         ('video', 'Video'),
     ]
 
+    METADATA_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    EDITABLE_METADATA_FIELDS = ('title', 'description', 'type', 'preview')
+
     title = models.CharField(max_length=255, verbose_name='заголовок страницы', **NULLABLE)
     description = models.TextField(verbose_name='краткое описание', **NULLABLE)
     url = models.URLField(verbose_name='ссылка на страницу')
+    url_hash = models.CharField(max_length=64, verbose_name='хэш нормализованного URL', **NULLABLE)
+    domain = models.CharField(max_length=255, verbose_name='домен', **NULLABLE)
     preview = models.ImageField(upload_to='link_previews/', verbose_name='превью ссылки', **NULLABLE)
+    preview_blob = models.ForeignKey('PreviewBlob', on_delete=models.PROTECT, related_name='links',
+                                     verbose_name='файл превью', **NULLABLE)
     type = models.CharField(default='website', max_length=20, choices=TYPE_CHOICES, verbose_name='тип ссылки')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='дата и время создания')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='дата и время обновления')
+    metadata_status = models.CharField(default='pending', max_length=20, choices=METADATA_STATUS_CHOICES,
+                                       verbose_name='статус получения данных страницы')
+    metadata_fetched_at = models.DateTimeField(verbose_name='дата и время получения данных страницы', **NULLABLE)
+    edited_fields = ArrayField(models.CharField(max_length=20), default=list, blank=True,
+                               verbose_name='поля, измененные пользователем')
+    search_vector = SearchVectorField(editable=False, verbose_name='поисковый вектор', **NULLABLE)
 
     collection = models.ManyToManyField(Collection, related_name='links', verbose_name='коллекция', blank=True)
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='user_links',
                               verbose_name='владелец ссылки')
 
+    objects = OwnedQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Overrides the `from_db` method to remember the type and the URL loaded from the database.
+
+        The `links.signals` receivers compare the type with the saved type to keep `LinkTypeCounter` up to date,
+        and `save` recomputes `url_hash` and `domain` only when the URL has changed.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_type = instance.__dict__.get('type')
+        instance._loaded_url = instance.__dict__.get('url')
+        return instance
+
     def save(self, *args, **kwargs):
         """
-        Overrides the `save` method to fetch and set page data when the link is first created.
+        Overrides the `save` method to enqueue page data fetching when the link is first created.
 
-        If the link is being created for the first time (i.e., it does not have a primary key),
-        it fetches page data using the `get_page_data` function and sets the title, description,
-        type, and preview image.
+        The `url_hash` and `domain` are computed from the URL when the link is created or its URL changes, so a legacy
+        duplicate whose `url_hash` was left empty by migration 0007 can still be edited. If the link is being created
+        for the first time (i.e., it does not have a primary key) and fresh page data of its URL is in the shared
+        `UrlMetadata` cache, the data is copied to the link without any network request.
+        Otherwise the link is saved with the "pending" metadata status and a `LinkMetadataJob` is created
+        in the same transaction. The title, description, type and preview are filled in later
+        by the `run_metadata_worker` command.
 
         Args:
             *args: Additional arguments.
             **kwargs: Additional keyword arguments.
         """
-        if not self.pk:
-            page_data = get_page_data(self.url)
-            if page_data:
-                self.title = page_data.get('title', '')
-                self.description = page_data.get('description', '')
-                self.type = page_data.get('type', 'website')
-                image = page_data.get('image')
-                if image:
-                    self.preview.save(f'preview_{self.title[:15]}.jpg', image, save=False)
+        if self.pk is None or self.url != getattr(self, '_loaded_url', None):
+            self.url_hash = hash_url(self.url)
+            self.domain = url_domain(self.url)
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'url' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'url_hash', 'domain'}
+        if self.pk:
+            super(Link, self).save(*args, **kwargs)
+            self._loaded_url = self.url
+            return
+
+        url_metadata = UrlMetadata.get_fresh(self.url)
+        if url_metadata:
+            self.apply_url_metadata(url_metadata)
 
-        super(Link, self).save(*args, **kwargs)
+        with transaction.atomic():
+            super(Link, self).save(*args, **kwargs)
+            if url_metadata:
+                PreviewBlob.replace_reference(None, self.preview_blob_id)
+            else:
+                LinkMetadataJob.objects.create(link=self)
+        self._loaded_url = self.url
+
+    def apply_url_metadata(self, url_metadata):
+        """
+        Copies the shared page data of the URL to the link. The link is not saved.
+
+        The fields listed in `edited_fields` keep the values set by the user. The preview blob is shared with the cache
+        entry, so its file is not written again. The caller saves the link and moves the reference
+        with `PreviewBlob.replace_reference` in the same transaction.
+
+        Args:
+            url_metadata (UrlMetadata): The cache entry of the link URL.
+
+        Returns:
+            list: The names of the changed fields, to be passed as `update_fields` to `save`.
+        """
+        fields = ['metadata_status', 'metadata_fetched_at', 'updated_at']
+        for field in ('title', 'description', 'type'):
+            if field not in self.edited_fields:
+                setattr(self, field, getattr(url_metadata, field))
+                fields.append(field)
+        if 'preview' not in self.edited_fields:
+            self.preview_blob = url_metadata.preview_blob
+            self.preview = url_metadata.preview_blob.file.name if url_metadata.preview_blob else None
+            fields += ['preview', 'preview_blob']
+        self.metadata_status = 'done'
+        self.metadata_fetched_at = url_metadata.fetched_at
+        return fields
 
     def __str__(self):
         """
@@ -83,3 +191,430 @@ class Link(models.Model):
     class Meta:
         verbose_name = 'ссылка'
         verbose_name_plural = 'ссылки'
+        indexes = [
+            models.Index(fields=['metadata_fetched_at', 'id'], name='links_link_fetched_at_idx'),
+            models.Index(fields=['owner', 'created_at', 'id'], name='links_link_owner_created_idx'),
+            models.Index(fields=['owner', 'updated_at', 'id'], name='links_link_owner_updated_idx'),
+            models.Index(fields=['owner', 'type', 'created_at', 'id'], name='links_link_owner_type_idx'),
+            models.Index(fields=['owner', 'domain', 'created_at', 'id'], name='links_link_owner_domain_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'url_hash'], name='links_link_owner_url_hash_uniq'),
+        ]
+
+
+class LinkTypeCounter(models.Model):
+    """
+    Model representing the number of links of one type owned by a user.
+
+    The counters are kept up to date with `F()` expressions by `links.counters` and recomputed by the
+    `reconcile_link_counters` command.
+
+    Attributes:
+        owner (ForeignKey): The owner of the links.
+        type (CharField): The type of the links.
+        count (IntegerField): The number of links of the type.
+
+    Methods:
+        __str__: Returns a string representation of the counter.
+
+    Meta:
+        verbose_name (str): The singular name of the model used in the admin interface.
+        verbose_name_plural (str): The plural name of the model used in the admin interface.
+        constraints (list): One counter per owner and type.
+    """
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='link_type_counters',
+                              verbose_name='владелец ссылок')
+    type = models.CharField(max_length=20, choices=Link.TYPE_CHOICES, verbose_name='тип ссылок')
+    count = models.IntegerField(default=0, verbose_name='количество ссылок')
+
+    def __str__(self):
+        """
+        Returns a string representation of the counter.
+        """
+        return f'{self.owner_id} - {self.type}: {self.count}'
+
+    class Meta:
+        verbose_name = 'счетчик ссылок по типу'
+        verbose_name_plural = 'счетчики ссылок по типам'
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'type'], name='links_type_counter_owner_type_uniq'),
+        ]
+
+
+class LinkDailyCounter(models.Model):
+    """
+    Model representing the number of existing links of one type created on one day, in one shard.
+
+    The counters are kept up to date with `F()` expressions by `links.counters` together with `LinkTypeCounter`,
+    so the link statistics are read from at most `LINK_STATS['DAILY_COUNTER_SHARDS']` rows per day and type
+    instead of the whole link table. The links of a user are counted in the shard of the user, so the writes
+    of different users are spread over several rows instead of all waiting for the lock of one row;
+    the number of links of a day and type is the sum over its shards.
+
+    Attributes:
+        day (DateField): The day the links were created, in the time zone of the project.
+        type (CharField): The type of the links.
+        shard (PositiveSmallIntegerField): The shard of the owners of the links, see `links.counters.counter_shard`.
+        count (IntegerField): The number of links, it may be negative in a shard whose owners were reassigned.
+
+    Methods:
+        __str__: Returns a string representation of the counter.
+
+    Meta:
+        verbose_name (str): The singular name of the model used in the admin interface.
+        verbose_name_plural (str): The plural name of the model used in the admin interface.
+        constraints (list): One counter per day, type and shard.
+    """
+    day = models.DateField(verbose_name='день создания ссылок')
+    type = models.CharField(max_length=20, choices=Link.TYPE_CHOICES, verbose_name='тип ссылок')
+    shard = models.PositiveSmallIntegerField(default=0, verbose_name='сегмент счетчика')
+    count = models.IntegerField(default=0, verbose_name='количество ссылок')
+
+    def __str__(self):
+        """
+        Returns a string representation of the counter.
+        """
+        return f'{self.day} - {self.type} ({self.shard}): {self.count}'
+
+    class Meta:
+        verbose_name = 'счетчик ссылок за день'
+        verbose_name_plural = 'счетчики ссылок по дням'
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'type', 'shard'], name='links_daily_counter_day_type_shard_uniq'),
+        ]
+
+
+class LinkMetadataJob(models.Model):
+    """
+    Model representing a background job that fetches page data for a link.
+
+    Jobs are stored in the database and processed by the `run_metadata_worker` management command.
+    A failed job is retried with an exponential delay until `LINK_METADATA_QUEUE['MAX_ATTEMPTS']` is reached.
+
+    Attributes:
+        link (ForeignKey): The link whose page data is fetched.
+        status (CharField): The state of the job.
+        attempts (PositiveIntegerField): The number of times the job has been taken by a worker.
+        last_error (TextField): The error of the last failed attempt.
+        run_after (DateTimeField): The job is not taken by a worker before this moment.
+        locked_at (DateTimeField): The date and time when the job was taken by a worker.
+        created_at (DateTimeField): The date and time when the job was created.
+        updated_at (DateTimeField): The date and time when the job was last updated.
+
+    Methods:
+        __str__: Returns a string representation of the job.
+
+    Meta:
+        verbose_name (str): The singular name of the model used in the admin interface.
+        verbose_name_plural (str): The plural name of the model used in the admin interface.
+        indexes (list): The index used by workers to find jobs ready to run.
+    """
+    link = models.ForeignKey(Link, on_delete=models.CASCADE, related_name='metadata_jobs', verbose_name='ссылка')
+    status = models.CharField(default='pending', max_length=20, choices=Link.METADATA_STATUS_CHOICES,
+                              verbose_name='статус задачи')
+    attempts = models.PositiveIntegerField(default=0, verbose_name='количество попыток')
+    last_error = models.TextField(verbose_name='последняя ошибка', **NULLABLE)
+    run_after = models.DateTimeField(default=timezone.now, verbose_name='запустить не раньше')
+    locked_at = models.DateTimeField(verbose_name='дата и время взятия в работу', **NULLABLE)
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='дата и время создания')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='дата и время обновления')
+
+    def __str__(self):
+        """
+        Returns a string representation of the job.
+        """
+        return f'{self.link_id} - {self.status}'
+
+    class Meta:
+        verbose_name = 'задача получения данных страницы'
+        verbose_name_plural = 'задачи получения данных страницы'
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='links_job_status_run_after_idx'),
+        ]
+
+
+class MetadataRefreshCheckpoint(models.Model):
+    """
+    Model representing the progress of a pass of the `refresh_link_metadata` command.
+
+    Links are refreshed in the order of `(metadata_fetched_at, pk)`, the position of the last refreshed link is stored
+    after every batch, so an interrupted pass resumes where it stopped. The position is cleared when a pass is over.
+
+    Attributes:
+        name (CharField): The name of the pass.
+        last_fetched_at (DateTimeField): The `metadata_fetched_at` of the last refreshed link before its refresh.
+        last_link_id (PositiveBigIntegerField): The primary key of the last refreshed link, 0 at the start of a pass.
+        started_at (DateTimeField): The date and time when the current pass was started.
+        updated_at (DateTimeField): The date and time when the checkpoint was last updated.
+
+    Methods:
+        __str__: Returns a string representation of the checkpoint.
+
+    Meta:
+        verbose_name (str): The singular name of the model used in the admin interface.
+        verbose_name_plural (str): The plural name of the model used in the admin interface.
+    """
+    name = models.CharField(max_length=50, unique=True, verbose_name='название')
+    last_fetched_at = models.DateTimeField(verbose_name='дата получения данных последней ссылки', **NULLABLE)
+    last_link_id = models.PositiveBigIntegerField(default=0, verbose_name='последняя обработанная ссылка')
+    started_at = models.DateTimeField(verbose_name='дата и время начала прохода', **NULLABLE)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='дата и время обновления')
+
+    def __str__(self):
+        """
+        Returns a string representation of the checkpoint.
+        """
+        return f'{self.name} - {self.last_link_id}'
+
+    class Meta:
+        verbose_name = 'позиция обновления данных страниц'
+        verbose_name_plural = 'позиции обновления данных страниц'
+
+
+class UrlMetadata(models.Model):
+    """
+    Model representing page data shared by all links with the same normalized URL.
+
+    Entries are fresh until `expires_at`; fresh entries are copied to new links without any network request.
+    A stale entry keeps the `ETag` and `Last-Modified` of the page, so it is revalidated with a conditional request.
+
+    Attributes:
+        url_hash (CharField): The hash of the normalized URL, see `links.normalization.hash_url`.
+        url (TextField): The normalized URL.
+        title (CharField): The title of the page.
+        description (TextField): A brief description of the page.
+        type (CharField): The type of the page.
+        preview_blob (ForeignKey): The content-addressed preview file, shared with the links.
+        etag (CharField): The `ETag` of the last page response.
+        last_modified (CharField): The `Last-Modified` of the last page response.
+        fetched_at (DateTimeField): The date and time when the page was last fetched or revalidated.
+        expires_at (DateTimeField): The date and time until which the entry is fresh.
+        hits (PositiveBigIntegerField): The approximate number of times the entry was used without a network
+        request, see `count_hits`.
+        misses (PositiveBigIntegerField): The number of times the page had to be fetched or revalidated.
+
+    Methods:
+        get_fresh: Returns the fresh entry of a URL and counts a hit.
+        count_hits: Counts the hits of entries after the commit, sampled.
+        __str__: Returns a string representation of the entry.
+
+    Meta:
+        verbose_name (str): The singular name of the model used in the admin interface.
+        verbose_name_plural (str): The plural name of the model used in the admin interface.
+    """
+    url_hash = models.CharField(max_length=64, unique=True, verbose_name='хэш нормализованного URL')
+    url = models.TextField(verbose_name='нормализованный URL')
+    title = models.CharField(max_length=255, verbose_name='заголовок страницы', **NULLABLE)
+    description = models.TextField(verbose_name='краткое описание', **NULLABLE)
+    type = models.CharField(default='website', max_length=20, choices=Link.TYPE_CHOICES, verbose_name='тип ссылки')
+    preview_blob = models.ForeignKey('PreviewBlob', on_delete=models.PROTECT, related_name='url_metadata',
+                                     verbose_name='файл превью', **NULLABLE)
+    etag = models.CharField(max_length=255, verbose_name='ETag страницы', **NULLABLE)
+    last_modified = models.CharField(max_length=64, verbose_name='Last-Modified страницы', **NULLABLE)
+    fetched_at = models.DateTimeField(verbose_name='дата и время получения данных страницы')
+    expires_at = models.DateTimeField(db_index=True, verbose_name='актуально до')
+    hits = models.PositiveBigIntegerField(default=0, verbose_name='попадания в кэш')
+    misses = models.PositiveBigIntegerField(default=0, verbose_name='промахи кэша')
+
+    @classmethod
+    def get_fresh(cls, url):
+        """
+        Returns the fresh entry of a URL and counts a hit.
+
+        Args:
+            url (str): The URL of the page, not necessarily normalized.
+
+        Returns:
+            UrlMetadata: The entry, or None if there is no entry or it has expired.
+        """
+        url_metadata = (cls.objects.select_related('preview_blob')
+                        .filter(url_hash=hash_url(url), expires_at__gt=timezone.now()).first())
+        if url_metadata:
+            cls.count_hits([url_metadata.pk])
+        return url_metadata
+
+    @classmethod
+    def count_hits(cls, pks):
+        """
+        Counts a hit of every entry, after the commit of the current transaction and sampled.
+
+        The entry of a popular URL is used by many concurrent link creations, so updating its row every time would
+        make them wait for each other's lock inside their transactions. Instead one hit in
+        `URL_METADATA_CACHE['HIT_SAMPLE_RATE']` is written, as that many hits, once the transaction is committed.
+
+        Args:
+            pks (list): The primary keys of the used entries.
+        """
+        rate = settings.URL_METADATA_CACHE['HIT_SAMPLE_RATE']
+        sampled = [pk for pk in pks if random.random() * rate < 1]
+        if sampled:
+            transaction.on_commit(lambda: cls.objects.filter(pk__in=sampled).update(hits=F('hits') + rate))
+
+    def __str__(self):
+        """
+        Returns a string representation of the entry.
+        """
+        return self.url
+
+    class Meta:
+        verbose_name = 'кэш данных страницы'
+        verbose_name_plural = 'кэш данных страниц'
+
+
+class PreviewBlob(models.Model):
+    """
+    Model representing a preview file stored once per content.
+
+    The file name is derived from the SHA-256 of the downloaded image, so an image used by many links is processed
+    and written once. The original image is not kept: the blob stores a preview and a thumbnail of bounded size,
+    see `links.previews.render_preview`.
+    `ref_count` is the number of links and `UrlMetadata` entries pointing at the blob; blobs without references
+    are deleted by the `collect_previews` command.
+
+    Attributes:
+        sha256 (CharField): The hex SHA-256 of the downloaded image.
+        file (ImageField): The preview, at most `LINK_PREVIEWS['PREVIEW_WIDTH']` pixels wide.
+        thumbnail (ImageField): The thumbnail for list views, at most `LINK_PREVIEWS['THUMBNAIL_WIDTH']` pixels wide.
+        size (PositiveIntegerField): The size of the preview file in bytes.
+        ref_count (IntegerField): The number of references to the blob.
+        created_at (DateTimeField): The date and time when the blob was created.
+        released_at (DateTimeField): The date and time when a reference to the blob was last dropped.
+
+    Methods:
+        store: Returns the blob of an image, writing the files only if the image is new, and takes a reference.
+        replace_reference: Moves a reference from one blob to another.
+        collect_unused: Deletes blobs without references together with their files.
+        __str__: Returns a string representation of the blob.
+
+    Meta:
+        verbose_name (str): The singular name of the model used in the admin interface.
+        verbose_name_plural (str): The plural name of the model used in the admin interface.
+    """
+    sha256 = models.CharField(max_length=64, unique=True, verbose_name='SHA-256 содержимого')
+    file = models.ImageField(upload_to='link_previews/', verbose_name='файл превью')
+    thumbnail = models.ImageField(upload_to='link_previews/', verbose_name='миниатюра превью', **NULLABLE)
+    size = models.PositiveIntegerField(default=0, verbose_name='размер в байтах')
+    ref_count = models.IntegerField(default=0, verbose_name='количество ссылок на файл')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='дата и время создания')
+    released_at = models.DateTimeField(verbose_name='дата и время освобождения', **NULLABLE)
+
+    @classmethod
+    def store(cls, image):
+        """
+        Returns the blob of an image, writing the files only if the image is new, and takes a reference.
+
+        Args:
+            image (File): The downloaded image file.
+
+        Returns:
+            PreviewBlob: The blob, with one more reference owned by the caller, or None if the image is invalid.
+        """
+        content = image.read()
+        digest = hashlib.sha256(content).hexdigest()
+        for _ in range(3):
+            blob = cls.objects.filter(sha256=digest).first()
+            if blob:
+                if cls.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1):
+                    return blob
+                continue
+
+            try:
+                preview, thumbnail = render_preview(content)
+            except InvalidImage as e:
+                logger.error(f"Не удалось обработать превью {digest}: {e}")
+                return None
+            name = _save_file(f'link_previews/{digest[:2]}/{digest}{PREVIEW_EXTENSION}', preview)
+            thumbnail_name = _save_file(f'link_previews/{digest[:2]}/{digest}_thumb{PREVIEW_EXTENSION}', thumbnail)
+            blob = cls(sha256=digest, file=name, thumbnail=thumbnail_name, size=len(preview), ref_count=1)
+            try:
+                with transaction.atomic():
+                    blob.save()
+            except IntegrityError:
+                # Такое же изображение одновременно сохранил другой процесс
+                _delete_files([name, thumbnail_name])
+                continue
+            return blob
+        raise IntegrityError(f"Не удалось сохранить превью {digest}")
+
+    @classmethod
+    def replace_reference(cls, old_blob_id, new_blob_id):
+        """
+        Moves a reference from one blob to another.
+
+        Args:
+            old_blob_id (int): The blob that loses a reference, or None.
+            new_blob_id (int): The blob that gets a reference, or None.
+        """
+        if old_blob_id == new_blob_id:
+            return
+        if new_blob_id:
+            cls.objects.filter(pk=new_blob_id).update(ref_count=F('ref_count') + 1)
+        if old_blob_id:
+            cls.objects.filter(pk=old_blob_id).update(ref_count=F('ref_count') - 1, released_at=timezone.now())
+
+    @classmethod
+    def collect_unused(cls, grace_period):
+        """
+        Deletes blobs without references together with their files.
+
+        A blob is deleted only if its last reference was dropped more than `grace_period` seconds ago and no row
+        points at it. Each blob is locked and deleted in its own transaction, skipping blobs locked by a process that
+        is taking a reference at the same moment; the files are deleted only after the row deletion is committed.
+
+        Args:
+            grace_period (int): The number of seconds a blob is kept after its last reference is dropped.
+
+        Returns:
+            int: The number of deleted blobs.
+        """
+        unused = cls.objects.filter(
+            ref_count__lte=0,
+            released_at__lt=timezone.now() - timedelta(seconds=grace_period),
+            links__isnull=True,
+            url_metadata__isnull=True,
+        ).distinct().values_list('pk', flat=True)
+        deleted = 0
+        for pk in list(unused):
+            with transaction.atomic():
+                blob = cls.objects.select_for_update(skip_locked=True).filter(pk=pk, ref_count__lte=0).first()
+                if blob is None:
+                    continue
+                try:
+                    if not cls.objects.filter(pk=pk, ref_count__lte=0).delete()[0]:
+                        continue
+                except ProtectedError:
+                    # На файл успели сослаться после выборки кандидатов
+                    continue
+                names = [name for name in (blob.file.name, blob.thumbnail.name) if name]
+                transaction.on_commit(lambda names=names: _delete_files(names))
+            deleted += 1
+        return deleted
+
+    def __str__(self):
+        """
+        Returns a string representation of the blob.
+        """
+        return self.file.name
+
+    class Meta:
+        verbose_name = 'файл превью'
+        verbose_name_plural = 'файлы превью'
+
+
+def _save_file(name, content):
+    """
+    Writes a content-addressed file and returns its name in the storage.
+
+    An existing file is not reused: it may belong to a blob that `PreviewBlob.collect_unused` has just deleted and
+    is about to be removed, so the storage picks a free name instead.
+    """
+    return default_storage.save(name, ContentFile(content))
+
+
+def _delete_files(names):
+    """
+    Deletes the files of a deleted blob from the storage.
+    """
+    for name in names:
+        default_storage.delete(name)
@@ -0,0 +1,104 @@
+import hashlib
+from urllib.parse import unquote_plus, urlsplit, urlunsplit
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Параметры, которые добавляют рассылки и рекламные системы; на содержимое страницы они не влияют
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'gbraid', 'wbraid', 'msclkid', 'yclid', 'ysclid', 'igshid', 'mc_cid', 'mc_eid',
+    '_ga', '_gl', '_hsenc', '_hsmi', 'mkt_tok', 'ref_src', 'spm',
+}
+TRACKING_PARAM_PREFIXES = ('utm_', 'pk_')
+
+
+def _is_tracking_param(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PARAM_PREFIXES)
+
+
+def _normalize_query(query):
+    # Параметры фильтруются без перекодирования, чтобы оставшаяся часть запроса не изменилась
+    kept = [param for param in query.split('&') if param and not _is_tracking_param(unquote_plus(param.split('=')[0]))]
+    return '&'.join(kept)
+
+
+def _normalize_path(path):
+    if not path:
+        return '/'
+    if len(path) > 1 and path.endswith('/'):
+        return path.rstrip('/') or '/'
+    return path
+
+
+def _normalize_fragment(fragment):
+    # Фрагмент "#!" адресует страницу в одностраничных приложениях, остальные фрагменты указывают место на странице
+    return fragment if fragment.startswith('!') else ''
+
+
+def normalize_url(url):
+    """
+    Return the canonical form of a URL used to recognize the same page saved by different users or twice by one user.
+
+    The scheme and host are lowercased, the default port of the scheme is dropped, an empty path becomes '/',
+    the trailing slash of any other path is removed, tracking parameters (`utm_*`, `fbclid`, `gclid`, ...) are
+    removed from the query and the fragment is removed unless it is a `#!` route of a single-page application.
+
+    Args:
+        url (str): The URL to normalize.
+
+    Returns:
+        str: The normalized URL.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    path = _normalize_path(parts.path)
+    query = _normalize_query(parts.query)
+    fragment = _normalize_fragment(parts.fragment)
+    try:
+        host = parts.hostname or ''
+        port = parts.port
+    except ValueError:
+        return urlunsplit((scheme, parts.netloc.lower(), path, query, fragment))
+
+    if ':' in host:
+        host = f'[{host}]'
+    netloc = host.rstrip('.')
+    if port and DEFAULT_PORTS.get(scheme) != port:
+        netloc = f'{netloc}:{port}'
+    if parts.username is not None:
+        userinfo = parts.username if parts.password is None else f'{parts.username}:{parts.password}'
+        netloc = f'{userinfo}@{netloc}'
+    return urlunsplit((scheme, netloc, path, query, fragment))
+
+
+def url_domain(url):
+    """
+    Return the domain of a URL used to filter links by site.
+
+    The host is lowercased, and its trailing dot and the `www.` prefix are removed.
+
+    Args:
+        url (str): The URL.
+
+    Returns:
+        str: The domain, or an empty string if the URL has no host.
+    """
+    try:
+        host = urlsplit(url.strip()).hostname or ''
+    except ValueError:
+        return ''
+    host = host.rstrip('.')
+    return host[4:] if host.startswith('www.') else host
+
+
+def hash_url(url):
+    """
+    Return the fixed-width hash of the normalized form of a URL.
+
+    Args:
+        url (str): The URL to hash.
+
+    Returns:
+        str: The hex SHA-256 digest, 64 characters.
+    """
+    return hashlib.sha256(normalize_url(url).encode('utf-8')).hexdigest()
@@ -1,12 +1,208 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+import json
+from datetime import datetime
 
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import DateTimeField, Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
-class LinkPaginator(PageNumberPagination):
+MAX_PK = 2 ** 63 - 1
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination over `(ordering_field, pk)`, newest first.
+
+    The ordering field is a date or a number, e.g. the rank of a search result.
+    The rows are model instances or dictionaries of `values()` with the ordering field and `pk`.
+
+    A page is selected with `WHERE (ordering_field, pk) < (cursor position) ORDER BY ordering_field DESC, pk DESC
+    LIMIT page_size`, so with an index on the ordering field and `id` every page costs the same as the first one,
+    and rows inserted meanwhile do not shift the pages. The total count is only computed with `?count=true`.
+
+    Attributes:
+        cursor_query_param (str): The name of the query parameter with the cursor.
+        count_query_param (str): The name of the query parameter that enables the total count.
+
+    Methods:
+        paginate_queryset: Returns the rows of the page selected by the cursor.
+        get_paginated_response: Returns the page with the links to the next and previous pages.
+    """
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+
+    def __init__(self, ordering_field, page_size):
+        self.ordering_field = ordering_field
+        self.page_size = page_size
+        self.count = None
+        self.next_position = None
+        self.previous_position = None
+
+    def _value_is_datetime(self, queryset):
+        annotation = queryset.query.annotations.get(self.ordering_field)
+        if annotation is not None:
+            return isinstance(annotation.output_field, DateTimeField)
+        try:
+            return isinstance(queryset.model._meta.get_field(self.ordering_field), DateTimeField)
+        except FieldDoesNotExist:
+            return False
+
+    def _decode_cursor(self, request, queryset):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            value, pk, reverse = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            # Значение курсора должно быть того же типа, что и поле сортировки: дата и время строкой ISO 8601
+            # для полей дат, число для остальных, например для ранга поиска
+            if self._value_is_datetime(queryset):
+                value = parse_datetime(value) if isinstance(value, str) else None
+            elif isinstance(value, bool) or not isinstance(value, (int, float)):
+                value = None
+            if value is None or type(pk) is not int or not 0 < pk <= MAX_PK:
+                raise ValueError(encoded)
+            return value, pk, bool(reverse)
+        except (TypeError, ValueError, UnicodeEncodeError, binascii.Error):
+            raise NotFound('Неверный курсор.')
+
+    def _encode_cursor(self, position, reverse):
+        value, pk = position
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        cursor = base64.urlsafe_b64encode(json.dumps([value, pk, reverse]).encode('ascii'))
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor.decode('ascii'))
+
+    def _position(self, obj):
+        if isinstance(obj, dict):
+            return obj[self.ordering_field], obj['pk']
+        return getattr(obj, self.ordering_field), obj.pk
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Returns the rows of the page selected by the cursor.
+
+        Args:
+            queryset (QuerySet): The filtered queryset.
+            request (Request): The incoming request.
+            view (View): The view instance.
+
+        Returns:
+            list: The rows of the page.
+        """
+        self.base_url = request.build_absolute_uri()
+        if request.query_params.get(self.count_query_param, '').lower() in ('1', 'true'):
+            self.count = queryset.count()
+        cursor = self._decode_cursor(request, queryset)
+        field = self.ordering_field
+
+        if cursor is None:
+            rows = list(queryset.order_by(f'-{field}', '-pk')[:self.page_size + 1])
+            has_more, reverse = len(rows) > self.page_size, False
+        else:
+            value, pk, reverse = cursor
+            # Условие с OR не служит границей индекса, поэтому диапазон по полю сортировки задается отдельно
+            if reverse:
+                queryset = queryset.filter(Q(**{f'{field}__gt': value}) | Q(**{field: value, 'pk__gt': pk}),
+                                           **{f'{field}__gte': value})
+                rows = list(queryset.order_by(field, 'pk')[:self.page_size + 1])
+            else:
+                queryset = queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk}),
+                                           **{f'{field}__lte': value})
+                rows = list(queryset.order_by(f'-{field}', '-pk')[:self.page_size + 1])
+            has_more = len(rows) > self.page_size
+
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+        if rows:
+            # Страница, на которую перешли назад, всегда имеет следующую; перешли вперед - всегда имеет предыдущую
+            if has_more or reverse:
+                self.next_position = self._position(rows[-1])
+            if cursor is not None and (has_more or not reverse):
+                self.previous_position = self._position(rows[0])
+        return rows
+
+    def get_paginated_response(self, data):
+        """
+        Returns the page with the links to the next and previous pages.
+
+        Args:
+            data (list): The serialized rows of the page.
+
+        Returns:
+            Response: The page, with the 'count' key only if the count was requested.
+        """
+        response = {}
+        if self.count is not None:
+            response['count'] = self.count
+        response['next'] = self._encode_cursor(self.next_position, False) if self.next_position else None
+        response['previous'] = self._encode_cursor(self.previous_position, True) if self.previous_position else None
+        response['results'] = data
+        return Response(response)
+
+
+class CursorPaginationMixin:
+    """
+    Mixin adding the keyset mode of `KeysetPagination` to a `PageNumberPagination` paginator.
+
+    The keyset mode is used with `?pagination=cursor` and for the pages it links to (`?cursor=...`).
+    Otherwise the paginator works by page numbers as before, ordered by the same keys, so its pages are stable.
+
+    Attributes:
+        ordering_field (str): The date field the rows are ordered by, newest first, with `pk` as the tie-breaker.
+
+    Methods:
+        paginate_queryset: Returns the rows of the page in the requested mode.
+        get_paginated_response: Returns the page in the requested mode.
+    """
+    ordering_field = 'created_at'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Returns the rows of the page in the requested mode.
+
+        Args:
+            queryset (QuerySet): The filtered queryset.
+            request (Request): The incoming request.
+            view (View): The view instance.
+
+        Returns:
+            list: The rows of the page.
+        """
+        self.keyset = None
+        if (request.query_params.get('pagination') == 'cursor'
+                or request.query_params.get(KeysetPagination.cursor_query_param)):
+            self.keyset = KeysetPagination(self.ordering_field, self.get_page_size(request))
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset.order_by(f'-{self.ordering_field}', '-pk'), request, view)
+
+    def get_paginated_response(self, data):
+        """
+        Returns the page in the requested mode.
+
+        Args:
+            data (list): The serialized rows of the page.
+
+        Returns:
+            Response: The page.
+        """
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class LinkPaginator(CursorPaginationMixin, PageNumberPagination):
     """
     Paginator for the Link model.
 
     This class is a subclass of `PageNumberPagination` and is used to paginate the `Link` model.
-    It is used to control the pagination style for the list views.
+    It is used to control the pagination style for the list views. With `?pagination=cursor` the links are paginated
+    by `(created_at, pk)` keys, see `CursorPaginationMixin`.
 
     Attributes:
         page_size (int): The default number of items to include on a page.
@@ -17,3 +213,31 @@ class LinkPaginator(PageNumberPagination):
     page_size = 30
     page_size_query_param = 'page_size'
     max_page_size = 100
+
+
+class LinkSearchPaginator(KeysetPagination):
+    """
+    Paginator for the link search results.
+
+    The results are paginated by `(rank, pk)` keys, the best matches first, see `KeysetPagination`.
+
+    Attributes:
+        page_size (int): The default number of items to include on a page.
+        page_size_query_param (str): The name of the query parameter that allows the client to set the page size
+        on a per-request basis.
+        max_page_size (int): The maximum allowed page size.
+    """
+    page_size = 30
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def __init__(self):
+        super().__init__('rank', self.page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            page_size = self.page_size
+        self.page_size = min(page_size, self.max_page_size) if page_size > 0 else self.page_size
+        return super().paginate_queryset(queryset, request, view)
@@ -0,0 +1,48 @@
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+from config.parsers import json_loads
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parser for newline-delimited JSON, one JSON value per line.
+
+    Used by bulk endpoints, so clients can stream an export of bookmarks without wrapping it into a JSON array.
+    Empty lines are skipped. The lines are decoded with `orjson` when it is installed, see `json_loads`.
+
+    Attributes:
+        media_type (str): The media type handled by the parser.
+
+    Methods:
+        parse: Parses the request body into a list of values.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """
+        Parses the request body into a list of values.
+
+        Args:
+            stream (IO): The request body.
+            media_type (str): The media type of the request.
+            parser_context (dict): The context of the parser.
+
+        Returns:
+            list: The parsed values, one per non-empty line.
+
+        Raises:
+            ParseError: If a line is not valid JSON.
+        """
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', 'utf-8')
+        items = []
+        for number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                items.append(json_loads(line.decode(encoding)))
+            except (ValueError, UnicodeDecodeError) as e:
+                raise ParseError(f"Ошибка разбора NDJSON в строке {number}: {e}")
+        return items
@@ -20,6 +20,8 @@ class IsOwner(BasePermission):
         """
         Check if the user is the owner of the object.
 
+        The owner is compared by its primary key, so the owner is not loaded from the database.
+
         Args:
             request (Request): The request instance.
             view (View): The view instance.
@@ -28,6 +30,6 @@ class IsOwner(BasePermission):
         Returns:
             bool: True if the user is the owner of the object, False otherwise.
         """
-        if request.user == obj.owner:
+        if obj.owner_id == request.user.pk:
             return True
         return False
@@ -0,0 +1,123 @@
+import io
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from config import settings
+from links.fetch import open_url
+
+PREVIEW_FORMAT = 'WEBP'
+PREVIEW_EXTENSION = '.webp'
+
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (b'GIF87a', 'GIF'),
+    (b'GIF89a', 'GIF'),
+)
+# Сигнатура WebP занимает первые 12 байт: RIFF, размер и WEBP
+SIGNATURE_LENGTH = 12
+
+
+class InvalidImage(Exception):
+    """
+    Raised when a preview image is missing, too large, of an unsupported type or corrupt.
+    """
+
+
+def sniff_image_format(head):
+    """
+    Recognize the format of an image by its first bytes.
+
+    Args:
+        head (bytes): The beginning of the file.
+
+    Returns:
+        str: The Pillow name of the format, or None if it is not recognized.
+    """
+    for signature, image_format in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return image_format
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'WEBP'
+    return None
+
+
+def download_image(url):
+    """
+    Download a preview image within the byte cap of `settings.LINK_PREVIEWS`.
+
+    The type is checked on the first `SIGNATURE_LENGTH` bytes, so a response that is not a supported image is dropped
+    before the rest of it is downloaded.
+
+    Args:
+        url (str): The URL of the image.
+
+    Returns:
+        bytes: The image file.
+
+    Raises:
+        InvalidImage: If the response is not 200 or not a supported image.
+        FetchError: If the request fails, or the image is larger than `LINK_PREVIEWS['MAX_BYTES']`.
+    """
+    conf = settings.LINK_PREVIEWS
+    with open_url(url, max_bytes=conf['MAX_BYTES']) as response:
+        if response.status_code != 200:
+            raise InvalidImage(f"Status code: {response.status_code}")
+        chunks = response.iter_content()
+        head = b''
+        # Первый фрагмент может оказаться короче сигнатуры, поэтому начало файла набирается из нескольких фрагментов
+        for chunk in chunks:
+            head += chunk
+            if len(head) >= SIGNATURE_LENGTH:
+                break
+        if sniff_image_format(head) not in conf['ALLOWED_FORMATS']:
+            raise InvalidImage(f"Неподдерживаемый тип изображения: {response.headers.get('Content-Type')}")
+        return head + b''.join(chunks)
+
+
+def render_preview(content):
+    """
+    Produce the bounded-size preview and thumbnail of an image.
+
+    The dimensions are read from the image header and checked against `LINK_PREVIEWS['MAX_PIXELS']` before
+    any pixel is decoded. JPEG images are decoded directly at a reduced scale.
+
+    Args:
+        content (bytes): The image file.
+
+    Returns:
+        tuple: The preview and the thumbnail encoded as WebP, `bytes` each.
+
+    Raises:
+        InvalidImage: If the image is of an unsupported type, too large or corrupt.
+    """
+    conf = settings.LINK_PREVIEWS
+    preview_box = (conf['PREVIEW_WIDTH'], conf['PREVIEW_WIDTH'] * 3)
+    thumbnail_box = (conf['THUMBNAIL_WIDTH'], conf['THUMBNAIL_WIDTH'] * 3)
+    try:
+        with Image.open(io.BytesIO(content)) as image:
+            if image.format not in conf['ALLOWED_FORMATS']:
+                raise InvalidImage(f"Неподдерживаемый тип изображения: {image.format}")
+            width, height = image.size
+            if width * height > conf['MAX_PIXELS']:
+                raise InvalidImage(f"Слишком большое изображение: {width}x{height}")
+
+            image.draft('RGB', preview_box)
+            preview = ImageOps.exif_transpose(image)
+            preview = preview.convert('RGBA' if _has_alpha(preview) else 'RGB')
+            preview.thumbnail(preview_box, Image.Resampling.LANCZOS)
+            thumbnail = preview.copy()
+            thumbnail.thumbnail(thumbnail_box, Image.Resampling.LANCZOS)
+            return _encode(preview, conf['QUALITY']), _encode(thumbnail, conf['QUALITY'])
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError) as e:
+        raise InvalidImage(f"Повреждённое изображение: {e}") from e
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info)
+
+
+def _encode(image, quality):
+    buffer = io.BytesIO()
+    image.save(buffer, format=PREVIEW_FORMAT, quality=quality, method=4)
+    return buffer.getvalue()
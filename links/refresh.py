@@ -0,0 +1,199 @@
+import logging
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from config.response_cache import bump_owner_version
+from links.async_fetch import fetch_many
+from links.counters import adjust_daily_counters, adjust_link_counters, link_day
+from links.metadata_cache import fetch_url_metadata
+from links.models import Link, MetadataRefreshCheckpoint, PreviewBlob, UrlMetadata
+
+logger = logging.getLogger(__name__)
+
+# Поля ссылки, которые берутся из данных страницы; обновляются только изменившиеся
+CONTENT_FIELDS = ('title', 'description', 'type', 'preview', 'preview_blob', 'metadata_status')
+
+
+def _content_values(link):
+    return {
+        'title': link.title,
+        'description': link.description,
+        'type': link.type,
+        'preview': link.preview.name if link.preview else None,
+        'preview_blob': link.preview_blob_id,
+        'metadata_status': link.metadata_status,
+    }
+
+
+def _cached(url):
+    try:
+        return UrlMetadata.get_fresh(url)
+    finally:
+        close_old_connections()
+
+
+def _fetch(url):
+    try:
+        return fetch_url_metadata(url)
+    except Exception as e:
+        logger.exception(f"Ошибка при обновлении данных страницы {url}: {e}")
+        return None
+    finally:
+        close_old_connections()
+
+
+def next_stale_batch(checkpoint, cutoff, size):
+    """
+    Return the next links to refresh after the position of a checkpoint.
+
+    Links that were never fetched come first in the order of `pk`, then links fetched before `cutoff`
+    in the order of `(metadata_fetched_at, pk)`. Both orders are served by indexes, and the keyset condition
+    makes every batch as cheap as the first one.
+
+    Args:
+        checkpoint (MetadataRefreshCheckpoint): The position of the pass.
+        cutoff (datetime): Links fetched at or after this moment are fresh.
+        size (int): The maximum number of links.
+
+    Returns:
+        list: The links.
+    """
+    queryset = Link.objects.filter(metadata_status__in=('done', 'failed'))
+    if checkpoint.last_fetched_at is None:
+        batch = list(queryset.filter(metadata_fetched_at__isnull=True, pk__gt=checkpoint.last_link_id)
+                     .order_by('pk')[:size])
+        if batch:
+            return batch
+        after = Q()
+    else:
+        after = (Q(metadata_fetched_at=checkpoint.last_fetched_at, pk__gt=checkpoint.last_link_id)
+                 | Q(metadata_fetched_at__gt=checkpoint.last_fetched_at))
+    return list(queryset.filter(after, metadata_fetched_at__lt=cutoff).order_by('metadata_fetched_at', 'pk')[:size])
+
+
+def refresh_links(links, concurrency):
+    """
+    Refresh the page data of links and save only what has changed.
+
+    Every distinct URL is requested once through the shared `UrlMetadata` cache: a stale entry is revalidated with
+    `If-None-Match`/`If-Modified-Since`, and on 304 Not Modified the body is not downloaded. The requests are
+    scheduled by `links.async_fetch`, up to `concurrency` at a time, with the per-site limits of `LINK_ASYNC_FETCH`
+    and robots.txt; a page disallowed by robots.txt counts as not refreshed. A URL with a fresh cache entry is
+    answered from the cache before any of these limits.
+    The pages take a while to fetch, so the links are read again and locked in the write transaction, and the page
+    data is applied to their current state: the fields the user has edited meanwhile or before are kept, see
+    `Link.edited_fields`, and links deleted or given another URL meanwhile are skipped. Links are then saved
+    with `bulk_update`, one query per set of changed fields; a link whose data has not changed gets only its
+    `metadata_fetched_at` updated. Type changes are added to the link counters, and the cached responses
+    of the owners of changed links become stale.
+
+    Args:
+        links (list): The links to refresh.
+        concurrency (int): The maximum number of pages requested at the same time.
+
+    Returns:
+        tuple: The number of refreshed links, of links with changed data and of links that could not be refreshed.
+    """
+    entries = fetch_many((link.url for link in links), concurrency=concurrency, fetch=_fetch, cached=_cached)
+    fetched = {link.pk: link.url for link in links if entries[link.url]}
+    failed = len(links) - len(fetched)
+    changed = 0
+
+    with transaction.atomic():
+        now = timezone.now()
+        groups = defaultdict(list)
+        blob_refs = Counter()
+        type_deltas = defaultdict(Counter)
+        day_deltas = defaultdict(Counter)
+        changed_owners = set()
+        for link in Link.objects.filter(pk__in=fetched).order_by('pk').select_for_update():
+            if link.url != fetched[link.pk]:
+                # URL ссылки изменили, пока загружалась страница прежнего URL
+                continue
+            before = _content_values(link)
+            link.apply_url_metadata(entries[link.url])
+            after = _content_values(link)
+            fields = [field for field in CONTENT_FIELDS if before[field] != after[field]]
+            if fields:
+                changed += 1
+                changed_owners.add(link.owner_id)
+                link.updated_at = now
+                fields.append('updated_at')
+                if before['preview_blob'] != after['preview_blob']:
+                    blob_refs[before['preview_blob']] -= 1
+                    blob_refs[after['preview_blob']] += 1
+                if before['type'] != after['type']:
+                    type_deltas[link.owner_id][before['type']] -= 1
+                    type_deltas[link.owner_id][after['type']] += 1
+                    day_deltas[link.owner_id][(link_day(link), before['type'])] -= 1
+                    day_deltas[link.owner_id][(link_day(link), after['type'])] += 1
+            groups[tuple(fields) + ('metadata_fetched_at',)].append(link)
+
+        for fields, group in groups.items():
+            Link.objects.bulk_update(group, fields)
+        for blob_id, refs in blob_refs.items():
+            if blob_id and refs:
+                blob = PreviewBlob.objects.filter(pk=blob_id)
+                if refs > 0:
+                    blob.update(ref_count=F('ref_count') + refs)
+                else:
+                    blob.update(ref_count=F('ref_count') + refs, released_at=now)
+        for owner_id, deltas in type_deltas.items():
+            adjust_link_counters(owner_id, deltas)
+            adjust_daily_counters(owner_id, day_deltas[owner_id])
+        for owner_id in changed_owners:
+            bump_owner_version(owner_id)
+    return len(fetched), changed, failed
+
+
+def refresh_stale_links(max_age, batch_size, concurrency, limit=None, name='default'):
+    """
+    Refresh the page data of links older than `max_age`, resuming from the saved checkpoint.
+
+    The checkpoint is saved after every batch. When there are no stale links left, the pass is over and the
+    checkpoint is reset, so the next call starts a new pass from the oldest links.
+
+    Args:
+        max_age (int): The age of page data in seconds after which a link is refreshed.
+        batch_size (int): The number of links refreshed and checkpointed at a time.
+        concurrency (int): The maximum number of pages requested at the same time.
+        limit (int): The maximum number of links to process in this call, unlimited by default.
+        name (str): The name of the checkpoint.
+
+    Returns:
+        dict: The numbers of 'processed', 'refreshed', 'changed' and 'failed' links, and 'finished' set to True
+        if the pass is over.
+    """
+    checkpoint, _ = MetadataRefreshCheckpoint.objects.get_or_create(name=name)
+    if checkpoint.started_at is None:
+        checkpoint.started_at = timezone.now()
+        checkpoint.save(update_fields=['started_at', 'updated_at'])
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+    stats = {'processed': 0, 'refreshed': 0, 'changed': 0, 'failed': 0, 'finished': False}
+
+    while limit is None or stats['processed'] < limit:
+        size = batch_size if limit is None else min(batch_size, limit - stats['processed'])
+        links = next_stale_batch(checkpoint, cutoff, size)
+        if not links:
+            checkpoint.last_fetched_at = None
+            checkpoint.last_link_id = 0
+            checkpoint.started_at = None
+            checkpoint.save()
+            stats['finished'] = True
+            break
+
+        last_fetched_at, last_link_id = links[-1].metadata_fetched_at, links[-1].pk
+        refreshed, changed, failed = refresh_links(links, concurrency)
+        stats['processed'] += len(links)
+        stats['refreshed'] += refreshed
+        stats['changed'] += changed
+        stats['failed'] += failed
+
+        checkpoint.last_fetched_at = last_fetched_at
+        checkpoint.last_link_id = last_link_id
+        checkpoint.save(update_fields=['last_fetched_at', 'last_link_id', 'updated_at'])
+    return stats
@@ -0,0 +1,138 @@
+from collections import defaultdict
+
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from config.sparse_fields import get_sparse_fields
+from links.models import Link, PreviewBlob
+from links.serializers.link import LinkSerializer
+
+LINK_FIELDS = list(LinkSerializer.Meta.fields)
+
+# Столбцы строки ссылки для полей представления `LinkSerializer`; первичные ключи коллекций читаются отдельно
+ROW_COLUMNS = {
+    'pk': 'pk',
+    'title': 'title',
+    'description': 'description',
+    'url': 'url',
+    'preview': 'preview',
+    'preview_thumbnail': 'preview_blob__thumbnail',
+    'type': 'type',
+    'metadata_status': 'metadata_status',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+    'owner': 'owner_id',
+}
+FILE_STORAGES = {
+    'preview': Link._meta.get_field('preview').storage,
+    'preview_thumbnail': PreviewBlob._meta.get_field('thumbnail').storage,
+}
+DATETIME_FIELDS = ('created_at', 'updated_at')
+
+# Одно поле на процесс: дата и время выводятся в том же формате и часовом поясе, что и в `LinkSerializer`
+_datetime_field = serializers.DateTimeField()
+
+
+def _file_url(storage, request):
+    def convert(name):
+        if not name:
+            return None
+        url = storage.url(name)
+        return request.build_absolute_uri(url) if request is not None else url
+    return convert
+
+
+def link_rows(queryset, fields, ordering_field=None):
+    """
+    Turn a link queryset into a queryset of plain rows with the columns of the selected fields.
+
+    The preview thumbnail is joined in the same query; the related objects are not loaded.
+
+    Args:
+        queryset (QuerySet): The links.
+        fields (list): The names of the selected fields of `LinkSerializer`.
+        ordering_field (str): The field the rows are paginated by, e.g. the `rank` annotation of a search.
+
+    Returns:
+        QuerySet: The dictionaries of the column values.
+    """
+    columns = {'pk'} | {ROW_COLUMNS[field] for field in fields if field in ROW_COLUMNS}
+    if ordering_field:
+        columns.add(ordering_field)
+    return queryset.select_related(None).prefetch_related(None).values(*columns)
+
+
+def serialize_link_rows(rows, fields, request):
+    """
+    Build the representation of `LinkSerializer` from plain rows of links.
+
+    No model instance and no serializer is created for a row: the values are copied from the row and only the dates
+    and the file URLs are converted. The primary keys of the collections of all links are read with one query,
+    and only if the `collection` field is selected.
+
+    Args:
+        rows (list): The rows of `link_rows`.
+        fields (list): The names of the selected fields.
+        request (Request): The incoming request, used to build absolute file URLs.
+
+    Returns:
+        list: The representations of the links.
+    """
+    collections = defaultdict(list)
+    if 'collection' in fields and rows:
+        memberships = (Link.collection.through.objects.filter(link_id__in=[row['pk'] for row in rows])
+                       .order_by('collection_id').values_list('link_id', 'collection_id'))
+        for link_id, collection_id in memberships:
+            collections[link_id].append(collection_id)
+
+    converters = []
+    for field in fields:
+        if field in DATETIME_FIELDS:
+            converters.append((field, ROW_COLUMNS[field], _datetime_field.to_representation))
+        elif field in FILE_STORAGES:
+            converters.append((field, ROW_COLUMNS[field], _file_url(FILE_STORAGES[field], request)))
+        else:
+            converters.append((field, ROW_COLUMNS.get(field), None))
+
+    data = []
+    for row in rows:
+        item = {}
+        for field, column, convert in converters:
+            if column is None:
+                item[field] = collections.get(row['pk'], [])
+            elif convert is None:
+                item[field] = row[column]
+            else:
+                item[field] = convert(row[column])
+        data.append(item)
+    return data
+
+
+class LinkRowListMixin:
+    """
+    Mixin serving a list of links from plain rows instead of model instances and `LinkSerializer`.
+
+    The page is read with `link_rows`, only the columns of the fields selected with `?fields=` and `?omit=`,
+    and converted with `serialize_link_rows`; the representation is the same as that of `LinkSerializer`.
+
+    Methods:
+        list: Overrides the `list` method to serialize the page from plain rows.
+    """
+
+    def list(self, request, *args, **kwargs):
+        """
+        Overrides the `list` method to serialize the page from plain rows.
+
+        Args:
+            request (Request): The incoming request.
+
+        Returns:
+            Response: A page of the links.
+        """
+        fields = get_sparse_fields(request, LINK_FIELDS)
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = link_rows(queryset, fields, getattr(self.paginator, 'ordering_field', None))
+        page = self.paginate_queryset(rows)
+        if page is None:
+            return Response(serialize_link_rows(list(rows), fields, request))
+        return self.get_paginated_response(serialize_link_rows(page, fields, request))
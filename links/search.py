@@ -0,0 +1,54 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connections
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.functions import Cast
+
+# Конфигурация без стемминга: сохраненные страницы написаны на разных языках
+SEARCH_CONFIG = 'simple'
+MAX_QUERY_LENGTH = 200
+
+# Веса полей как у весов A, B и C поискового вектора в ts_rank
+FIELD_WEIGHTS = (('title', 1.0), ('description', 0.4), ('url', 0.2))
+
+
+def _search_links_postgresql(queryset, query):
+    search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+    # ts_rank и word_similarity возвращают real; ранг приводится к double precision, чтобы значение в курсоре
+    # страницы совпадало с рангом в базе и сравнение (rank, pk) < (курсор) не возвращало те же строки
+    rank = Cast(SearchRank(F('search_vector'), search_query) + TrigramWordSimilarity(query, 'url'), FloatField())
+    return queryset.filter(Q(search_vector=search_query) | Q(url__icontains=query)).annotate(rank=rank)
+
+
+def _search_links_portable(queryset, query):
+    condition = Q()
+    rank = Value(0.0, output_field=FloatField())
+    for term in query.split():
+        matches = Q()
+        for field, weight in FIELD_WEIGHTS:
+            lookup = {f'{field}__icontains': term}
+            matches |= Q(**lookup)
+            rank = rank + Case(When(**lookup, then=Value(weight)), default=Value(0.0), output_field=FloatField())
+        condition &= matches
+    return queryset.filter(condition).annotate(rank=rank)
+
+
+def search_links(queryset, query):
+    """
+    Filter links by a search query and annotate them with the relevance `rank`.
+
+    On PostgreSQL the query is parsed like a web search (`"phrase"`, `or`, `-word`) and matched against
+    `Link.search_vector`, the title, description and URL weighted A, B and C, with the GIN index;
+    fragments of URLs are matched with the trigram index. Other databases, e.g. SQLite used in development,
+    get a portable approximation: every word of the query must occur in the title, description or URL,
+    and the rank sums the weights of the fields it occurs in.
+
+    Args:
+        queryset (QuerySet): The links to search.
+        query (str): The search query.
+
+    Returns:
+        QuerySet: The matching links with the `rank` annotation, unordered.
+    """
+    if connections[queryset.db].vendor == 'postgresql':
+        return _search_links_postgresql(queryset, query)
+    return _search_links_portable(queryset, query)
@@ -1,28 +1,38 @@
+from django.db import IntegrityError
 from rest_framework import serializers
 
+from config.sparse_fields import SparseFieldsetMixin
 from links.models import Link
-from links.validators import unique_url_validator
+from links.validators import DUPLICATE_URL_MESSAGE, unique_url_validator
 
 
-class LinkSerializer(serializers.ModelSerializer):
+class LinkSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for the Link model.
 
     This serializer inherits from `serializers.ModelSerializer` and is used to serialize and deserialize instances
     of the `Link` model.
     It includes a custom validation method for the `url` field.
+    The fields of the representation can be selected with `?fields=` and `?omit=`, see `SparseFieldsetMixin`;
+    the link lists build the same representation from plain rows, see `links.rows`.
 
     Attributes:
+        preview_thumbnail (ImageField): A read-only field with the small preview variant for list views.
         Meta: A nested class that defines metadata for the serializer.
 
     Methods:
         validate_url: Custom validation method for the `url` field.
+        create: Overrides the `create` method to remember the page data fields set by the user and to report a URL
+        saved concurrently as a validation error.
+        update: Overrides the `update` method to remember the page data fields changed by the user and to report a URL
+        saved concurrently as a validation error.
 
     Meta:
         model (Link): The model that this serializer is for.
         fields (tuple): The fields to include in the serialized representation.
         read_only_fields (tuple): The fields that should be read-only.
     """
+    preview_thumbnail = serializers.ImageField(source='preview_blob.thumbnail', read_only=True, allow_null=True)
 
     def validate_url(self, value):
         """
@@ -38,8 +48,55 @@ class LinkSerializer(serializers.ModelSerializer):
         """
         return unique_url_validator(value, self)
 
+    def create(self, validated_data):
+        """
+        Overrides the `create` method to remember the page data fields set by the user and to report a URL
+        saved concurrently as a validation error.
+
+        The non-empty fields of `Link.EDITABLE_METADATA_FIELDS` are added to `edited_fields`, so the page data
+        fetched later does not overwrite them. The unique constraint on `(owner, url_hash)` rejects a link that passed
+        `validate_url` while the same URL was being saved by a parallel request.
+
+        Args:
+            validated_data (dict): The validated data.
+
+        Returns:
+            Link: The created link.
+        """
+        validated_data['edited_fields'] = [field for field in Link.EDITABLE_METADATA_FIELDS
+                                           if validated_data.get(field) not in (None, '')]
+        try:
+            return super().create(validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError({'url': [DUPLICATE_URL_MESSAGE]})
+
+    def update(self, instance, validated_data):
+        """
+        Overrides the `update` method to remember the page data fields changed by the user and to report a URL
+        saved concurrently as a validation error.
+
+        The fields of `Link.EDITABLE_METADATA_FIELDS` whose values differ from the saved ones are added
+        to `edited_fields`, so refreshing the page data does not overwrite them.
+
+        Args:
+            instance (Link): The link being updated.
+            validated_data (dict): The validated data.
+
+        Returns:
+            Link: The updated link.
+        """
+        edited = [field for field in Link.EDITABLE_METADATA_FIELDS
+                  if field in validated_data and validated_data[field] != getattr(instance, field)]
+        if edited:
+            validated_data['edited_fields'] = list(dict.fromkeys([*instance.edited_fields, *edited]))
+        try:
+            return super().update(instance, validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError({'url': [DUPLICATE_URL_MESSAGE]})
+
     class Meta:
         model = Link
         fields = (
-            'pk', 'title', 'description', 'url', 'preview', 'type', 'created_at', 'updated_at', 'collection', 'owner',)
-        read_only_fields = ('owner', 'created_at', 'updated_at',)
+            'pk', 'title', 'description', 'url', 'preview', 'preview_thumbnail', 'type', 'metadata_status',
+            'created_at', 'updated_at', 'collection', 'owner',)
+        read_only_fields = ('owner', 'metadata_status', 'created_at', 'updated_at',)
@@ -1,68 +1,116 @@
 import logging
+from urllib.parse import urljoin
 
-import requests
-from bs4 import BeautifulSoup
 from django.core.files.base import ContentFile
 
+from config import settings
+from links.extractors import extract_head_metadata
+from links.fetch import FetchError, open_url
+from links.previews import InvalidImage, download_image
+
 logger = logging.getLogger(__name__)
 
 
-def get_page_data(url):
+def normalize_page_type(type_):
+    """
+    Map the og:type of a page to one of the `Link.TYPE_CHOICES` values.
+
+    Args:
+        type_ (str): The og:type of the page.
+
+    Returns:
+        str: The link type, 'website' by default.
+    """
+    # Если тип содержит "video", устанавливаем его на "video"
+    if 'video' in type_:
+        type_ = 'video'
+    # Если тип не определен или отличается от списка типов, устанавливаем его на "website" по умолчанию
+    if type_ not in ['website', 'book', 'article', 'music', 'video']:
+        type_ = 'website'
+    return type_
+
+
+def is_html(response):
+    """
+    Check whether a response looks like an HTML page.
+
+    Args:
+        response (FetchResponse): The response to check.
+
+    Returns:
+        bool: False only if the `Content-Type` header names a non-HTML type.
+    """
+    content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+    return not content_type or content_type in ('text/html', 'application/xhtml+xml')
+
+
+def get_page_data(url, etag=None, last_modified=None):
     """
     Retrieve page data from a given URL.
 
-    This function attempts to fetch the HTML content of the page at the given URL, parse it using BeautifulSoup,
-    and extract the title, description, image, and type of the page. It then returns a dictionary containing this data.
+    This function attempts to fetch the HTML content of the page at the given URL and extract the title,
+    description, image, and type of the page. It then returns a dictionary containing this data.
+    The page is parsed while it is downloaded and only up to the end of `<head>` (see `links.extractors`),
+    so the body of large pages is never read. The page and the image are fetched with the shared client
+    from `links.fetch`, so both requests are bounded by the timeouts and size limits of `settings.LINK_FETCH`.
+
+    When `etag` or `last_modified` of a previous response is given, the request is conditional and
+    an unchanged page is not downloaded again.
 
     Args:
         url (str): The URL of the page to fetch data from.
+        etag (str): The `ETag` of a previous response, sent as `If-None-Match`.
+        last_modified (str): The `Last-Modified` of a previous response, sent as `If-Modified-Since`.
 
     Returns:
-        dict: A dictionary containing the page data. The keys are 'title', 'description', 'image', and 'type'.
-        If the data could not be fetched or parsed, an empty dictionary is returned.
+        dict: A dictionary containing the page data. The keys are 'title', 'description', 'image', 'type',
+        'etag' and 'last_modified'. If the server answered 304 Not Modified, the dictionary is
+        `{'not_modified': True}`. If the data could not be fetched or parsed, an empty dictionary is returned.
 
     Logging:
         The function logs errors and exceptions using the logger.
     """
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+
     try:
-        response = requests.get(url)
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            title = soup.title.string.strip() if soup.title else ''
-            description = soup.find('meta', attrs={'name': 'description'})
-            description = description.get('content').strip() if description else ''
-            image = soup.find('meta', attrs={'property': 'og:image'})
-            image = image.get('content').strip() if image else ''
-            type_ = soup.find('meta', attrs={'property': 'og:type'})
-            type_ = type_.get('content').strip() if type_ else ''
-
-            # Если тип содержит "video", устанавливаем его на "video"
-            if 'video' in type_:
-                type_ = 'video'
-            # Если тип не определен или отличается от списка типов, устанавливаем его на "website" по умолчанию
-            if type_ not in ['website', 'book', 'article', 'music', 'video'] or type_ is None:
-                type_ = 'website'
-            # Скачиваем изображение и позднее сохраняем его в поле preview
-            if image:
-                image_response = requests.get(image)
-                if image_response.status_code == 200:
-                    return {
-                        'title': title,
-                        'description': description,
-                        'image': ContentFile(image_response.content),
-                        'type': type_
-                    }
-                else:
-                    logger.error(f"Не удалось получить превью из {image}. Status code: {image_response.status_code}")
+        with open_url(url, headers=headers) as response:
+            if response.status_code == 304 and headers:
+                return {'not_modified': True}
+            if response.status_code != 200:
+                logger.error(f"Не удалось получить данные страницы из {url}. Status code: {response.status_code}")
+                return {}
+            if is_html(response):
+                head = extract_head_metadata(response.iter_content(), encoding=response.encoding,
+                                             max_bytes=settings.LINK_FETCH['MAX_HEAD_BYTES'])
             else:
-                return {
-                    'title': title,
-                    'description': description,
-                    'image': None,
-                    'type': type_
-                }
-        else:
-            logger.error(f"Не удалось получить данные страницы из {url}. Status code: {response.status_code}")
+                head = {'title': '', 'description': '', 'image': '', 'type': ''}
+            page_url = response.url
+            response_etag = response.headers.get('ETag', '')
+            response_last_modified = response.headers.get('Last-Modified', '')
+
+        image = head['image']
+        page_data = {
+            'title': head['title'],
+            'description': head['description'],
+            'image': None,
+            'type': normalize_page_type(head['type']),
+            'etag': response_etag,
+            'last_modified': response_last_modified,
+        }
+        # Скачиваем изображение и позднее сохраняем его в поле preview; без превью данные страницы остаются полезны
+        if image:
+            image = urljoin(page_url, image)
+            try:
+                page_data['image'] = ContentFile(download_image(image))
+            except (InvalidImage, FetchError) as e:
+                logger.error(f"Не удалось получить превью из {image}: {e}")
+        return page_data
+    except FetchError as e:
+        logger.error(f"Не удалось получить данные страницы из {url}: {e}")
     except Exception as e:
         logger.exception(f"Ошибка при получении данных страницы из {url}: {e}")
     return {}
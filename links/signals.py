@@ -0,0 +1,179 @@
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from config.response_cache import bump_owner_version
+from link_collections.models import Collection
+from links.counters import adjust_collection_counters, adjust_link_type_change, adjust_links_counters
+from links.models import Link, PreviewBlob, UrlMetadata
+
+
+@receiver(post_delete, sender=Link)
+@receiver(post_delete, sender=UrlMetadata)
+def release_preview_blob(sender, instance, **kwargs):
+    """
+    Drops the reference of a deleted link or cache entry to its preview blob.
+
+    :param sender: The model class of the deleted instance
+    :param instance: The deleted Link or UrlMetadata instance
+    :param kwargs:
+    :return:
+    """
+    PreviewBlob.replace_reference(instance.preview_blob_id, None)
+
+
+@receiver(post_save, sender=Link)
+def count_saved_link(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Updates the link counters of the owner and of the day of creation when a link is created or its type changes.
+
+    :param sender: The Link model
+    :param instance: The saved link
+    :param created: True if the link was created
+    :param update_fields: The saved fields, or None if all fields were saved
+    :param kwargs:
+    :return:
+    """
+    if created:
+        adjust_links_counters([instance])
+    elif update_fields is None or 'type' in update_fields:
+        loaded_type = getattr(instance, '_loaded_type', None)
+        if loaded_type and loaded_type != instance.type:
+            adjust_link_type_change(instance, loaded_type)
+    instance._loaded_type = instance.type
+
+
+@receiver(pre_delete, sender=Link)
+def uncount_link_collections(sender, instance, **kwargs):
+    """
+    Decrements the counters of the collections of a link that is being deleted.
+
+    The membership rows are deleted by the cascade without `m2m_changed`, so the collections are counted here,
+    before they are gone.
+
+    :param sender: The Link model
+    :param instance: The link being deleted
+    :param kwargs:
+    :return:
+    """
+    Collection.objects.filter(links__pk=instance.pk).update(links_count=F('links_count') - 1,
+                                                            updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=Link)
+def uncount_deleted_link(sender, instance, **kwargs):
+    """
+    Decrements the link counters of the owner and of the day of creation of a deleted link.
+
+    :param sender: The Link model
+    :param instance: The deleted link
+    :param kwargs:
+    :return:
+    """
+    adjust_links_counters([instance], -1)
+
+
+@receiver(m2m_changed, sender=Link.collection.through)
+def count_collection_membership(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Updates `Collection.links_count` when links are added to or removed from collections.
+
+    Additions are counted after the rows are inserted, with only the new rows in `pk_set`. Removals are counted
+    before the rows are deleted, from the rows that actually exist.
+
+    :param sender: The intermediate model of `Link.collection`
+    :param instance: The link (`link.collection`) or the collection (`collection.links`) being changed
+    :param action: The kind of the change
+    :param reverse: True if the change is made from the collection side
+    :param pk_set: The primary keys of the added or removed collections or links
+    :param kwargs:
+    :return:
+    """
+    if action == 'post_add' and pk_set:
+        if reverse:
+            adjust_collection_counters([instance.pk], len(pk_set))
+        else:
+            adjust_collection_counters(pk_set, 1)
+    elif action == 'pre_remove' and pk_set:
+        if reverse:
+            removed = sender.objects.filter(collection_id=instance.pk, link_id__in=pk_set).count()
+            adjust_collection_counters([instance.pk], -removed)
+        else:
+            adjust_collection_counters(sender.objects.filter(link_id=instance.pk, collection_id__in=pk_set)
+                                       .values_list('collection_id', flat=True), -1)
+    elif action == 'pre_clear':
+        if reverse:
+            Collection.objects.filter(pk=instance.pk).update(links_count=0, updated_at=timezone.now())
+        else:
+            adjust_collection_counters(sender.objects.filter(link_id=instance.pk)
+                                       .values_list('collection_id', flat=True), -1)
+
+
+@receiver(m2m_changed, sender=Link.collection.through)
+def touch_membership_links(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Updates `updated_at` of the links whose collections change, since the collections are part of their
+    representation and of their ETag.
+
+    :param sender: The intermediate model of `Link.collection`
+    :param instance: The link (`link.collection`) or the collection (`collection.links`) being changed
+    :param action: The kind of the change
+    :param reverse: True if the change is made from the collection side
+    :param pk_set: The primary keys of the added or removed collections or links
+    :param kwargs:
+    :return:
+    """
+    now = timezone.now()
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear') and (pk_set or action == 'post_clear'):
+            Link.objects.filter(pk=instance.pk).update(updated_at=now)
+            instance.updated_at = now
+    elif action in ('post_add', 'post_remove') and pk_set:
+        Link.objects.filter(pk__in=pk_set).update(updated_at=now)
+    elif action == 'pre_clear':
+        Link.objects.filter(collection=instance).update(updated_at=now)
+
+
+@receiver(pre_delete, sender=Collection)
+def touch_collection_links(sender, instance, **kwargs):
+    """
+    Updates `updated_at` of the links of a collection that is being deleted.
+
+    :param sender: The Collection model
+    :param instance: The collection being deleted
+    :param kwargs:
+    :return:
+    """
+    Link.objects.filter(collection=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Link)
+@receiver(post_delete, sender=Link)
+@receiver(post_save, sender=Collection)
+@receiver(post_delete, sender=Collection)
+def invalidate_owner_responses(sender, instance, **kwargs):
+    """
+    Makes the cached responses of the owner of a changed link or collection stale.
+
+    :param sender: The Link or Collection model
+    :param instance: The saved or deleted link or collection
+    :param kwargs:
+    :return:
+    """
+    bump_owner_version(instance.owner_id)
+
+
+@receiver(m2m_changed, sender=Link.collection.through)
+def invalidate_membership_responses(sender, instance, action, **kwargs):
+    """
+    Makes the cached responses of the owner stale when links are added to or removed from collections.
+
+    :param sender: The intermediate model of `Link.collection`
+    :param instance: The link or the collection being changed
+    :param action: The kind of the change
+    :param kwargs:
+    :return:
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_owner_version(instance.owner_id)
@@ -0,0 +1,82 @@
+from datetime import timedelta
+
+from django.db.models import Sum
+from django.utils import timezone
+
+from links.models import Link, LinkDailyCounter
+from users.models import User
+
+LINK_TYPES = [type_ for type_, _ in Link.TYPE_CHOICES]
+
+
+def _by_type(counts):
+    return {type_: counts.get(type_, 0) for type_ in LINK_TYPES}
+
+
+def get_top_users(top):
+    """
+    Return the users with the most links, with the number of their links by type.
+
+    The users are read in the order of the index on `(-links_count, date_joined)`, so only `top` rows are read.
+
+    Args:
+        top (int): The number of users.
+
+    Returns:
+        list: The users as dictionaries with the 'pk', 'email', 'links_count' and 'links_by_type' keys.
+    """
+    users = (User.objects.filter(links_count__gt=0).order_by('-links_count', 'date_joined')
+             .only('pk', 'email', 'links_count').prefetch_related('link_type_counters')[:top])
+    return [{
+        'pk': user.pk,
+        'email': user.email,
+        'links_count': user.links_count,
+        'links_by_type': _by_type({counter.type: counter.count for counter in user.link_type_counters.all()}),
+    } for user in users]
+
+
+def get_links_per_day(days):
+    """
+    Return the number of links created on each of the last days, days without links included.
+
+    Args:
+        days (int): The number of days, today included.
+
+    Returns:
+        list: The days as dictionaries with the 'day', 'count' and 'by_type' keys, the oldest first.
+    """
+    today = timezone.localdate()
+    since = today - timedelta(days=days - 1)
+    counts = {}
+    for day, type_, count in (LinkDailyCounter.objects.filter(day__gte=since, day__lte=today)
+                              .values_list('day', 'type').annotate(count=Sum('count')).order_by()):
+        counts.setdefault(day, {})[type_] = count
+    series = []
+    for offset in range(days):
+        day = since + timedelta(days=offset)
+        by_type = _by_type(counts.get(day, {}))
+        series.append({'day': day, 'count': sum(by_type.values()), 'by_type': by_type})
+    return series
+
+
+def get_link_stats(top, days):
+    """
+    Return the statistics of the links of all users.
+
+    Everything is read from the counters maintained by `links.counters`: `User.links_count`, `LinkTypeCounter`
+    and `LinkDailyCounter`, so the cost depends on the size of the result and not on the number of links.
+
+    Args:
+        top (int): The number of users in the leaderboard.
+        days (int): The number of days in the links per day series.
+
+    Returns:
+        dict: The 'links_count', the 'by_type' breakdown of all links, the 'top_users' and the 'per_day' series.
+    """
+    by_type = _by_type(dict(LinkDailyCounter.objects.values_list('type').annotate(count=Sum('count')).order_by()))
+    return {
+        'links_count': sum(by_type.values()),
+        'by_type': by_type,
+        'top_users': get_top_users(top),
+        'per_day': get_links_per_day(days),
+    }
@@ -1,3 +1,1620 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import io
+import json
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
+from urllib.parse import quote
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Prefetch, Sum
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from PIL import Image
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from config import settings
+from config.renderers import ORJSONRenderer
+from config.response_cache import get_response_cache_stats
+from config.sparse_fields import get_sparse_fields
+from link_collections.models import Collection
+from links.async_fetch import AsyncFetcher, fetch_many
+from links.counters import counter_shard, reconcile_daily_counters
+from links.extractors import extract_head_metadata
+from links.filters import get_link_facets
+from links.fetch import DeadlineExceeded, FetchError, ResponseTooLarge, fetch
+from links.jobs import claim_jobs, run_job
+from links.metadata_cache import fetch_url_metadata
+from links.models import Link, LinkDailyCounter, LinkMetadataJob, LinkTypeCounter, PreviewBlob, UrlMetadata
+from links.normalization import hash_url, normalize_url
+from links.previews import InvalidImage, download_image, render_preview, sniff_image_format
+from links.refresh import refresh_links
+from links.rows import LINK_FIELDS, link_rows, serialize_link_rows
+from links.serializers.link import LinkSerializer
+from links.services import normalize_page_type
+from users.models import User
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Request handler of `StubServer`: the response of a path is produced by the function in `server.routes`.
+    """
+
+    def do_GET(self):
+        route = self.server.routes.get(self.path.split('?')[0])
+        self.server.requests.append((time.monotonic(), self.path))
+        try:
+            if route is None:
+                self.send_error(404)
+            else:
+                route(self)
+        except OSError:
+            # Клиент закрыл соединение, не дочитав ответ
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    """
+    Local HTTP server for the tests of the fetch clients, running in a background thread.
+
+    Attributes:
+        routes (dict): The functions writing the response of a path, called with the request handler.
+        requests (list): The moments and paths of the received requests.
+        url (str): The base URL of the server.
+    """
+
+    def __init__(self, routes):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        self._server.daemon_threads = True
+        self._server.routes = routes
+        self._server.requests = []
+        self.requests = self._server.requests
+        self.url = f'http://127.0.0.1:{self._server.server_address[1]}'
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def trickle(content_length):
+    """
+    Return a route sending a byte every 0.2 seconds for 10 seconds, with or without `Content-Length`.
+    """
+    def route(handler):
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'text/html')
+        if content_length:
+            handler.send_header('Content-Length', '50')
+        handler.end_headers()
+        for _ in range(50):
+            handler.wfile.write(b'x')
+            handler.wfile.flush()
+            time.sleep(0.2)
+    return route
+
+
+def page(body, status=200, content_type='text/html; charset=utf-8'):
+    """
+    Return a route sending a fixed body.
+    """
+    def route(handler):
+        handler.send_response(status)
+        handler.send_header('Content-Type', content_type)
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+    return route
+
+
+def redirect(location, delay=0, trickle_body=False):
+    """
+    Return a route redirecting to `location` after `delay` seconds, optionally with a body sent a byte at a time.
+    """
+    def route(handler):
+        time.sleep(delay)
+        handler.send_response(302)
+        handler.send_header('Location', location)
+        handler.end_headers()
+        if trickle_body:
+            for _ in range(50):
+                handler.wfile.write(b'x')
+                handler.wfile.flush()
+                time.sleep(0.2)
+    return route
+
+
+HTML_PAGE = page(b'<html><head><title>Page</title></head><body></body></html>')
+
+
+class Tracker:
+    """
+    Counter of the requests in progress, shared by the routes of several stub servers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+
+    def slow_page(self, delay):
+        """
+        Return a route answering with a small page after `delay` seconds, counted as in progress meanwhile.
+        """
+        def route(handler):
+            with self._lock:
+                self.active += 1
+                self.max_active = max(self.max_active, self.active)
+            try:
+                time.sleep(delay)
+                HTML_PAGE(handler)
+            finally:
+                with self._lock:
+                    self.active -= 1
+        return route
+
+
+class FetchDeadlineTestCase(SimpleTestCase):
+    """
+    The overall deadline of `links.fetch` holds for a server that sends the body a little at a time.
+    """
+
+    def setUp(self):
+        patcher = mock.patch.dict(settings.LINK_FETCH, {'DEADLINE': 1, 'READ_TIMEOUT': 1})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def assert_deadline(self, path, routes):
+        with StubServer(routes) as server:
+            started = time.monotonic()
+            with self.assertRaises(DeadlineExceeded):
+                fetch(server.url + path)
+            self.assertLess(time.monotonic() - started, 2.5)
+
+    def test_slow_body_with_content_length(self):
+        self.assert_deadline('/slow', {'/slow': trickle(content_length=True)})
+
+    def test_slow_body_until_close(self):
+        self.assert_deadline('/slow', {'/slow': trickle(content_length=False)})
+
+    def test_fast_body(self):
+        with StubServer({'/': page(b'<html></html>')}) as server:
+            response = fetch(server.url + '/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'<html></html>')
+
+    def test_redirects(self):
+        with StubServer({'/a': redirect('/b'), '/b': redirect('c'), '/c': page(b'<html></html>')}) as server:
+            response = fetch(server.url + '/a')
+        self.assertEqual(response.url, server.url + '/c')
+        self.assertEqual(response.content, b'<html></html>')
+
+    def test_redirect_body_is_not_read(self):
+        routes = {'/a': redirect('/b', trickle_body=True), '/b': page(b'<html></html>')}
+        with StubServer(routes) as server:
+            started = time.monotonic()
+            response = fetch(server.url + '/a')
+            self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(response.content, b'<html></html>')
+
+    def test_too_many_redirects(self):
+        with mock.patch.dict(settings.LINK_FETCH, {'MAX_REDIRECTS': 2}):
+            with StubServer({'/a': redirect('/a')}) as server:
+                with self.assertRaises(FetchError):
+                    fetch(server.url + '/a')
+        self.assertEqual(len(server.requests), 3)
+
+    def test_slow_redirects(self):
+        routes = {f'/{i}': redirect(f'/{i + 1}', delay=0.4) for i in range(5)}
+        routes['/5'] = page(b'<html></html>')
+        self.assert_deadline('/0', routes)
+
+
+class AsyncFetcherTestCase(SimpleTestCase):
+    """
+    The concurrency limits, the interval between requests to one site and robots.txt of `links.async_fetch`.
+    """
+
+    def test_per_domain_concurrency(self):
+        tracker = Tracker()
+        routes = {f'/page/{i}': tracker.slow_page(0.3) for i in range(6)}
+        with StubServer(routes) as server:
+            results = fetch_many([server.url + path for path in routes], concurrency=10, per_domain=2,
+                                 min_interval=0)
+        self.assertEqual(tracker.max_active, 2)
+        self.assertEqual({data['title'] for data in results.values()}, {'Page'})
+
+    def test_total_concurrency(self):
+        tracker = Tracker()
+        routes = {f'/page/{i}': tracker.slow_page(0.3) for i in range(3)}
+        with StubServer(routes) as first, StubServer(routes) as second, StubServer(routes) as third:
+            urls = [server.url + path for server in (first, second, third) for path in routes]
+            results = fetch_many(urls, concurrency=2, per_domain=3, min_interval=0)
+        self.assertEqual(tracker.max_active, 2)
+        self.assertEqual(len(results), 9)
+
+    def test_min_interval(self):
+        routes = {f'/page/{i}': HTML_PAGE for i in range(4)}
+        with StubServer(routes) as server:
+            fetch_many([server.url + path for path in routes], per_domain=4, min_interval=0.3)
+        starts = [moment for moment, path in server.requests if path.startswith('/page/')]
+        self.assertEqual(len(starts), 4)
+        gaps = [later - earlier for earlier, later in zip(starts, starts[1:])]
+        self.assertGreaterEqual(min(gaps), 0.25)
+
+    def test_robots_rules(self):
+        routes = {
+            '/robots.txt': page(b'User-agent: *\nDisallow: /private\n', content_type='text/plain'),
+            '/public': HTML_PAGE,
+            '/private': HTML_PAGE,
+        }
+        with StubServer(routes) as server:
+            results = fetch_many([server.url + '/public', server.url + '/private'], min_interval=0)
+        self.assertEqual(results[server.url + '/public']['title'], 'Page')
+        self.assertEqual(results[server.url + '/private'], {})
+        self.assertNotIn('/private', [path for _, path in server.requests])
+
+    def test_missing_robots_allows_everything(self):
+        with StubServer({'/robots.txt': page(b'', status=404), '/page': HTML_PAGE}) as server:
+            results = fetch_many([server.url + '/page'], min_interval=0)
+        self.assertEqual(results[server.url + '/page']['title'], 'Page')
+
+    def test_unavailable_robots_disallows_everything(self):
+        with StubServer({'/robots.txt': page(b'', status=503), '/page': HTML_PAGE}) as server:
+            results = fetch_many([server.url + '/page'], min_interval=0)
+        self.assertEqual(results[server.url + '/page'], {})
+        self.assertEqual([path for _, path in server.requests], ['/robots.txt'])
+
+    def test_cached_results_skip_limits(self):
+        routes = {f'/page/{i}': HTML_PAGE for i in range(4)}
+        with StubServer(routes) as server:
+            urls = [server.url + path for path in routes]
+            cached = {url: {'title': 'Cached'} for url in urls[:3]}
+            started = time.monotonic()
+            results = fetch_many(urls, per_domain=1, min_interval=1, respect_robots=False, cached=cached.get)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual([results[url]['title'] for url in urls], ['Cached', 'Cached', 'Cached', 'Page'])
+        self.assertEqual([path for _, path in server.requests], ['/page/3'])
+
+    def test_robots_fetched_once_per_origin(self):
+        routes = {f'/page/{i}': HTML_PAGE for i in range(3)}
+        with StubServer(routes) as server:
+            fetcher = AsyncFetcher(min_interval=0)
+            try:
+                asyncio.run(fetcher.fetch_many([server.url + path for path in routes]))
+            finally:
+                fetcher.close()
+        self.assertEqual([path for _, path in server.requests].count('/robots.txt'), 1)
+
+
+class RefreshLinksTestCase(TransactionTestCase):
+    """
+    The refresh of outdated page data goes through the limits and robots.txt of `links.async_fetch`.
+
+    The pages are fetched in other threads with their own database connections, so the data is committed.
+    """
+
+    def setUp(self):
+        self.owner = User.objects.create(email='refresh@example.com')
+
+    def create_link(self, url):
+        link = Link.objects.create(owner=self.owner, url=url)
+        Link.objects.filter(pk=link.pk).update(metadata_status='done')
+        return Link.objects.get(pk=link.pk)
+
+    def test_refresh_updates_changed_data(self):
+        with StubServer({'/page': HTML_PAGE}) as server:
+            link = self.create_link(server.url + '/page')
+            self.assertEqual(refresh_links([link], concurrency=2), (1, 1, 0))
+        link.refresh_from_db()
+        self.assertEqual(link.title, 'Page')
+        self.assertIsNotNone(link.metadata_fetched_at)
+
+    def test_refresh_keeps_user_edits(self):
+        article = page(b'<html><head><title>Page</title><meta name="description" content="About">'
+                       b'<meta property="og:type" content="article"></head></html>')
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        with StubServer({'/a': article, '/b': article}) as server:
+            edited, retyped = self.create_link(server.url + '/a'), self.create_link(server.url + '/b')
+            # Пользователь меняет ссылки, пока страницы загружаются: refresh_links получает устаревшие строки
+            response = client.patch(f'/links/update/{edited.pk}/', {'title': 'Мой заголовок'}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            client.post('/links/bulk/', [{'op': 'set_type', 'ids': [retyped.pk], 'type': 'book'}], format='json')
+            self.assertEqual(refresh_links([edited, retyped], concurrency=2), (2, 2, 0))
+
+        edited.refresh_from_db()
+        retyped.refresh_from_db()
+        self.assertEqual((edited.title, edited.description, edited.type), ('Мой заголовок', 'About', 'article'))
+        self.assertEqual((retyped.title, retyped.description, retyped.type), ('Page', 'About', 'book'))
+        self.assertEqual(edited.edited_fields, ['title'])
+        self.assertEqual(retyped.edited_fields, ['type'])
+        counts = {counter.type: counter.count for counter in LinkTypeCounter.objects.filter(owner=self.owner)}
+        self.assertEqual({type_: count for type_, count in counts.items() if count}, {'article': 1, 'book': 1})
+
+    def test_refresh_uses_fresh_cache_entries(self):
+        with StubServer({'/page': HTML_PAGE}) as server:
+            link = self.create_link(server.url + '/page')
+            now = timezone.now()
+            UrlMetadata.objects.create(url_hash=hash_url(link.url), url=normalize_url(link.url), title='Cached',
+                                       fetched_at=now, expires_at=now + timedelta(minutes=1))
+            self.assertEqual(refresh_links([link], concurrency=2), (1, 1, 0))
+        self.assertEqual(server.requests, [])
+        link.refresh_from_db()
+        self.assertEqual(link.title, 'Cached')
+
+    def test_refresh_skips_deleted_links(self):
+        with StubServer({'/page': HTML_PAGE}) as server:
+            link = self.create_link(server.url + '/page')
+            Link.objects.filter(pk=link.pk).delete()
+            self.assertEqual(refresh_links([link], concurrency=2), (1, 0, 0))
+        self.assertFalse(Link.objects.exists())
+
+    def test_refresh_respects_robots(self):
+        with StubServer({'/robots.txt': page(b'', status=500), '/page': HTML_PAGE}) as server:
+            link = self.create_link(server.url + '/page')
+            self.assertEqual(refresh_links([link], concurrency=2), (0, 0, 1))
+        self.assertNotIn('/page', [path for _, path in server.requests])
+
+
+class LegacyDuplicateUrlTestCase(TestCase):
+    """
+    Legacy duplicates left without `url_hash` by migration 0007 can be edited without breaking the constraint.
+    """
+
+    def setUp(self):
+        self.owner = User.objects.create(email='duplicates@example.com')
+        self.original = Link.objects.create(owner=self.owner, url='https://example.com/page')
+        self.duplicate = Link.objects.create(owner=self.owner, url='https://example.com/other')
+        Link.objects.filter(pk=self.duplicate.pk).update(url='https://example.com/page/', url_hash=None)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def test_patch_title(self):
+        response = self.client.patch(f'/links/update/{self.duplicate.pk}/', {'title': 'Новый'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.duplicate.refresh_from_db()
+        self.assertEqual(self.duplicate.title, 'Новый')
+        self.assertIsNone(self.duplicate.url_hash)
+
+    def test_put_with_unchanged_url(self):
+        response = self.client.put(f'/links/update/{self.duplicate.pk}/',
+                                   {'url': 'https://example.com/page/', 'title': 'Новый'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_full_save(self):
+        link = Link.objects.get(pk=self.duplicate.pk)
+        link.title = 'Новый'
+        link.save()
+        self.assertIsNone(Link.objects.get(pk=link.pk).url_hash)
+
+    def test_changed_url_is_hashed(self):
+        response = self.client.patch(f'/links/update/{self.duplicate.pk}/', {'url': 'https://example.com/new'},
+                                     format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.duplicate.refresh_from_db()
+        self.assertIsNotNone(self.duplicate.url_hash)
+        self.assertEqual(self.duplicate.domain, 'example.com')
+
+    def test_changed_url_to_existing(self):
+        response = self.client.patch(f'/links/update/{self.original.pk}/', {'url': 'https://example.com/other'},
+                                     format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.patch(f'/links/update/{self.duplicate.pk}/', {'url': 'https://example.com/other/'},
+                                     format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+def encode_cursor(value, pk, reverse=False):
+    """
+    Return a cursor of `KeysetPagination` with arbitrary values.
+    """
+    return base64.urlsafe_b64encode(json.dumps([value, pk, reverse]).encode('ascii')).decode('ascii')
+
+
+class LinkCursorPaginationTestCase(TestCase):
+    """
+    The keyset mode of the link list and of the search: pages, links between them and invalid cursors.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create(email='cursor@example.com')
+        self.links = [Link.objects.create(owner=self.owner, url=f'https://example.com/{i}', title=f'Article {i}')
+                      for i in range(7)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def get_pks(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['pk'] for item in response.data['results']], response.data
+
+    def test_pages(self):
+        expected = sorted((link.pk for link in self.links), reverse=True)
+        pks, data = self.get_pks('/links/links_list/?pagination=cursor&page_size=3&count=true')
+        self.assertEqual(pks, expected[:3])
+        self.assertEqual(data['count'], 7)
+        self.assertIsNone(data['previous'])
+        second, data = self.get_pks(data['next'])
+        self.assertEqual(second, expected[3:6])
+        third, data = self.get_pks(data['next'])
+        self.assertEqual(third, expected[6:])
+        self.assertIsNone(data['next'])
+        back, data = self.get_pks(data['previous'])
+        self.assertEqual(back, expected[3:6])
+        first, data = self.get_pks(data['previous'])
+        self.assertEqual(first, expected[:3])
+
+    def test_new_link_does_not_shift_pages(self):
+        pks, data = self.get_pks('/links/links_list/?pagination=cursor&page_size=3')
+        Link.objects.create(owner=self.owner, url='https://example.com/new')
+        second, _ = self.get_pks(data['next'])
+        self.assertEqual(second, sorted((link.pk for link in self.links), reverse=True)[3:6])
+
+    def test_equal_timestamps(self):
+        Link.objects.filter(pk__in=[link.pk for link in self.links[2:6]]).update(created_at=self.links[2].created_at)
+        expected = list(Link.objects.order_by('-created_at', '-pk').values_list('pk', flat=True))
+        pks, data = self.get_pks('/links/links_list/?pagination=cursor&page_size=3')
+        with CaptureQueriesContext(connection) as queries:
+            second, data = self.get_pks(data['next'])
+        # Диапазон по дате задан отдельно от условия с OR, чтобы он стал границей просмотра индекса
+        page_query = next(query['sql'] for query in queries.captured_queries if 'LIMIT' in query['sql'])
+        self.assertIn('"links_link"."created_at" <= ', page_query)
+        third, data = self.get_pks(data['next'])
+        self.assertEqual(pks + second + third, expected)
+        back, _ = self.get_pks(data['previous'])
+        self.assertEqual(back, expected[3:6])
+
+    def test_invalid_cursors(self):
+        created_at = self.links[0].created_at.isoformat()
+        cursors = [
+            encode_cursor(123, 5),
+            encode_cursor(True, 5),
+            encode_cursor(None, 5),
+            encode_cursor('not a date', 5),
+            encode_cursor(created_at, '5'),
+            encode_cursor(created_at, 2 ** 64),
+            encode_cursor([created_at], 5),
+            'not base64!',
+            base64.urlsafe_b64encode(b'[1, 2]').decode('ascii'),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(f'/links/links_list/?cursor={cursor}')
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_search_pages(self):
+        pks, data = self.get_pks('/links/search/?q=article&page_size=4')
+        rest, data = self.get_pks(data['next'])
+        self.assertCountEqual(pks + rest, [link.pk for link in self.links])
+        self.assertIsNone(data['next'])
+
+    def test_search_invalid_cursor(self):
+        cursor = encode_cursor(self.links[0].created_at.isoformat(), 5)
+        response = self.client.get(f'/links/search/?q=article&cursor={cursor}')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class LinkBulkCreateTestCase(TestCase):
+    """
+    The bulk creation of links: per-item results, counters and metadata jobs.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create(email='bulk@example.com')
+        self.existing = Link.objects.create(owner=self.owner, url='https://example.com/existing')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def test_results(self):
+        response = self.client.post('/links/bulk_create/', [
+            'https://example.com/a',
+            {'url': 'https://example.com/b'},
+            'https://EXAMPLE.com/a',
+            'not a url',
+            {'title': 'без URL'},
+            'https://example.com/existing',
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual({key: response.data[key] for key in ('created', 'exists', 'duplicate', 'invalid')},
+                         {'created': 2, 'exists': 1, 'duplicate': 1, 'invalid': 2})
+        self.assertEqual([result['status'] for result in response.data['results']],
+                         ['created', 'created', 'duplicate', 'invalid', 'invalid', 'exists'])
+        self.assertEqual(response.data['results'][5]['pk'], self.existing.pk)
+
+        created = Link.objects.filter(pk__in=[result['pk'] for result in response.data['results'][:2]])
+        self.assertEqual(created.filter(owner=self.owner).count(), 2)
+        self.assertEqual(LinkMetadataJob.objects.filter(link__in=created).count(), 2)
+        self.owner.refresh_from_db()
+        self.assertEqual(self.owner.links_count, 3)
+        self.assertEqual(LinkTypeCounter.objects.get(owner=self.owner, type='website').count, 3)
+
+    def test_ndjson(self):
+        body = '"https://example.com/a"\n\n{"url": "https://example.com/b"}\n'
+        response = self.client.post('/links/bulk_create/', body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 2)
+
+    def test_nothing_created(self):
+        response = self.client.post('/links/bulk_create/', ['https://example.com/existing'], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Link.objects.count(), 1)
+
+    def test_invalid_body(self):
+        response = self.client.post('/links/bulk_create/', {'url': 'https://example.com/a'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        with mock.patch.dict(settings.LINK_BULK_CREATE, {'MAX_ITEMS': 2}):
+            response = self.client.post('/links/bulk_create/', ['https://example.com/a'] * 3, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Link.objects.count(), 1)
+
+    def test_conflicts_after_retries(self):
+        # Параллельный запрос каждый раз успевает сохранить URL после проверки существующих ссылок
+        with mock.patch('links.bulk._existing_links', return_value={}) as existing_links:
+            response = self.client.post('/links/bulk_create/',
+                                        ['https://example.com/a', 'https://example.com/existing'], format='json')
+        self.assertEqual(existing_links.call_count, 3)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([(result['status'], result['pk']) for result in response.data['results']],
+                         [('created', Link.objects.get(url='https://example.com/a').pk), ('exists', self.existing.pk)])
+        self.owner.refresh_from_db()
+        self.assertEqual(self.owner.links_count, 2)
+        self.assertEqual(LinkMetadataJob.objects.count(), 2)
+
+    def test_requires_authentication(self):
+        response = APIClient().post('/links/bulk_create/', ['https://example.com/a'], format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class LinkStatsTestCase(TestCase):
+    """
+    The link statistics read from the daily counters sharded by owner.
+    """
+
+    def setUp(self):
+        self.admin = User.objects.create(email='admin@example.com', is_superuser=True)
+        self.users = [User.objects.create(email=f'stats{i}@example.com') for i in range(3)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def get_stats(self):
+        response = self.client.get('/links/stats/?days=2')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['by_type'], response.data['per_day'][-1]['by_type']
+
+    def test_counters_of_shards(self):
+        with mock.patch.dict(settings.LINK_STATS, {'DAILY_COUNTER_SHARDS': 2}):
+            for user in self.users:
+                Link.objects.create(owner=user, url='https://example.com/video', type='video')
+            link = Link.objects.create(owner=self.users[0], url='https://example.com/page')
+            self.assertEqual(set(LinkDailyCounter.objects.values_list('shard', flat=True)),
+                             {user.pk % 2 for user in self.users})
+
+            link.type = 'book'
+            link.save()
+            Link.objects.filter(owner=self.users[1]).delete()
+            expected = {'website': 0, 'book': 1, 'article': 0, 'music': 0, 'video': 2}
+            self.assertEqual(self.get_stats(), (expected, expected))
+
+            LinkDailyCounter.objects.update(count=100)
+            call_command('reconcile_link_counters', stdout=StringIO())
+            self.assertEqual(self.get_stats(), (expected, expected))
+
+    def test_reconcile_day_ranges(self):
+        today = timezone.localdate()
+        for days_ago, user in ((0, self.users[0]), (3, self.users[1]), (10, self.users[2])):
+            link = Link.objects.create(owner=user, url=f'https://example.com/{days_ago}', type='video')
+            # Дата меняется в обход счетчиков, как при правке базы вручную
+            Link.objects.filter(pk=link.pk).update(created_at=link.created_at - timedelta(days=days_ago))
+        LinkDailyCounter.objects.create(day=today - timedelta(days=20), type='book', shard=0, count=5)
+        expected = {(today - timedelta(days=days_ago), counter_shard(user.pk)): 1
+                    for days_ago, user in ((0, self.users[0]), (3, self.users[1]), (10, self.users[2]))}
+
+        # Пересчет одного диапазона не трогает счетчики других дней
+        self.assertEqual(reconcile_daily_counters(today - timedelta(days=4), today - timedelta(days=2)), 1)
+        self.assertEqual(LinkDailyCounter.objects.get(day=today - timedelta(days=20)).count, 5)
+
+        stdout = StringIO()
+        call_command('reconcile_link_counters', '--days', '2', stdout=stdout)
+        self.assertIn('Исправлено счетчиков по дням: 4', stdout.getvalue())
+        counts = {(counter.day, counter.shard): counter.count
+                  for counter in LinkDailyCounter.objects.filter(type='video').exclude(count=0)}
+        self.assertEqual(counts, expected)
+        self.assertEqual(LinkDailyCounter.objects.get(day=today - timedelta(days=20)).count, 0)
+
+    def test_number_of_shards_changed(self):
+        with mock.patch.dict(settings.LINK_STATS, {'DAILY_COUNTER_SHARDS': 1}):
+            link = Link.objects.create(owner=self.users[1], url='https://example.com/page')
+        with mock.patch.dict(settings.LINK_STATS, {'DAILY_COUNTER_SHARDS': 4}):
+            link.delete()
+            Link.objects.create(owner=self.users[2], url='https://example.com/video', type='video')
+        expected = {'website': 0, 'book': 0, 'article': 0, 'music': 0, 'video': 1}
+        self.assertEqual(self.get_stats(), (expected, expected))
+
+    def test_superusers_only(self):
+        self.client.force_authenticate(self.users[0])
+        self.assertEqual(self.client.get('/links/stats/').status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ConditionalRequestTestCase(TestCase):
+    """
+    The validators of the link responses: 304 for unchanged data and 412 for updates of a changed link.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create(email='etag@example.com')
+        self.link = Link.objects.create(owner=self.owner, url='https://example.com/page', title='Заголовок')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def get_etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.has_header('ETag'))
+        return response['ETag']
+
+    def test_detail_not_modified(self):
+        url = f'/links/detail/{self.link.pk}/'
+        response = self.client.get(url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        for headers in ({'HTTP_IF_NONE_MATCH': etag}, {'HTTP_IF_MODIFIED_SINCE': last_modified}):
+            with self.subTest(headers=headers):
+                response = self.client.get(url, **headers)
+                self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+                self.assertEqual(response['ETag'], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/links/update/{self.link.pk}/', {'title': 'Новый заголовок'})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_not_modified(self):
+        url = '/links/links_list/'
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        # Валидаторы списка вычисляются по содержимому ответа, без отдельного запроса к базе
+        self.assertFalse(any('MAX(' in query['sql'] for query in queries.captured_queries))
+        self.assertFalse(response.has_header('Last-Modified'))
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Link.objects.create(owner=self.owner, url='https://example.com/other')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_list_after_deleting_older_link(self):
+        url = '/links/links_list/'
+        Link.objects.create(owner=self.owner, url='https://example.com/newer')
+        etag = self.get_etag(url)
+        # Удаление не самой новой ссылки не меняет наибольшее updated_at списка
+        with self.captureOnCommitCallbacks(execute=True):
+            self.link.delete()
+        for headers in ({'HTTP_IF_NONE_MATCH': etag}, {'HTTP_IF_MODIFIED_SINCE': http_date(time.time() + 60)}):
+            with self.subTest(headers=headers):
+                response = self.client.get(url, **headers)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(len(response.data['results']), 1)
+
+    def test_update_with_current_etag(self):
+        etag = self.get_etag(f'/links/detail/{self.link.pk}/')
+        response = self.client.patch(f'/links/update/{self.link.pk}/', {'title': 'Новый заголовок'},
+                                     HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+        # Второй клиент с тем же ETag не перезаписывает изменение первого
+        response = self.client.patch(f'/links/update/{self.link.pk}/', {'title': 'Устаревший'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.link.refresh_from_db()
+        self.assertEqual(self.link.title, 'Новый заголовок')
+
+    def test_update_unmodified_since(self):
+        response = self.client.patch(f'/links/update/{self.link.pk}/', {'title': 'Новый заголовок'},
+                                     HTTP_IF_UNMODIFIED_SINCE='Mon, 01 Jan 2001 00:00:00 GMT')
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.link.refresh_from_db()
+        self.assertEqual(self.link.title, 'Заголовок')
+
+
+@mock.patch.dict(settings.RESPONSE_CACHE, {'ENABLED': True})
+class ResponseCacheTestCase(TestCase):
+    """
+    The per-user response cache of the read views: hits, misses and the invalidation after the commit of a change.
+    """
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('links.jobs.close_old_connections')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.owner = User.objects.create(email='response-cache@example.com')
+        self.link = Link.objects.create(owner=self.owner, url='https://example.com/page', title='Заголовок')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def get(self, url='/links/links_list/'):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def titles(self, response):
+        return [link['title'] for link in response.data['results']]
+
+    def test_hit_and_miss(self):
+        first = self.get()
+        self.assertEqual(first['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            second = self.get()
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(self.get('/links/links_list/?type=website')['X-Cache'], 'MISS')
+
+        # Ответы другого пользователя хранятся отдельно
+        other = User.objects.create(email='other-cache@example.com')
+        self.client.force_authenticate(other)
+        response = self.get()
+        self.assertEqual((response['X-Cache'], response.data['results']), ('MISS', []))
+        self.assertEqual(get_response_cache_stats(), {'hits': 1, 'misses': 3, 'hit_ratio': 0.25})
+
+    def test_invalidated_after_commit(self):
+        self.get()
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.patch(f'/links/update/{self.link.pk}/', {'title': 'Новый заголовок'},
+                                         format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # До фиксации транзакции версия не меняется, и ответ, прочитанный до нее, остается в кэше
+        response = self.get()
+        self.assertEqual((response['X-Cache'], self.titles(response)), ('HIT', ['Заголовок']))
+
+        for callback in callbacks:
+            callback()
+        response = self.get()
+        self.assertEqual((response['X-Cache'], self.titles(response)), ('MISS', ['Новый заголовок']))
+        self.assertEqual(self.get()['X-Cache'], 'HIT')
+
+    def test_invalidated_by_worker(self):
+        self.get()
+        job = LinkMetadataJob.objects.get(link=self.link)
+        url_metadata = UrlMetadata(title='Page', description='About', type='video', fetched_at=timezone.now())
+        claim_jobs(1)
+        with self.captureOnCommitCallbacks(execute=True), \
+                mock.patch('links.jobs.fetch_url_metadata', return_value=url_metadata):
+            run_job(job.pk)
+        response = self.get()
+        self.assertEqual((response['X-Cache'], self.titles(response)), ('MISS', ['Page']))
+
+    def test_disabled(self):
+        with mock.patch.dict(settings.RESPONSE_CACHE, {'ENABLED': False}):
+            for _ in range(2):
+                self.assertFalse(self.get().has_header('X-Cache'))
+        self.assertEqual(get_response_cache_stats()['hits'], 0)
+
+
+class LinkOwnershipTestCase(TestCase):
+    """
+    The links of another user are not found, superusers get the links of all users.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create(email='owner@example.com')
+        self.other = User.objects.create(email='other@example.com')
+        self.link = Link.objects.create(owner=self.owner, url='https://example.com/page', title='Заголовок')
+        self.client = APIClient()
+        self.client.force_authenticate(self.other)
+
+    def test_other_user_gets_404(self):
+        for method, url in (('get', f'/links/detail/{self.link.pk}/'),
+                            ('patch', f'/links/update/{self.link.pk}/'),
+                            ('put', f'/links/update/{self.link.pk}/'),
+                            ('delete', f'/links/delete/{self.link.pk}/')):
+            with self.subTest(method=method, url=url):
+                response = getattr(self.client, method)(url, {'title': 'Чужой', 'url': 'https://example.com/x'})
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.link.refresh_from_db()
+        self.assertEqual(self.link.title, 'Заголовок')
+
+    def test_other_user_list_and_search(self):
+        response = self.client.get('/links/links_list/')
+        self.assertEqual(response.data['results'], [])
+        response = self.client.get('/links/search/?q=page')
+        self.assertEqual(response.data['results'], [])
+
+    def test_superuser_gets_any_link(self):
+        self.client.force_authenticate(User.objects.create(email='root@example.com', is_superuser=True))
+        response = self.client.get(f'/links/detail/{self.link.pk}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['owner'], self.owner.pk)
+
+
+class LinkBulkOperationsTestCase(TestCase):
+    """
+    The bulk operations on links: results, written changes and counters.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create(email='operations@example.com')
+        self.other = User.objects.create(email='operations-other@example.com')
+        self.links = [Link.objects.create(owner=self.owner, url=f'https://example.com/{i}') for i in range(4)]
+        self.foreign_link = Link.objects.create(owner=self.other, url='https://example.com/foreign')
+        self.collection = Collection.objects.create(owner=self.owner, name='Чтение')
+        self.foreign_collection = Collection.objects.create(owner=self.other, name='Чужая')
+        self.links[3].collection.add(self.collection)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def post(self, operations):
+        response = self.client.post('/links/bulk/', operations, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['results'] if isinstance(response.data, dict) else response.data
+
+    def test_operations(self):
+        first, second, third, fourth = (link.pk for link in self.links)
+        results = self.post([
+            {'op': 'set_type', 'ids': [first, second, self.foreign_link.pk], 'type': 'video'},
+            {'op': 'add_to_collection', 'ids': [first, third, fourth], 'collection': self.collection.pk},
+            {'op': 'remove_from_collection', 'ids': [fourth], 'collection': self.collection.pk},
+            {'op': 'delete', 'ids': [second]},
+            {'op': 'set_type', 'ids': [second], 'type': 'book'},
+        ])
+        self.assertEqual([(result['applied'], result['unchanged'], result['not_found']) for result in results], [
+            ([first, second], [], [self.foreign_link.pk]),
+            ([first, third], [fourth], []),
+            ([fourth], [], []),
+            ([second], [], []),
+            ([], [], [second]),
+        ])
+
+        self.assertFalse(Link.objects.filter(pk=second).exists())
+        self.assertEqual(Link.objects.get(pk=first).type, 'video')
+        self.assertEqual(Link.objects.get(pk=self.foreign_link.pk).type, 'website')
+        self.assertEqual(set(self.collection.links.values_list('pk', flat=True)), {first, third})
+        self.collection.refresh_from_db()
+        self.assertEqual(self.collection.links_count, 2)
+        self.owner.refresh_from_db()
+        self.assertEqual(self.owner.links_count, 3)
+        self.assertEqual(dict(LinkTypeCounter.objects.filter(owner=self.owner, count__gt=0)
+                              .values_list('type', 'count')), {'video': 1, 'website': 2})
+        self.assertEqual(dict(LinkDailyCounter.objects.values_list('type').annotate(count=Sum('count'))
+                              .order_by()), {'video': 1, 'website': 3})
+
+    def test_changed_links_are_touched_once(self):
+        first, second = self.links[0], self.links[1]
+        with CaptureQueriesContext(connection) as queries:
+            self.post([
+                {'op': 'set_type', 'ids': [first.pk], 'type': 'video'},
+                {'op': 'add_to_collection', 'ids': [first.pk, second.pk], 'collection': self.collection.pk},
+            ])
+        # Ссылка с новым типом получает updated_at вместе с типом, отдельным UPDATE обновляется только вторая
+        updates = [query['sql'] for query in queries.captured_queries
+                   if query['sql'].startswith('UPDATE "links_link"')]
+        self.assertEqual(len(updates), 2)
+        self.assertIn(f'IN ({second.pk})', updates[1])
+        for link in (first, second):
+            updated_at = link.updated_at
+            link.refresh_from_db()
+            self.assertGreater(link.updated_at, updated_at)
+
+    def test_delete_with_dependent_rows(self):
+        link = self.links[3]
+        LinkMetadataJob.objects.create(link=link)
+        results = self.post([{'op': 'delete', 'ids': [link.pk]}])
+        self.assertEqual(results[0]['applied'], [link.pk])
+        self.assertFalse(Link.objects.filter(pk=link.pk).exists())
+        self.assertFalse(LinkMetadataJob.objects.filter(link_id=link.pk).exists())
+        self.assertFalse(Link.collection.through.objects.filter(link_id=link.pk).exists())
+        self.collection.refresh_from_db()
+        self.assertEqual(self.collection.links_count, 0)
+
+    def test_invalid_operations(self):
+        results = self.post([
+            {'op': 'rename', 'ids': [self.links[0].pk]},
+            {'op': 'delete', 'ids': []},
+            {'op': 'delete', 'ids': ['1']},
+            {'op': 'set_type', 'ids': [self.links[0].pk], 'type': 'podcast'},
+            {'op': 'add_to_collection', 'ids': [self.links[0].pk], 'collection': self.foreign_collection.pk},
+            'delete',
+        ])
+        self.assertEqual([result['status'] for result in results], ['invalid'] * 6)
+        self.assertEqual(Link.objects.filter(owner=self.owner).count(), 4)
+        self.assertFalse(self.foreign_collection.links.exists())
+
+    def test_limits(self):
+        response = self.client.post('/links/bulk/', {'op': 'delete', 'ids': [1]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        with mock.patch.dict(settings.LINK_BULK_OPERATIONS, {'MAX_IDS': 2}):
+            response = self.client.post('/links/bulk/', [{'op': 'delete', 'ids': [link.pk for link in self.links]}],
+                                        format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Link.objects.filter(owner=self.owner).count(), 4)
+
+
+class MetadataJobTestCase(TestCase):
+    """
+    The queue of metadata jobs: claiming, retries with an exponential delay and failures.
+    """
+
+    def setUp(self):
+        # Обработчик закрывает соединение потока с базой, в тесте оно общее
+        patcher = mock.patch('links.jobs.close_old_connections')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.owner = User.objects.create(email='jobs@example.com')
+        self.link = Link.objects.create(owner=self.owner, url='https://example.com/page')
+        self.job = LinkMetadataJob.objects.get(link=self.link)
+
+    def test_claim(self):
+        later = Link.objects.create(owner=self.owner, url='https://example.com/later')
+        LinkMetadataJob.objects.filter(link=later).update(run_after=timezone.now() + timedelta(minutes=1))
+        self.assertEqual(claim_jobs(10), [self.job.pk])
+        self.assertEqual(claim_jobs(10), [])
+        self.job.refresh_from_db()
+        self.link.refresh_from_db()
+        self.assertEqual((self.job.status, self.job.attempts, self.link.metadata_status), ('running', 1, 'running'))
+
+    def test_stale_running_job(self):
+        claim_jobs(10)
+        stale = timezone.now() - timedelta(seconds=settings.LINK_METADATA_QUEUE['LOCK_TIMEOUT'] + 1)
+        LinkMetadataJob.objects.filter(pk=self.job.pk).update(locked_at=stale)
+        self.assertEqual(claim_jobs(10), [self.job.pk])
+
+        LinkMetadataJob.objects.filter(pk=self.job.pk).update(
+            locked_at=stale, attempts=settings.LINK_METADATA_QUEUE['MAX_ATTEMPTS'])
+        self.assertEqual(claim_jobs(10), [])
+        self.job.refresh_from_db()
+        self.link.refresh_from_db()
+        self.assertEqual((self.job.status, self.link.metadata_status), ('failed', 'failed'))
+
+    def test_job_keeps_user_edits(self):
+        url_metadata = UrlMetadata(title='Page', description='About', type='video', fetched_at=timezone.now())
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        response = client.post('/links/create/', {'url': 'https://example.com/own', 'title': 'Мой заголовок'},
+                               format='json')
+        created = Link.objects.get(pk=response.data['pk'])
+        self.assertEqual(created.edited_fields, ['title'])
+
+        def fetch_and_edit(url):
+            # Пользователь меняет тип, пока загружается страница
+            client.patch(f'/links/update/{self.link.pk}/', {'type': 'book'}, format='json')
+            return url_metadata
+
+        claim_jobs(10)
+        with mock.patch('links.jobs.fetch_url_metadata', side_effect=fetch_and_edit):
+            run_job(self.job.pk)
+        with mock.patch('links.jobs.fetch_url_metadata', return_value=url_metadata):
+            run_job(LinkMetadataJob.objects.get(link=created).pk)
+        self.link.refresh_from_db()
+        created.refresh_from_db()
+        self.assertEqual((self.link.title, self.link.type, self.link.metadata_status), ('Page', 'book', 'done'))
+        self.assertEqual((created.title, created.description, created.type), ('Мой заголовок', 'About', 'video'))
+
+    @mock.patch('links.jobs.fetch_url_metadata', return_value=None)
+    def test_retry_with_backoff(self, fetch_url_metadata):
+        delay = settings.LINK_METADATA_QUEUE['RETRY_DELAY']
+        for attempt in range(1, settings.LINK_METADATA_QUEUE['MAX_ATTEMPTS']):
+            LinkMetadataJob.objects.filter(pk=self.job.pk).update(run_after=timezone.now())
+            claim_jobs(1)
+            before = timezone.now()
+            run_job(self.job.pk)
+            self.job.refresh_from_db()
+            self.assertEqual(self.job.status, 'pending')
+            self.assertAlmostEqual((self.job.run_after - before).total_seconds(), delay * 2 ** (attempt - 1),
+                                   delta=1)
+
+        LinkMetadataJob.objects.filter(pk=self.job.pk).update(run_after=timezone.now())
+        claim_jobs(1)
+        run_job(self.job.pk)
+        self.job.refresh_from_db()
+        self.link.refresh_from_db()
+        self.assertEqual((self.job.status, self.link.metadata_status), ('failed', 'failed'))
+
+    @mock.patch('links.jobs.fetch_url_metadata', side_effect=RuntimeError('broken preview'))
+    def test_unexpected_error(self, fetch_url_metadata):
+        claim_jobs(1)
+        with self.assertLogs('links.jobs', 'ERROR'):
+            run_job(self.job.pk)
+        self.job.refresh_from_db()
+        self.link.refresh_from_db()
+        self.assertEqual((self.job.status, self.link.metadata_status), ('pending', 'pending'))
+        self.assertIn('broken preview', self.job.last_error)
+        self.assertGreater(self.job.run_after, timezone.now())
+
+
+class HeadMetadataTestCase(SimpleTestCase):
+    """
+    The streamed parser of `<head>` gives the same data with both backends and stops at the end of the head.
+    """
+
+    def extract(self, chunks, **kwargs):
+        results = [extract_head_metadata(chunks, backend=backend, **kwargs) for backend in ('lxml', 'html.parser')]
+        self.assertEqual(results[0], results[1])
+        return results[0]
+
+    def test_metadata(self):
+        html = (b'<html><head><title> Page </title><meta name="Description" content="About">'
+                b'<meta property="og:image" content="https://example.com/i.png">'
+                b'<meta property="og:type" content="video.movie"><meta name="description" content="Second">'
+                b'</head><body></body></html>')
+        # Документ приходит частями, граница проходит внутри тега
+        chunks = [html[:30], html[30:75], html[75:]]
+        self.assertEqual(self.extract(chunks), {'title': 'Page', 'description': 'About',
+                                                'image': 'https://example.com/i.png', 'type': 'video.movie'})
+
+    def test_charset(self):
+        title = 'Заголовок'
+        for meta, encoding, declared in (('', 'windows-1251', 'windows-1251'),
+                                         ('<meta charset="koi8-r">', 'koi8-r', None),
+                                         ('<meta charset="utf-8">', 'windows-1251', 'cp1251'),
+                                         ('', 'utf-8', None)):
+            with self.subTest(meta=meta, declared=declared):
+                html = f'<html><head>{meta}<title>{title}</title></head>'.encode(encoding)
+                self.assertEqual(self.extract([html], encoding=declared)['title'], title)
+
+    def test_body_without_end_of_head(self):
+        html = (b'<html><head><title>Page</title><body><meta name="description" content="In the body">'
+                b'<title>Other</title>')
+        self.assertEqual(self.extract([html]), {'title': 'Page', 'description': '', 'image': '', 'type': ''})
+
+    def test_content_tag_ends_head(self):
+        html = b'<title>Page</title><div><meta name="description" content="After the content"></div>'
+        self.assertEqual(self.extract([html])['description'], '')
+
+    def test_byte_cap(self):
+        consumed = []
+
+        def chunks():
+            yield b'<html><head><title>Page</title>'
+            for index in range(100):
+                consumed.append(index)
+                yield b'<meta name="x" content="' + b'y' * 1000 + b'">'
+            yield b'<meta name="description" content="Too far"></head>'
+
+        for backend in ('lxml', 'html.parser'):
+            consumed.clear()
+            result = extract_head_metadata(chunks(), max_bytes=5000, backend=backend)
+            self.assertEqual((result['title'], result['description']), ('Page', ''))
+            self.assertLess(len(consumed), 10)
+
+    def test_empty(self):
+        self.assertEqual(self.extract([]), {'title': '', 'description': '', 'image': '', 'type': ''})
+
+    def test_page_type(self):
+        for og_type, link_type in (('video.movie', 'video'), ('article', 'article'), ('music.song', 'website'),
+                                   ('', 'website'), ('profile', 'website')):
+            with self.subTest(og_type=og_type):
+                self.assertEqual(normalize_page_type(og_type), link_type)
+
+
+def page_data(title='Page', etag='"v1"', not_modified=False):
+    """
+    Return the page data of `links.services.get_page_data` without a preview.
+    """
+    if not_modified:
+        return {'not_modified': True}
+    return {'title': title, 'description': 'About', 'image': '', 'type': 'article', 'etag': etag,
+            'last_modified': 'Mon, 01 Jan 2024 00:00:00 GMT'}
+
+
+@mock.patch.dict(settings.URL_METADATA_CACHE, {'HIT_SAMPLE_RATE': 1})
+class UrlMetadataCacheTestCase(TestCase):
+    """
+    The page data cache shared by links with the same URL: hits, expiry and revalidation.
+    """
+    url = 'https://Example.com/page'
+
+    def create_entry(self, expires_in):
+        now = timezone.now()
+        return UrlMetadata.objects.create(url_hash=hash_url(self.url), url=normalize_url(self.url), title='Cached',
+                                          type='video', etag='"v1"', fetched_at=now,
+                                          expires_at=now + timedelta(seconds=expires_in))
+
+    @mock.patch('links.metadata_cache.get_page_data', return_value=page_data())
+    def test_miss_creates_entry(self, get_page_data):
+        before = timezone.now()
+        url_metadata = fetch_url_metadata(self.url)
+        get_page_data.assert_called_once_with(self.url)
+        self.assertEqual((url_metadata.title, url_metadata.misses, url_metadata.hits), ('Page', 1, 0))
+        self.assertAlmostEqual((url_metadata.expires_at - before).total_seconds(),
+                               settings.URL_METADATA_CACHE['TTL'], delta=5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(fetch_url_metadata('https://example.com/page').pk, url_metadata.pk)
+        self.assertEqual(get_page_data.call_count, 1)
+        url_metadata.refresh_from_db()
+        self.assertEqual(url_metadata.hits, 1)
+
+    @mock.patch('links.metadata_cache.get_page_data', return_value=page_data(not_modified=True))
+    def test_revalidation_not_modified(self, get_page_data):
+        entry = self.create_entry(-1)
+        url_metadata = fetch_url_metadata(self.url)
+        get_page_data.assert_called_once_with(self.url, etag='"v1"', last_modified=None)
+        entry.refresh_from_db()
+        self.assertEqual((entry.title, entry.misses), ('Cached', 1))
+        self.assertGreater(entry.expires_at, timezone.now())
+        self.assertEqual(url_metadata.pk, entry.pk)
+
+    @mock.patch('links.metadata_cache.get_page_data', return_value=page_data(title='Changed', etag='"v2"'))
+    def test_revalidation_changed(self, get_page_data):
+        entry = self.create_entry(-1)
+        fetch_url_metadata(self.url)
+        entry.refresh_from_db()
+        self.assertEqual((entry.title, entry.type, entry.etag), ('Changed', 'article', '"v2"'))
+
+    def test_new_link_uses_fresh_entry(self):
+        entry = self.create_entry(60)
+        owner = User.objects.create(email='cache@example.com')
+        with self.captureOnCommitCallbacks(execute=True):
+            link = Link.objects.create(owner=owner, url=self.url)
+        self.assertEqual((link.title, link.type, link.metadata_status), ('Cached', 'video', 'done'))
+        self.assertFalse(LinkMetadataJob.objects.filter(link=link).exists())
+        entry.refresh_from_db()
+        self.assertEqual(entry.hits, 1)
+
+    def test_expired_entry_is_not_used(self):
+        self.create_entry(-1)
+        link = Link.objects.create(owner=User.objects.create(email='cache@example.com'), url=self.url)
+        self.assertEqual(link.metadata_status, 'pending')
+        self.assertTrue(LinkMetadataJob.objects.filter(link=link).exists())
+
+    def test_sampled_hits(self):
+        entry = self.create_entry(60)
+        with mock.patch.dict(settings.URL_METADATA_CACHE, {'HIT_SAMPLE_RATE': 10}):
+            for value, expected in ((0.5, 0), (0.05, 10)):
+                with mock.patch('links.models.random.random', return_value=value):
+                    with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                        UrlMetadata.get_fresh(self.url)
+                self.assertEqual(len(callbacks), int(bool(expected)))
+        entry.refresh_from_db()
+        self.assertEqual(entry.hits, 10)
+
+
+def image_bytes(image_format='PNG', size=(40, 30), color=(200, 10, 10)):
+    """
+    Return an image of the given format and size encoded in memory.
+    """
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, image_format)
+    return buffer.getvalue()
+
+
+class PreviewBlobTestCase(TestCase):
+    """
+    Preview files stored once per content: references and deletion of unused files.
+    """
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_override = override_settings(MEDIA_ROOT=media_root.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.owner = User.objects.create(email='blob@example.com')
+
+    def store(self, content=None):
+        return PreviewBlob.store(ContentFile(content or image_bytes()))
+
+    def released(self, blob, seconds_ago):
+        PreviewBlob.objects.filter(pk=blob.pk).update(ref_count=0, released_at=timezone.now()
+                                                      - timedelta(seconds=seconds_ago))
+
+    def test_store_deduplicates_content(self):
+        blob = self.store()
+        self.assertEqual(self.store().pk, blob.pk)
+        self.assertNotEqual(self.store(image_bytes(color=(0, 0, 255))).pk, blob.pk)
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 2)
+        self.assertTrue(default_storage.exists(blob.file.name))
+        self.assertTrue(default_storage.exists(blob.thumbnail.name))
+
+    def test_invalid_image_is_not_stored(self):
+        self.assertIsNone(self.store(b'not an image'))
+        self.assertFalse(PreviewBlob.objects.exists())
+
+    def test_references_follow_links(self):
+        first, second = self.store(), self.store(image_bytes(color=(0, 0, 255)))
+        link = Link.objects.create(owner=self.owner, url='https://example.com/a', preview_blob=second)
+        PreviewBlob.replace_reference(first.pk, second.pk)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.ref_count, second.ref_count), (0, 2))
+        self.assertIsNotNone(first.released_at)
+
+        link.delete()
+        second.refresh_from_db()
+        self.assertEqual(second.ref_count, 1)
+
+    def test_collect_unused(self):
+        unused, recent, used, referenced = (self.store(image_bytes(color=(n, 0, 0))) for n in range(4))
+        self.released(unused, 7200)
+        self.released(recent, 60)
+        self.released(referenced, 7200)
+        Link.objects.create(owner=self.owner, url='https://example.com/a', preview_blob=referenced)
+        names = [unused.file.name, unused.thumbnail.name]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(PreviewBlob.collect_unused(3600), 1)
+        self.assertEqual(set(PreviewBlob.objects.values_list('pk', flat=True)), {recent.pk, used.pk, referenced.pk})
+        self.assertFalse(any(default_storage.exists(name) for name in names))
+        self.assertTrue(default_storage.exists(recent.file.name))
+
+    def test_collect_deletes_files_after_commit(self):
+        blob = self.store()
+        self.released(blob, 7200)
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.assertEqual(PreviewBlob.collect_unused(3600), 1)
+        self.assertTrue(default_storage.exists(blob.file.name))
+        self.assertEqual(len(callbacks), 1)
+
+    def test_collect_skips_reused_blob(self):
+        blob = self.store()
+        self.released(blob, 7200)
+        select_for_update = PreviewBlob.objects.select_for_update
+
+        def take_reference(**kwargs):
+            # Ссылку на файл берут между выборкой кандидатов и блокировкой строки
+            PreviewBlob.objects.filter(pk=blob.pk).update(ref_count=1)
+            return select_for_update(**kwargs)
+
+        with mock.patch.object(PreviewBlob.objects, 'select_for_update', side_effect=take_reference) \
+                as patched_select_for_update:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(PreviewBlob.collect_unused(3600), 0)
+        patched_select_for_update.assert_called_once_with(skip_locked=True)
+        self.assertTrue(PreviewBlob.objects.filter(pk=blob.pk).exists())
+        self.assertTrue(default_storage.exists(blob.file.name))
+
+
+class PreviewImageTestCase(SimpleTestCase):
+    """
+    Download and processing of preview images: formats, size limits and the WebP output.
+    """
+
+    def test_sniff_image_format(self):
+        for image_format in ('JPEG', 'PNG', 'GIF', 'WEBP'):
+            with self.subTest(image_format=image_format):
+                self.assertEqual(sniff_image_format(image_bytes(image_format)), image_format)
+        self.assertIsNone(sniff_image_format(image_bytes('BMP')))
+        self.assertIsNone(sniff_image_format(b'<html></html>'))
+        self.assertIsNone(sniff_image_format(b'RIFF'))
+
+    def test_download_image(self):
+        webp = image_bytes('WEBP')
+        routes = {'/image': page(webp, content_type='image/webp'), '/page': HTML_PAGE,
+                  '/bmp': page(image_bytes('BMP'), content_type='image/bmp')}
+        with StubServer(routes) as server:
+            self.assertEqual(download_image(f'{server.url}/image'), webp)
+            for path in ('/page', '/bmp', '/missing'):
+                with self.subTest(path=path), self.assertRaises(InvalidImage):
+                    download_image(f'{server.url}{path}')
+            with mock.patch.dict(settings.LINK_PREVIEWS, {'MAX_BYTES': len(webp) - 1}):
+                with self.assertRaises(ResponseTooLarge):
+                    download_image(f'{server.url}/image')
+
+    def test_download_image_short_first_chunk(self):
+        webp = image_bytes('WEBP')
+        response = mock.MagicMock(status_code=200)
+        # Первые фрагменты короче сигнатуры WebP
+        response.iter_content.return_value = iter([webp[:4], webp[4:9], webp[9:]])
+        open_url = mock.MagicMock()
+        open_url.return_value.__enter__.return_value = response
+        with mock.patch('links.previews.open_url', open_url):
+            self.assertEqual(download_image('https://example.com/image.webp'), webp)
+
+    def test_render_preview_bounds(self):
+        conf = settings.LINK_PREVIEWS
+        for size in ((4000, 1000), (100, 5000), (50, 20)):
+            with self.subTest(size=size):
+                preview, thumbnail = render_preview(image_bytes('JPEG', size))
+                with Image.open(io.BytesIO(preview)) as image:
+                    self.assertEqual(image.format, 'WEBP')
+                    self.assertLessEqual(image.width, conf['PREVIEW_WIDTH'])
+                    self.assertLessEqual(image.height, conf['PREVIEW_WIDTH'] * 3)
+                with Image.open(io.BytesIO(thumbnail)) as image:
+                    self.assertEqual(image.format, 'WEBP')
+                    self.assertLessEqual(image.width, conf['THUMBNAIL_WIDTH'])
+                    self.assertLessEqual(image.height, conf['THUMBNAIL_WIDTH'] * 3)
+
+    def test_render_preview_keeps_alpha(self):
+        buffer = io.BytesIO()
+        Image.new('RGBA', (40, 30), (0, 0, 0, 0)).save(buffer, 'PNG')
+        preview, _ = render_preview(buffer.getvalue())
+        with Image.open(io.BytesIO(preview)) as image:
+            self.assertEqual(image.mode, 'RGBA')
+
+    def test_render_preview_rejects(self):
+        with mock.patch.dict(settings.LINK_PREVIEWS, {'MAX_PIXELS': 100 * 100}):
+            with self.assertRaisesMessage(InvalidImage, '101x100'):
+                render_preview(image_bytes('PNG', (101, 100)))
+            render_preview(image_bytes('PNG', (100, 100)))
+        for content in (image_bytes('BMP'), image_bytes('TIFF'), b'not an image', image_bytes('PNG')[:40]):
+            with self.subTest(content=content[:8]), self.assertRaises(InvalidImage):
+                render_preview(content)
+
+
+@mock.patch.dict(settings.LINK_EXPORT, {'CHUNK_SIZE': 2, 'BLOCK_SIZE': 100})
+class LinkExportTestCase(TestCase):
+    """
+    The streamed export of the links and collections of a user in NDJSON and CSV.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create(email='export@example.com')
+        self.reading = Collection.objects.create(owner=self.owner, name='Читать')
+        self.work = Collection.objects.create(owner=self.owner, name='Работа', description='Проекты')
+        self.links = [Link.objects.create(owner=self.owner, url=f'https://example.com/{n}', title=f'Ссылка {n}')
+                      for n in range(5)]
+        self.links[0].collection.add(self.reading, self.work)
+        self.links[3].collection.add(self.work)
+        other = User.objects.create(email='other@example.com')
+        Link.objects.create(owner=other, url='https://example.com/other')
+        Collection.objects.create(owner=other, name='Чужая')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def export(self, export_format=None):
+        params = {'export_format': export_format} if export_format else {}
+        response = self.client.get('/links/export/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        response, body = self.export()
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="links.ndjson"')
+        lines = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([(line['kind'], line['pk']) for line in lines],
+                         [('collection', self.reading.pk), ('collection', self.work.pk)]
+                         + [('link', link.pk) for link in self.links])
+        self.assertEqual(lines[1]['description'], 'Проекты')
+        self.assertEqual(lines[2]['collections'], [self.reading.pk, self.work.pk])
+        self.assertEqual(lines[3]['collections'], [])
+        self.assertEqual(lines[5]['collections'], [self.work.pk])
+        self.assertEqual((lines[2]['url'], lines[2]['title'], lines[2]['preview']),
+                         ('https://example.com/0', 'Ссылка 0', None))
+
+    def test_csv(self):
+        response, body = self.export('csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="links.csv"')
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual([int(row['id']) for row in rows], [link.pk for link in self.links])
+        self.assertEqual([row['collections'] for row in rows],
+                         [f'{self.reading.pk};{self.work.pk}', '', '', str(self.work.pk), ''])
+        self.assertEqual(rows[0]['title'], 'Ссылка 0')
+        self.assertEqual(rows[0]['created_at'], self.links[0].created_at.isoformat())
+
+    def test_unknown_format(self):
+        response = self.client.get('/links/export/', {'export_format': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ndjson', response.data['error'])
+
+    def test_requires_authentication(self):
+        response = APIClient().get('/links/export/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class LinkFilterTestCase(TestCase):
+    """
+    The filters of the link list by type, collection, domain and dates, and the facet counts.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create(email='filters@example.com')
+        self.reading = Collection.objects.create(owner=self.owner, name='Читать')
+        self.work = Collection.objects.create(owner=self.owner, name='Работа')
+        now = timezone.now()
+        rows = (
+            ('https://www.example.com/a', 'video', 40, [self.reading]),
+            ('https://example.com/b', 'article', 20, [self.reading, self.work]),
+            ('https://blog.example.com/c', 'article', 10, []),
+            ('https://other.org/d', 'book', 1, [self.work]),
+        )
+        self.links = []
+        for url, type_, days_ago, collections in rows:
+            link = Link.objects.create(owner=self.owner, url=url, type=type_)
+            link.collection.add(*collections)
+            Link.objects.filter(pk=link.pk).update(created_at=now - timedelta(days=days_ago),
+                                                   updated_at=now - timedelta(days=days_ago - 1))
+            self.links.append(link)
+        Link.objects.create(owner=User.objects.create(email='filters-other@example.com'),
+                            url='https://example.com/other', type='video')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def get_pks(self, query):
+        response = self.client.get(f'/links/links_list/?{query}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return sorted(item['pk'] for item in response.data['results'])
+
+    def pks(self, *indexes):
+        return sorted(self.links[index].pk for index in indexes)
+
+    def test_type(self):
+        self.assertEqual(self.get_pks('type=article'), self.pks(1, 2))
+        self.assertEqual(self.get_pks('type=video, book'), self.pks(0, 3))
+        response = self.client.get('/links/links_list/?type=article,podcast')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('podcast', str(response.data['type']))
+
+    def test_collection(self):
+        self.assertEqual(self.get_pks(f'collection={self.reading.pk}'), self.pks(0, 1))
+        self.assertEqual(self.get_pks(f'collection={self.work.pk}&type=book'), self.pks(3))
+        response = self.client.get('/links/links_list/?collection=first')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_domain(self):
+        for domain in ('example.com', 'www.example.com', 'EXAMPLE.com', 'https://example.com',
+                       'https://www.Example.com/path?q=1', 'example.com/path'):
+            with self.subTest(domain=domain):
+                self.assertEqual(self.get_pks(f'domain={quote(domain)}'), self.pks(0, 1))
+        self.assertEqual(self.get_pks('domain=blog.example.com'), self.pks(2))
+        self.assertEqual(self.get_pks('domain=unknown.net'), [])
+        for domain in ('https://', ' '):
+            with self.subTest(domain=domain):
+                response = self.client.get(f'/links/links_list/?domain={quote(domain)}')
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_dates(self):
+        day = (timezone.localdate() - timedelta(days=15)).isoformat()
+        self.assertEqual(self.get_pks(f'created_after={day}'), self.pks(2, 3))
+        self.assertEqual(self.get_pks(f'created_before={day}'), self.pks(0, 1))
+        moment = quote((timezone.now() - timedelta(days=10, hours=1)).isoformat())
+        self.assertEqual(self.get_pks(f'created_after={moment}&created_before={day}'), [])
+        self.assertEqual(self.get_pks(f'updated_after={moment}'), self.pks(2, 3))
+        self.assertEqual(self.get_pks(f'updated_before={moment}&type=article'), self.pks(1))
+        response = self.client.get('/links/links_list/?created_after=yesterday')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('created_after', response.data)
+
+    def test_facets(self):
+        response = self.client.get('/links/links_list/?facets=true')
+        self.assertEqual(response.data['facets'], {
+            'type': {'website': 0, 'book': 1, 'article': 2, 'music': 0, 'video': 1},
+            'collection': {self.reading.pk: 2, self.work.pk: 2},
+        })
+        response = self.client.get('/links/links_list/?facets=true&domain=example.com')
+        self.assertEqual(response.data['facets'], {
+            'type': {'website': 0, 'book': 0, 'article': 1, 'music': 0, 'video': 1},
+            'collection': {self.reading.pk: 2, self.work.pk: 1},
+        })
+        self.assertNotIn('facets', self.client.get('/links/links_list/').data)
+
+    def test_facet_queries(self):
+        queryset = Link.objects.filter(owner=self.owner)
+        with self.assertNumQueries(2):
+            get_link_facets(queryset)
+
+
+class LinkRowsTestCase(TestCase):
+    """
+    The link lists built from plain rows have the same representation as `LinkSerializer`.
+    """
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_override = override_settings(MEDIA_ROOT=media_root.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        cache.clear()
+        self.owner = User.objects.create(email='rows@example.com')
+        blob = PreviewBlob.store(ContentFile(image_bytes()))
+        with_preview = Link.objects.create(owner=self.owner, url='https://example.com/video', title='Видео',
+                                           description='Описание', type='video', preview=blob.file.name,
+                                           preview_blob=blob)
+        in_collection = Link.objects.create(owner=self.owner, url='https://example.com/page')
+        Link.objects.create(owner=self.owner, url='https://example.com/bare', description=None)
+        reading = Collection.objects.create(owner=self.owner, name='Чтение')
+        work = Collection.objects.create(owner=self.owner, name='Работа')
+        with_preview.collection.add(reading, work)
+        in_collection.collection.add(work)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def serializer_data(self, query=''):
+        request = Request(APIRequestFactory().get(f'/links/links_list/{query}'))
+        links = (Link.objects.filter(owner=self.owner).select_related('preview_blob').order_by('pk')
+                 .prefetch_related(Prefetch('collection', queryset=Collection.objects.order_by('pk'))))
+        return [list(item.items()) for item in LinkSerializer(links, many=True, context={'request': request}).data]
+
+    def rows_data(self, query=''):
+        request = Request(APIRequestFactory().get(f'/links/links_list/{query}'))
+        fields = get_sparse_fields(request, LINK_FIELDS)
+        rows = link_rows(Link.objects.filter(owner=self.owner).order_by('pk'), fields)
+        return [list(item.items()) for item in serialize_link_rows(list(rows), fields, request)]
+
+    def test_all_fields(self):
+        expected = self.serializer_data()
+        self.assertEqual(self.rows_data(), expected)
+        with_preview, in_collection, bare = (dict(item) for item in expected)
+        self.assertTrue(with_preview['preview'].startswith('http://testserver/'))
+        self.assertTrue(with_preview['preview_thumbnail'].startswith('http://testserver/'))
+        self.assertEqual(len(with_preview['collection']), 2)
+        self.assertEqual((bare['preview'], bare['preview_thumbnail'], bare['collection']), (None, None, []))
+
+        response = self.client.get('/links/links_list/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([list(item.items()) for item in response.data['results']], expected[::-1])
+
+    def test_selected_fields(self):
+        for query in ('?fields=pk,preview_thumbnail,collection', '?fields=url', '?omit=preview,collection,owner',
+                      '?fields=pk,title,created_at&omit=title'):
+            with self.subTest(query=query):
+                expected = self.serializer_data(query)
+                self.assertEqual(self.rows_data(query), expected)
+                response = self.client.get(f'/links/links_list/{query}')
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                # Список упорядочен от новых ссылок к старым
+                self.assertEqual([list(item.items()) for item in response.data['results']], expected[::-1])
+
+    def test_unknown_field(self):
+        for query in ('?fields=pk,secret', '?omit=secret'):
+            with self.subTest(query=query):
+                response = self.client.get(f'/links/links_list/{query}')
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn('secret', str(response.data))
+
+
+class ORJSONRendererTestCase(SimpleTestCase):
+    """
+    `ORJSONRenderer` renders the same bytes as `JSONRenderer` and rejects the same values.
+    """
+
+    def assert_same(self, data):
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_same_output(self):
+        moment = datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=dt_timezone.utc)
+        cases = {
+            'datetimes': {'at': moment, 'naive': moment.replace(tzinfo=None), 'date': moment.date(),
+                          'time': moment.time(), 'duration': timedelta(hours=1, seconds=5)},
+            'decimal': {'price': Decimal('10.50'), 'negative': Decimal('-3.25')},
+            'uuid': [uuid.UUID('12345678-1234-5678-1234-567812345678')],
+            'keys': {1: 'int', 2.5: 'float', True: 'bool', None: 'none', 'текст': 'str'},
+            'large ints': {'max': 2 ** 63 - 1, 'min': -2 ** 63, 'beyond': 2 ** 64 + 1},
+            'text': {'separators': 'a\u2028b\u2029c', 'escaped': '"\\\n', 'null': None, 'float': 0.1},
+        }
+        for name, data in cases.items():
+            with self.subTest(name):
+                self.assert_same(data)
+
+    def test_non_finite_floats(self):
+        for data in ({'value': float('nan')}, [1, [float('inf')]], {'value': None, 'nested': {'x': -float('inf')}},
+                     {float('nan'): 1}):
+            with self.subTest(data=data):
+                with self.assertRaises(ValueError):
+                    JSONRenderer().render(data)
+                with self.assertRaises(ValueError):
+                    ORJSONRenderer().render(data)
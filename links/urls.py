@@ -1,14 +1,20 @@
 from django.urls import path
 
 from links.api_views.link import LinkCreateAPIView, LinkListAPIView, LinkRetrieveAPIView, LinkUpdateAPIView, \
-    LinkDestroyAPIView
+    LinkDestroyAPIView, LinkBulkCreateAPIView, LinkBulkOperationsAPIView, LinkExportAPIView, LinkStatsAPIView, \
+    LinkSearchAPIView
 from links.apps import LinksConfig
 
 app_name = LinksConfig.name
 
 urlpatterns = [
     path('create/', LinkCreateAPIView.as_view(), name='link-create'),
+    path('bulk_create/', LinkBulkCreateAPIView.as_view(), name='link-bulk-create'),
+    path('bulk/', LinkBulkOperationsAPIView.as_view(), name='link-bulk-operations'),
+    path('export/', LinkExportAPIView.as_view(), name='link-export'),
+    path('stats/', LinkStatsAPIView.as_view(), name='link-stats'),
     path('links_list/', LinkListAPIView.as_view(), name='link-list'),
+    path('search/', LinkSearchAPIView.as_view(), name='link-search'),
     path('detail/<int:pk>/', LinkRetrieveAPIView.as_view(), name='link-detail'),
     path('update/<int:pk>/', LinkUpdateAPIView.as_view(), name='link-update'),
     path('delete/<int:pk>/', LinkDestroyAPIView.as_view(), name='link-delete'),
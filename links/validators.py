@@ -1,5 +1,8 @@
 from rest_framework import serializers
 from links.models import Link
+from links.normalization import hash_url
+
+DUPLICATE_URL_MESSAGE = "У вас уже есть ссылка с этим URL."
 
 
 def unique_url_validator(value, serializer):
@@ -7,6 +10,9 @@ def unique_url_validator(value, serializer):
     Validate that the provided URL is unique for the user who is creating the link.
 
     This function is used to validate that the provided URL does not already exist in the user's links.
+    URLs are compared in their normalized form (see `links.normalization.normalize_url`), so the check is a single
+    probe of the unique index on `(owner, url_hash)`. The link being updated is not compared with itself, and its
+    unchanged URL is not checked at all, so legacy duplicates left without `url_hash` can still be edited.
     If the URL already exists, a `serializers.ValidationError` is raised.
 
     Args:
@@ -19,7 +25,12 @@ def unique_url_validator(value, serializer):
     Returns:
         str: The validated URL.
     """
+    if serializer.instance is not None and value == serializer.instance.url:
+        return value
     user = serializer.context['request'].user
-    if Link.objects.filter(url=value, owner=user).exists():
-        raise serializers.ValidationError("У вас уже есть ссылка с этим URL.")
+    queryset = Link.objects.filter(owner=user, url_hash=hash_url(value))
+    if serializer.instance is not None:
+        queryset = queryset.exclude(pk=serializer.instance.pk)
+    if queryset.exists():
+        raise serializers.ValidationError(DUPLICATE_URL_MESSAGE)
     return value
@@ -1,6 +1,7 @@
 from rest_framework import viewsets
 from rest_framework.permissions import AllowAny, IsAuthenticated
 
+from config.response_cache import CachedResponseMixin
 from users.models import User
 from users.paginators import UserPaginator
 from users.permissions import IsOwner, IsSuperUser
@@ -12,16 +13,17 @@ from rest_framework import status
 from django.contrib.auth import update_session_auth_hash
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     """
     ViewSet for interacting with User model.
 
     This ViewSet provides CRUD operations for User model. It uses the `UserSerializer` for
     serialization and the `UserPaginator` for pagination.
+    Profiles read by their owners are cached, see `CachedResponseMixin`.
 
     Attributes:
         serializer_class (UserSerializer): The serializer class used for User model.
-        queryset (QuerySet): The queryset containing all User model instances.
+        queryset (QuerySet): The queryset containing all User model instances with their link counters by type.
         pagination_class (UserPaginator): The pagination class used to handle pagination for User model instances.
 
     Methods:
@@ -29,7 +31,7 @@ class UserViewSet(viewsets.ModelViewSet):
     """
 
     serializer_class = UserSerializer
-    queryset = User.objects.all()
+    queryset = User.objects.prefetch_related('link_type_counters')
     pagination_class = UserPaginator
 
     def get_permissions(self):
@@ -76,7 +78,8 @@ class ChangePasswordView(APIView):
             user = request.user
             if user.check_password(serializer.validated_data.get('old_password')):
                 user.set_password(serializer.validated_data.get('new_password'))
-                user.save()
+                # Пользователь мог быть взят из кэша аутентификации, поэтому сохраняется только пароль
+                user.save(update_fields=['password'])
                 update_session_auth_hash(request, user)
                 return Response({'message': 'Пароль успешно изменен.'}, status=status.HTTP_200_OK)
             return Response({'error': 'Неверный старый пароль.'}, status=status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,134 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from config import settings
+from users.models import User
+
+KEY_PREFIX = 'auth-user'
+AUTH_VERSION_CLAIM = 'auth_version'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def _version_key(user_id):
+    return f'{KEY_PREFIX}:version:{user_id}'
+
+
+def get_auth_version(user_id):
+    """
+    Return the current version of the authentication data of a user.
+
+    Args:
+        user_id (int): The primary key of the user.
+
+    Returns:
+        int: The version.
+    """
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Версия, вытесненная из кэша, начинается с текущего времени в микросекундах, то есть с большего значения,
+        # чем все прежние версии: закэшированные пользователи и подписанные ранее токены ей не соответствуют
+        version = time.time_ns() // 1000
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_auth_version(user_id):
+    """
+    Make the cached user and the claims of the issued tokens of a user stale.
+
+    Inside a transaction the version is changed after the commit, so a user read before the commit
+    is never stored under the new version.
+
+    Args:
+        user_id (int): The primary key of the user.
+    """
+    if user_id is None:
+        return
+
+    def bump():
+        try:
+            cache.incr(_version_key(user_id))
+        except ValueError:
+            cache.add(_version_key(user_id), time.time_ns() // 1000, timeout=None)
+
+    transaction.on_commit(bump)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication resolving the user from the cache instead of the database.
+
+    The user is stored for `AUTH_CACHE['TIMEOUT']` seconds under the key of its primary key and the version
+    of its authentication data. Saving or deleting a user, e.g. a profile update, a password change or
+    a deactivation, bumps the version (see `bump_auth_version`), so the next request reads the user again and
+    applies the usual checks of an inactive or deleted user.
+
+    With `AUTH_CACHE['TRUST_TOKEN_CLAIMS']` read-only requests are not checked against the user at all: the user
+    is built from the `is_superuser` and `is_active` claims signed into the token when it was issued,
+    as long as the `auth_version` claim of the token is still the current version. The claims are trusted only with
+    a shared cache: the local-memory cache of another process would not see the version bumped by this one.
+
+    Methods:
+        get_user: Overrides the `get_user` method to resolve the user from the token claims or the cache.
+    """
+
+    def _trusts_claims(self, request):
+        return settings.AUTH_CACHE['TRUST_TOKEN_CLAIMS'] and settings.CACHE_IS_SHARED and request.method in SAFE_METHODS
+
+    def authenticate(self, request):
+        """
+        Overrides the `authenticate` method to remember whether the request may be resolved from the token claims.
+
+        Args:
+            request (Request): The incoming request.
+
+        Returns:
+            tuple: The user and the validated token, or None if the request carries no token.
+        """
+        self.trust_claims = self._trusts_claims(request)
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        """
+        Overrides the `get_user` method to resolve the user from the token claims or the cache.
+
+        Args:
+            validated_token (Token): The validated access token.
+
+        Raises:
+            AuthenticationFailed: If the user was not found, is inactive or has changed the password
+            of a revocable token.
+
+        Returns:
+            User: The user.
+        """
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+        version = get_auth_version(user_id)
+
+        if (getattr(self, 'trust_claims', False) and validated_token.get(AUTH_VERSION_CLAIM) == version
+                and validated_token.get('is_active')):
+            # Пользователь без полей профиля: для чтения достаточно первичного ключа и прав
+            user = User(pk=user_id, is_active=True, is_superuser=bool(validated_token.get('is_superuser')))
+            user._state.adding = False
+            return user
+
+        key = f'{KEY_PREFIX}:{user_id}:{version}'
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(validated_token)
+            cache.set(key, user, settings.AUTH_CACHE['TIMEOUT'])
+        elif (api_settings.CHECK_REVOKE_TOKEN
+              and validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password)):
+            raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+        return user
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-18 01:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_users_user_joined_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='links_count',
+            field=models.IntegerField(default=0, verbose_name='количество ссылок'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-18 01:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0003_user_links_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['-links_count', 'date_joined'], name='users_user_links_count_idx'),
+        ),
+    ]
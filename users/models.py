@@ -4,7 +4,36 @@ from django.db import models
 NULLABLE = {'blank': True, 'null': True}
 
 
-class User(AbstractUser):
+class CounterFieldsMixin:
+    """
+    Mixin of a model with counter columns changed only by `UPDATE ... SET count = count + delta`.
+
+    A full save of a loaded instance would write back the counters read with it and overwrite the changes
+    made meanwhile, so unless `update_fields` is given, the counter columns are left out of the `UPDATE`.
+    They are written only when the row is inserted.
+
+    Attributes:
+        counter_fields (tuple): The names of the counter columns.
+
+    Methods:
+        save: Saves the instance without the counter columns.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        """
+        Saves the instance without the counter columns, unless it is inserted or `update_fields` is given.
+        """
+        if not self._state.adding and not args and kwargs.get('update_fields') is None \
+                and not kwargs.get('force_insert'):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name not in self.counter_fields
+                                       and field.attname not in deferred]
+        super().save(*args, **kwargs)
+
+
+class User(CounterFieldsMixin, AbstractUser):
     """
     Custom user model extending AbstractUser.
 
@@ -13,8 +42,13 @@ class User(AbstractUser):
         avatar (ImageField): Avatar image of the user.
         phone (CharField): Phone number of the user.
         country (CharField): Country of the user.
+        links_count (IntegerField): The number of links of the user, maintained by `links.counters`.
+        counter_fields (tuple): The counter columns left out of the saves of the user, see `CounterFieldsMixin`.
         USERNAME_FIELD (str): Field used for authentication, set to 'email'.
         REQUIRED_FIELDS (list): List of required fields for user creation.
+
+    Meta:
+        indexes (list): The indexes used to paginate the users and to list the users with the most links.
     """
 
     username = None
@@ -24,6 +58,15 @@ class User(AbstractUser):
     avatar = models.ImageField(upload_to='users_avatar/', verbose_name='аватар', **NULLABLE)
     phone = models.CharField(max_length=40, verbose_name='телефон', **NULLABLE)
     country = models.CharField(max_length=50, verbose_name='страна', **NULLABLE)
+    links_count = models.IntegerField(default=0, verbose_name='количество ссылок')
+
+    counter_fields = ('links_count',)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=['date_joined', 'id'], name='users_user_joined_idx'),
+            models.Index(fields=['-links_count', 'date_joined'], name='users_user_links_count_idx'),
+        ]
@@ -1,19 +1,24 @@
 from rest_framework.pagination import PageNumberPagination
 
+from links.paginators import CursorPaginationMixin
 
-class UserPaginator(PageNumberPagination):
+
+class UserPaginator(CursorPaginationMixin, PageNumberPagination):
     """
     Paginator for the User model.
 
     This class is a subclass of `PageNumberPagination` and is used to paginate the `User` model.
-    It is used to control the pagination style for the list views.
+    It is used to control the pagination style for the list views. With `?pagination=cursor` the users are paginated
+    by `(date_joined, pk)` keys, see `links.paginators.CursorPaginationMixin`.
 
     Attributes:
         page_size (int): The default number of items to include on a page.
         page_size_query_param (str): The name of the query parameter that allows the client to set the page size
         on a per-request basis.
         max_page_size (int): The maximum allowed page size.
+        ordering_field (str): The date field the users are ordered by.
     """
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 50
+    ordering_field = 'date_joined'
@@ -0,0 +1,32 @@
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+
+from users.authentication import AUTH_VERSION_CLAIM, get_auth_version
+
+
+class UserTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Serializer issuing a pair of tokens with the claims used by `CachedJWTAuthentication`.
+
+    The refresh token carries the `is_superuser` and `is_active` flags of the user and the current version
+    of its authentication data; the access tokens obtained with it copy these claims.
+
+    Methods:
+        get_token: Overrides the `get_token` method to add the claims of the user.
+    """
+
+    @classmethod
+    def get_token(cls, user):
+        """
+        Overrides the `get_token` method to add the claims of the user.
+
+        Args:
+            user (User): The authenticated user.
+
+        Returns:
+            RefreshToken: The refresh token.
+        """
+        token = super().get_token(user)
+        token['is_superuser'] = user.is_superuser
+        token['is_active'] = user.is_active
+        token[AUTH_VERSION_CLAIM] = get_auth_version(user.pk)
+        return token
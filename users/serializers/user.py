@@ -1,12 +1,14 @@
 from rest_framework import serializers
 
-from links.models import Link
+from config.sparse_fields import SparseFieldsetMixin
 from users.models import User
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for the User model.
+
+    The fields of the representation can be selected with `?fields=` and `?omit=`, see `SparseFieldsetMixin`.
     """
     password = serializers.CharField(write_only=True, required=False)
 
@@ -42,11 +44,25 @@ class UserSerializer(serializers.ModelSerializer):
             instance.set_password(password)
         return super().update(instance, validated_data)
 
-    links_count = serializers.IntegerField(source='user_links.all.count', required=False, read_only=True)
+    links_by_type = serializers.SerializerMethodField()
+
+    def get_links_by_type(self, obj):
+        """
+        Return the number of links of the user by type from the `LinkTypeCounter` rows.
+
+        Args:
+            obj (User): The user.
+
+        Returns:
+            dict: The number of links by type, types without links are omitted.
+        """
+        return {counter.type: counter.count for counter in obj.link_type_counters.all() if counter.count}
 
     class Meta:
         model = User
-        fields = ('pk', 'password', 'email', 'first_name', 'last_name', 'phone', 'country', 'avatar', 'links_count',)
+        fields = ('pk', 'password', 'email', 'first_name', 'last_name', 'phone', 'country', 'avatar', 'links_count',
+                  'links_by_type',)
+        read_only_fields = ('links_count',)
 
 
 class ChangePasswordSerializer(serializers.Serializer):
@@ -1,10 +1,14 @@
 from django.core.mail import EmailMultiAlternatives
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.template.loader import render_to_string
 from django.urls import reverse
 from django_rest_passwordreset.signals import reset_password_token_created
 
 from config import settings
+from config.response_cache import bump_owner_version
+from users.authentication import bump_auth_version
+from users.models import User
 
 
 @receiver(reset_password_token_created)
@@ -41,3 +45,18 @@ def password_reset_token_created(sender, instance, reset_password_token, *args,
     )
     msg.attach_alternative(email_html_message, "text/html")
     msg.send()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_responses(sender, instance, **kwargs):
+    """
+    Makes the cached responses and the cached authentication of a changed user stale,
+    e.g. after a profile update, a password change or a deactivation
+    :param sender: The User model
+    :param instance: The saved or deleted user
+    :param kwargs:
+    :return:
+    """
+    bump_owner_version(instance.pk)
+    bump_auth_version(instance.pk)
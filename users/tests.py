@@ -1,3 +1,121 @@
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+from config import settings
+from links.models import Link
+from users.authentication import CachedJWTAuthentication
+from users.models import User
+from users.serializers.token import UserTokenObtainPairSerializer
+from users.serializers.user import UserSerializer
+
+
+class UserLinksCounterTestCase(TestCase):
+    """
+    `User.links_count` and the counters by type follow the links and are never overwritten by a save of the user.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email='counter@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_counters(self):
+        response = self.client.get(f'/users/users/{self.user.pk}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['links_count'], response.data['links_by_type']
+
+    def test_counters_follow_links(self):
+        # Кэш ответов пользователя сбрасывается после коммита, поэтому колбэки on_commit выполняются сразу
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/links/create/', {'url': 'https://example.com/video', 'type': 'video'})
+            self.client.post('/links/create/', {'url': 'https://example.com/page'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.get_counters(), (2, {'video': 1, 'website': 1}))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/links/update/{response.data["pk"]}/', {'type': 'website'})
+        self.assertEqual(self.get_counters(), (2, {'website': 2}))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/links/delete/{response.data["pk"]}/')
+        self.assertEqual(self.get_counters(), (1, {'website': 1}))
+
+    def test_patch_keeps_concurrent_change(self):
+        def add_link(serializer, attrs):
+            # Ссылка создается, когда пользователь уже загружен запросом
+            Link.objects.create(owner=self.user, url='https://example.com/concurrent')
+            return attrs
+
+        with mock.patch.object(UserSerializer, 'validate', autospec=True, side_effect=add_link):
+            response = self.client.patch(f'/users/users/{self.user.pk}/', {'first_name': 'Иван'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'Иван')
+        self.assertEqual(self.user.links_count, 1)
+
+    def test_save_of_stale_instance(self):
+        stale = User.objects.get(pk=self.user.pk)
+        Link.objects.create(owner=self.user, url='https://example.com/page')
+        stale.country = 'Россия'
+        stale.save()
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.country, self.user.links_count), ('Россия', 1))
+
+    def test_save_with_update_fields(self):
+        Link.objects.create(owner=self.user, url='https://example.com/page')
+        self.user.links_count = 5
+        self.user.save(update_fields=['links_count'])
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.links_count, 5)
+
+
+@mock.patch.dict(settings.AUTH_CACHE, {'TRUST_TOKEN_CLAIMS': True})
+@mock.patch.object(settings, 'CACHE_IS_SHARED', True)
+class TrustedTokenClaimsTestCase(TestCase):
+    """
+    Read-only requests resolved from the token claims while the authentication data of the user has not changed.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email='claims@example.com', is_superuser=True)
+        self.token = str(UserTokenObtainPairSerializer.get_token(self.user).access_token)
+
+    def authenticate(self, method='get'):
+        request = getattr(APIRequestFactory(), method)('/', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        user, _ = CachedJWTAuthentication().authenticate(request)
+        return user
+
+    def test_claims_trusted(self):
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+        self.assertEqual((user.pk, user.is_active, user.is_superuser), (self.user.pk, True, True))
+        # Изменяющие запросы всегда проверяются по пользователю
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate('post').email, self.user.email)
+
+    def test_version_bump(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_superuser = False
+            self.user.save()
+        with self.assertNumQueries(1):
+            user = self.authenticate()
+        self.assertEqual((user.email, user.is_superuser), (self.user.email, False))
+
+    def test_deactivation(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
 
-# Create your tests here.
+    def test_process_local_cache(self):
+        # Локальный кэш процесса не видит версии, измененные другими процессами, поэтому утверждениям токена не верят
+        with mock.patch.object(settings, 'CACHE_IS_SHARED', False), self.assertNumQueries(1):
+            self.assertEqual(self.authenticate().email, self.user.email)